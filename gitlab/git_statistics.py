@@ -1,10 +1,18 @@
 # git_statistics.py
 import datetime
+import json
 import os
+import random
+import sqlite3
+import threading
+import time
+import urllib.parse
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 
 import requests
-import json
+import requests.adapters
 from dotenv import load_dotenv
 
 # 加载 .env 文件中的环境变量
@@ -32,12 +40,12 @@ if not token:
 """统计的开始日期，从环境变量 START_DAY 读取"""
 start_day = os.getenv("START_DAY", "2022-01-01")
 
-"""统计的结束日期，从环境变量 END_DAY 读取"""
-end_day = os.getenv("END_DAY", "2025-01-01")
+"""统计的结束日期，从环境变量 END_DAY 读取，设置为空时统计到当前时间"""
+end_day = os.getenv("END_DAY", "2025-01-01").strip()
 """统计的时间区间-开始日期，datetime对象"""
 start_date = datetime.datetime.strptime(start_day, '%Y-%m-%d')
 """统计的时间区间-结束日期，datetime对象"""
-end_date = datetime.datetime.strptime(end_day, '%Y-%m-%d')
+end_date = datetime.datetime.strptime(end_day, '%Y-%m-%d') if end_day else datetime.datetime.now()
 
 """
 指定要统计的仓库列表（可选）
@@ -104,8 +112,14 @@ for item in specified_projects_raw:
 specified_branches_str = os.getenv("GITLAB_BRANCHES", "").strip()
 specified_branches = [b.strip() for b in specified_branches_str.split(",") if b.strip()] if specified_branches_str else []
 
-"""查询仓库列表 url"""
-query_repository_list_url = f"{root_url}/api/v4/projects?private_token={token}&per_page=1000"
+"""分页查询时每页的数量，GitLab 允许的最大值为 100"""
+per_page = 100
+
+"""
+查询仓库列表 url
+使用 keyset 分页（按 ID 排序），不支持 keyset 分页的 GitLab 版本会忽略该参数，按页码分页
+"""
+query_repository_list_url = f"{root_url}/api/v4/projects?private_token={token}&per_page={per_page}&pagination=keyset&order_by=id&sort=asc"
 
 """
 根据full_path过滤的仓库（可选）
@@ -131,9 +145,411 @@ exclude_prefix = tuple(p.strip() for p in exclude_prefix_str.split(",") if p.str
 exclude_project_str = os.getenv("EXCLUDE_PROJECT", "").strip()
 exclude_project = tuple(p.strip() for p in exclude_project_str.split(",") if p.strip()) if exclude_project_str else ()
 
+"""
+并发请求的线程数（可选）
+从环境变量 MAX_WORKERS 读取，默认 8，设置为 1 时与串行执行相同
+"""
+max_workers = max(1, int(os.getenv("MAX_WORKERS", "8")))
+
+"""
+同一个 GitLab 主机同时进行的最大请求数（可选）
+从环境变量 MAX_REQUESTS_PER_HOST 读取，默认 8
+"""
+max_requests_per_host = max(1, int(os.getenv("MAX_REQUESTS_PER_HOST", "8")))
+
+"""
+同一个仓库同时进行的最大请求数（可选）
+从环境变量 MAX_REQUESTS_PER_PROJECT 读取，默认 4
+"""
+max_requests_per_project = max(1, int(os.getenv("MAX_REQUESTS_PER_PROJECT", "4")))
+
+"""单次请求的超时时间（秒），从环境变量 REQUEST_TIMEOUT 读取，默认 30"""
+request_timeout = float(os.getenv("REQUEST_TIMEOUT", "30"))
+
+"""
+请求失败（连接失败、超时、429 或 5xx）时的最大重试次数
+从环境变量 MAX_RETRIES 读取，默认 5
+"""
+max_retries = max(0, int(os.getenv("MAX_RETRIES", "5")))
+
+"""
+重试的退避时间（秒）：第 n 次重试前随机等待 0 ~ RETRY_BACKOFF * 2^(n-1) 秒，最长不超过 RETRY_BACKOFF_MAX
+从环境变量 RETRY_BACKOFF 和 RETRY_BACKOFF_MAX 读取，默认 1 和 60
+"""
+retry_backoff = float(os.getenv("RETRY_BACKOFF", "1"))
+retry_backoff_max = float(os.getenv("RETRY_BACKOFF_MAX", "60"))
+
+"""
+提交统计缓存文件路径（可选）
+从环境变量 STATS_CACHE_PATH 读取，默认 .cache/commit_stats.sqlite3，设置为空时不使用缓存
+提交的统计信息不会变化，缓存在多次运行、不同统计时间范围之间共享，再次统计时只需要请求新增的提交
+"""
+stats_cache_path = os.getenv("STATS_CACHE_PATH", ".cache/commit_stats.sqlite3").strip()
+
+"""
+增量统计模式（可选）
+从环境变量 INCREMENTAL 读取，设置为 true 时启用
+启用后为每个仓库的每个分支记录已统计到的位置（水位线），并保存按用户、仓库汇总的统计结果，
+每次运行只获取水位线之后的新提交，合并到已保存的汇总结果中后输出报告
+"""
+incremental = os.getenv("INCREMENTAL", "false").strip().lower() in ("1", "true", "yes")
+
+"""增量统计状态文件路径，从环境变量 INCREMENTAL_STATE_PATH 读取，默认 .cache/incremental.sqlite3"""
+incremental_state_path = os.getenv("INCREMENTAL_STATE_PATH", ".cache/incremental.sqlite3").strip()
+
 datetime_format = "%Y-%m-%dT%H:%M:%S.%fZ"
 
 
+class CommitStatsCache:
+    """
+    提交统计缓存，以 (仓库 ID, 提交 SHA) 为键保存在 SQLite 数据库中
+    
+    多个线程共享同一个连接，读写由锁串行化；写入按批提交事务，统计结束时调用 flush() 提交剩余部分
+    """
+    
+    # 每写入多少条记录提交一次事务
+    BATCH_SIZE = 200
+    
+    def __init__(self, path):
+        self.path = path
+        self._connection = None
+        self._lock = threading.Lock()
+        self._pending = 0
+    
+    def _connect(self):
+        """首次使用时打开数据库并创建表"""
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS commit_stats ("
+                "project_id INTEGER NOT NULL, sha TEXT NOT NULL, "
+                "additions INTEGER NOT NULL, deletions INTEGER NOT NULL, total INTEGER NOT NULL, "
+                "PRIMARY KEY (project_id, sha)) WITHOUT ROWID"
+            )
+            connection.commit()
+            self._connection = connection
+        return self._connection
+    
+    def get(self, project_id, sha):
+        """
+        查询缓存的提交统计
+        
+        Returns:
+            CommitStats 对象，未缓存时返回 None
+        """
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT additions, deletions, total FROM commit_stats WHERE project_id = ? AND sha = ?",
+                (project_id, sha)
+            ).fetchone()
+        if row is None:
+            return None
+        stats = CommitStats()
+        stats.additions, stats.deletions, stats.total = row
+        return stats
+    
+    def put(self, project_id, sha, stats):
+        """保存提交统计"""
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO commit_stats (project_id, sha, additions, deletions, total) VALUES (?, ?, ?, ?, ?)",
+                (project_id, sha, stats.additions, stats.deletions, stats.total)
+            )
+            self._pending += 1
+            if self._pending >= self.BATCH_SIZE:
+                self._connection.commit()
+                self._pending = 0
+    
+    def flush(self):
+        """提交尚未写入的记录"""
+        with self._lock:
+            if self._connection is not None and self._pending:
+                self._connection.commit()
+                self._pending = 0
+
+
+"""提交统计缓存，未配置 STATS_CACHE_PATH 时为 None"""
+stats_cache = CommitStatsCache(stats_cache_path) if stats_cache_path else None
+
+
+class Watermark:
+    """分支的水位线：已统计的最新提交时间（UTC），以及该时间点上已统计的提交 SHA"""
+    
+    def __init__(self, committed_at, shas):
+        self.committed_at = committed_at
+        self.shas = set(shas)
+
+
+class IncrementalState:
+    """
+    增量统计状态，保存在 SQLite 数据库中
+    
+    - watermarks：每个仓库每个分支的水位线
+    - repository_users：每个仓库每个分支每个用户的累计统计
+    
+    只在主线程中使用；每个分支的统计结果和水位线在同一个事务中更新，中途中断不会重复或遗漏统计
+    """
+    
+    def __init__(self, path, start_day, end_day):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS watermarks ("
+            "project_id INTEGER NOT NULL, branch TEXT NOT NULL, committed_at TEXT NOT NULL, sha TEXT NOT NULL, "
+            "boundary_shas TEXT NOT NULL, PRIMARY KEY (project_id, branch));"
+            "CREATE TABLE IF NOT EXISTS repository_users ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER NOT NULL, branch TEXT NOT NULL, "
+            "email TEXT NOT NULL, repository_name TEXT, username TEXT, commit_total INTEGER NOT NULL, "
+            "total INTEGER NOT NULL, additions INTEGER NOT NULL, deletions INTEGER NOT NULL, "
+            "UNIQUE (project_id, branch, email));"
+        )
+        # 开始日期变化，或结束日期提前（由空变为指定日期也视为提前）后，已保存的统计结果中可能包含
+        # 统计区间之外的提交，不再适用，清空重新统计；结束日期推后或设置为空时继续增量统计
+        meta = dict(self._connection.execute("SELECT key, value FROM meta").fetchall())
+        stored_start_day = meta.get('start_day')
+        stored_end_day = meta.get('end_day')
+        reason = None
+        if stored_start_day is not None and stored_start_day != start_day:
+            reason = f"统计开始日期由 {stored_start_day} 变为 {start_day}"
+        elif stored_end_day is not None and end_day and (not stored_end_day or end_day < stored_end_day):
+            reason = f"统计结束日期由 {stored_end_day or '当前时间'} 提前为 {end_day}"
+        if reason is not None:
+            print(f"⚠ {reason}，清空增量统计状态并重新统计")
+            self._connection.execute("DELETE FROM watermarks")
+            self._connection.execute("DELETE FROM repository_users")
+        self._connection.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                     [('start_day', start_day), ('end_day', end_day)])
+        self._connection.commit()
+    
+    def get_watermark(self, project_id, branch):
+        """
+        获取分支的水位线
+        
+        Returns:
+            Watermark 对象，尚未统计过时返回 None
+        """
+        row = self._connection.execute(
+            "SELECT committed_at, boundary_shas FROM watermarks WHERE project_id = ? AND branch = ?",
+            (project_id, branch)
+        ).fetchone()
+        if row is None:
+            return None
+        return Watermark(row[0], json.loads(row[1]))
+    
+    def merge(self, project_id, branch, users, commits, watermark):
+        """
+        把分支新提交的统计合并到累计统计中，并推进水位线
+        
+        Args:
+            project_id: 仓库 ID
+            branch: 分支名称
+            users: 本次新提交按用户汇总的 CommitRepositoryUser 列表
+            commits: 本次统计的新提交列表
+            watermark: 原来的水位线，可能为 None
+        """
+        if not commits:
+            return
+        with self._connection:
+            for user in users:
+                self._connection.execute(
+                    "INSERT INTO repository_users (project_id, branch, email, repository_name, username, "
+                    "commit_total, total, additions, deletions) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (project_id, branch, email) DO UPDATE SET "
+                    "repository_name = excluded.repository_name, username = excluded.username, "
+                    "commit_total = commit_total + excluded.commit_total, total = total + excluded.total, "
+                    "additions = additions + excluded.additions, deletions = deletions + excluded.deletions",
+                    (project_id, branch, user.email, user.repository_name, user.username,
+                     user.commit_total, user.total, user.additions, user.deletions)
+                )
+            # 新水位线为最新提交的时间；同一时间点上的提交全部记录下来，下次运行时跳过
+            latest = max(commits, key=lambda c: c.committed_at)
+            boundary_shas = {c.id for c in commits if c.committed_at == latest.committed_at}
+            if watermark is not None and watermark.committed_at == latest.committed_at:
+                boundary_shas |= watermark.shas
+            self._connection.execute(
+                "INSERT OR REPLACE INTO watermarks (project_id, branch, committed_at, sha, boundary_shas) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (project_id, branch, latest.committed_at, latest.id, json.dumps(sorted(boundary_shas)))
+            )
+    
+    def load_users(self, project_id, branch):
+        """
+        读取分支的累计统计
+        
+        Returns:
+            list: CommitRepositoryUser 列表，按首次统计到的顺序排列
+        """
+        users = []
+        for row in self._connection.execute(
+                "SELECT email, repository_name, username, commit_total, total, additions, deletions "
+                "FROM repository_users WHERE project_id = ? AND branch = ? ORDER BY seq",
+                (project_id, branch)):
+            user = CommitRepositoryUser()
+            user.email, user.repository_name, user.username, user.commit_total, user.total, \
+                user.additions, user.deletions = row
+            users.append(user)
+        return users
+
+
+class GitLabClient:
+    """
+    GitLab API 客户端，所有请求共享同一个连接池
+    
+    - 使用 requests.Session 复用 TCP/TLS 连接，连接池大小与单主机并发数一致
+    - 按主机和仓库限制同时进行的请求数
+    - 连接失败、超时、429 和 5xx 响应按指数退避（带随机抖动）重试，优先使用 Retry-After 响应头给出的等待时间
+    - 根据 RateLimit-Remaining / RateLimit-Reset 响应头自适应限速：剩余次数不足时把请求均匀分布到重置时间之前，
+      收到 429 时所有线程一起暂停
+    """
+    
+    # 需要重试的响应状态码
+    RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+    
+    # 剩余请求次数低于限额的该比例时开始限速
+    RATE_LIMIT_THRESHOLD = 0.1
+    
+    def __init__(self, timeout, max_retries, backoff, backoff_max, max_per_host, max_per_project):
+        """
+        初始化客户端
+        
+        Args:
+            timeout: 单次请求的超时时间（秒）
+            max_retries: 最大重试次数
+            backoff: 第一次重试的基础等待时间（秒），之后每次翻倍
+            backoff_max: 单次重试的最大等待时间（秒）
+            max_per_host: 同一个主机同时进行的最大请求数
+            max_per_project: 同一个仓库同时进行的最大请求数
+        """
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.max_per_host = max_per_host
+        self.max_per_project = max_per_project
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max_per_host)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # 按主机和仓库限制并发请求数的信号量，按需创建
+        self._semaphores = {}
+        self._semaphores_lock = threading.Lock()
+        # 限速状态：下一个请求最早的发送时间，以及剩余次数不足时相邻请求的最小间隔
+        self._throttle_lock = threading.Lock()
+        self._next_request_at = 0.0
+        self._interval = 0.0
+    
+    def _get_semaphore(self, key, limit):
+        """获取（或创建）指定键的信号量，如 ("host", "git.tyjfwy.com") 或 ("project", 123)"""
+        with self._semaphores_lock:
+            semaphore = self._semaphores.get(key)
+            if semaphore is None:
+                semaphore = self._semaphores[key] = threading.BoundedSemaphore(limit)
+            return semaphore
+    
+    def get(self, url, project_id=None):
+        """
+        发送 GET 请求，失败时按策略重试
+        
+        Args:
+            url: 请求的 URL
+            project_id: 请求所属的仓库 ID（可选），指定后同时受单仓库并发数限制
+        
+        Returns:
+            requests.Response 对象；重试次数用完时返回最后一次的响应
+        
+        Raises:
+            requests.RequestException: 重试次数用完后仍然无法连接或超时
+        """
+        host_semaphore = self._get_semaphore(("host", urllib.parse.urlsplit(url).netloc), self.max_per_host)
+        project_semaphore = self._get_semaphore(("project", project_id), self.max_per_project) \
+            if project_id is not None else nullcontext()
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_slot()
+            response = None
+            # 先占用仓库的名额再占用主机的名额，避免等待仓库名额时占着主机名额不放
+            with project_semaphore, host_semaphore:
+                try:
+                    response = self.session.get(url, timeout=self.timeout)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    if attempt == self.max_retries:
+                        raise
+                    reason = type(e).__name__
+            if response is not None:
+                self._update_rate_limit(response)
+                if response.status_code not in self.RETRY_STATUS_CODES or attempt == self.max_retries:
+                    return response
+                reason = f"状态码 {response.status_code}"
+            delay = self._get_retry_delay(response, attempt)
+            if response is not None and response.status_code == 429:
+                # 触发频率限制时所有线程一起暂停
+                self._pause(delay)
+            print(f"⚠ 请求失败（{reason}），{delay:.1f} 秒后第 {attempt + 1} 次重试: {mask_token(url)}")
+            time.sleep(delay)
+    
+    def _get_retry_delay(self, response, attempt):
+        """
+        计算重试前的等待时间：优先使用服务端给出的 Retry-After / RateLimit-Reset 响应头（不受退避上限限制），
+        否则按指数退避并加入随机抖动
+        """
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "").strip()
+            if retry_after.isdigit():
+                return float(retry_after)
+            reset = response.headers.get("RateLimit-Reset", "").strip()
+            if response.status_code == 429 and reset.isdigit():
+                return max(float(reset) - time.time(), 0.0)
+        # 完全抖动（full jitter）：在 [0, 退避上限] 之间随机取值，避免多个线程同时重试
+        return random.uniform(0, min(self.backoff * (2 ** attempt), self.backoff_max))
+    
+    def _wait_for_slot(self):
+        """按当前的限速状态等待，直到可以发送下一个请求"""
+        with self._throttle_lock:
+            now = time.monotonic()
+            send_at = max(now, self._next_request_at)
+            self._next_request_at = send_at + self._interval
+        if send_at > now:
+            time.sleep(send_at - now)
+    
+    def _pause(self, delay):
+        """暂停所有请求 delay 秒"""
+        with self._throttle_lock:
+            self._next_request_at = max(self._next_request_at, time.monotonic() + delay)
+    
+    def _update_rate_limit(self, response):
+        """根据 RateLimit-* 响应头调整相邻请求的最小间隔"""
+        headers = response.headers
+        remaining = headers.get("RateLimit-Remaining", "").strip()
+        limit = headers.get("RateLimit-Limit", "").strip()
+        reset = headers.get("RateLimit-Reset", "").strip()
+        if not (remaining.isdigit() and limit.isdigit() and reset.isdigit()):
+            return
+        remaining, limit = int(remaining), int(limit)
+        with self._throttle_lock:
+            if remaining >= limit * self.RATE_LIMIT_THRESHOLD:
+                self._interval = 0.0
+            else:
+                # 剩余次数不足时，把剩余的请求均匀分布到重置时间之前
+                self._interval = max(int(reset) - time.time(), 0.0) / max(remaining, 1)
+
+
+def mask_token(url):
+    """隐藏 URL 中的 private_token，用于输出日志"""
+    return url.replace(f"private_token={token}", "private_token=***") if token else url
+
+
+"""GitLab API 客户端，所有请求共享"""
+gitlab_client = GitLabClient(request_timeout, max_retries, retry_backoff, retry_backoff_max,
+                             max_requests_per_host, max_requests_per_project)
+
+
 def parse_gitlab_datetime(datetime_str):
     """
     解析 GitLab API 返回的时间字符串
@@ -211,56 +627,144 @@ def safe_json_response(response, url, error_context=""):
         raise Exception(error_msg)
 
 
-def get_all_commits(repository, branch_name=None):
+def get_next_page_url(response, url):
+    """
+    根据分页响应头确定下一页的 URL
+    优先使用 Link 响应头（keyset 分页只提供该响应头），其次使用 X-Next-Page 响应头
+    
+    Args:
+        response: 当前页的 requests.Response 对象
+        url: 当前页的 URL
+    
+    Returns:
+        str: 下一页的 URL，已经是最后一页时返回 None
+    """
+    next_link = response.links.get('next', {}).get('url')
+    if next_link:
+        # 部分 GitLab 版本生成的 Link 中不包含 private_token，补充上去
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(next_link).query)
+        if 'private_token' not in query and 'private_token=' in url:
+            next_link += ('&' if '?' in next_link else '?') + f"private_token={token}"
+        return next_link
+    next_page = response.headers.get('X-Next-Page', '').strip()
+    if not next_page:
+        return None
+    parts = urllib.parse.urlsplit(url)
+    query = [(key, value) for key, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True) if key != 'page']
+    query.append(('page', next_page))
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query)))
+
+
+def iter_pages(url, project_id=None, error_context=""):
+    """
+    分页请求列表接口，逐条返回记录
+    
+    按响应头（Link / X-Next-Page）逐页请求，每次只在内存中保留一页数据；
+    调用方可以在获取到部分记录后立即开始处理，不需要等待整个列表获取完成
+    
+    Args:
+        url: 第一页的 URL（应包含 per_page 参数）
+        project_id: 请求所属的仓库 ID（可选），用于限制单仓库并发数
+        error_context: 错误上下文描述（用于错误信息）
+    
+    Yields:
+        dict: 列表中的每条记录
+    
+    Raises:
+        Exception: 任意一页请求失败或无法解析时抛出异常
+    """
+    page = 1
+    while url:
+        response = gitlab_client.get(url, project_id)
+        records = safe_json_response(response, url, f"{error_context}（第 {page} 页）")
+        yield from records
+        url = get_next_page_url(response, url)
+        page += 1
+
+
+def to_utc_string(datetime_str):
+    """
+    把 GitLab API 返回的时间字符串转换为 UTC 时间字符串（格式固定，可直接按字符串比较大小）
+    
+    Args:
+        datetime_str: GitLab API 返回的时间字符串
+    
+    Returns:
+        str: 如 2025-11-12T09:42:47.459000Z
+    """
+    value = parse_gitlab_datetime(datetime_str)
+    if value.tzinfo:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value.strftime(datetime_format)
+
+
+def get_all_commits(repository, branch_name=None, since=None, on_commit=None):
     """
     获取该仓库指定时间内，指定分支的所有提交
     
     Args:
         repository: Repository 对象
         branch_name: 分支名称，如果为 None 则使用仓库的默认分支
+        since: 起始时间字符串（可选，增量统计时为水位线），默认使用统计的开始日期
+        on_commit: 每获取到一个提交时调用的函数（可选），用于在列表获取完成前提前请求提交的统计信息
+    
+    提交列表请求时带 with_stats=true，GitLab 在列表中直接返回每个提交的统计信息（Commit.stats），
+    不支持该参数的 GitLab 版本返回的记录中没有 stats 字段，此时 Commit.stats 为 None，需要单独请求
     
     Returns:
-        dict: 以用户邮箱为键，提交列表为值的字典
+        dict: 以用户邮箱为键，提交列表为值的字典，指定时间范围内没有提交时为空字典；
+        重试后仍然获取失败时返回 None
     """
     # 确定要统计的分支
     if branch_name is None:
         branch_name = repository.default_branch or "main"
     
-    since_date = start_date.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    since_date = since or start_date.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
     until_date = end_date.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
-    url = f"{root_url}/api/v4/projects/{repository.id}/repository/commits?page=1&per_page=10000&ref_name={branch_name}&since={since_date}&until={until_date}&private_token={token}"
+    encoded_branch = urllib.parse.quote(branch_name, safe='')
+    url = f"{root_url}/api/v4/projects/{repository.id}/repository/commits?per_page={per_page}&with_stats=true&ref_name={encoded_branch}&since={since_date}&until={until_date}&private_token={token}"
     
+    # 根据提交用户分组
+    user_dict = defaultdict(list)
+    commit_count = 0
     try:
-        response = requests.get(url)
-        commits = safe_json_response(response, url, f"获取仓库 {repository.name} 分支 {branch_name} 的提交记录")
+        for commit_record in iter_pages(url, repository.id, f"获取仓库 {repository.name} 分支 {branch_name} 的提交记录"):
+            commit = Commit()
+            commit.id = commit_record['id']
+            commit.repository_name = repository.name
+            commit.committer_name = commit_record['committer_name']
+            commit.committer_email = commit_record['committer_email']
+            commit.committed_at = to_utc_string(commit_record['committed_date'])
+            if commit_record.get('stats') is not None:
+                commit.stats = CommitStats()
+                commit.stats.total = commit_record['stats'].get('total', 0)
+                commit.stats.deletions = commit_record['stats'].get('deletions', 0)
+                commit.stats.additions = commit_record['stats'].get('additions', 0)
+            user_dict[commit.committer_email].append(commit)
+            commit_count += 1
+            if on_commit is not None:
+                on_commit(commit)
     except Exception as e:
         print(f"⚠ 获取仓库 {repository.name} 分支 {branch_name} 的提交记录失败: {str(e)}")
         return None
     
-    if len(commits) == 0:
+    if commit_count == 0:
         print(f"  ℹ 仓库 {repository.name} 分支 {branch_name} 在指定时间范围内没有提交")
-        return None
+        return {}
     
-    print(f"  ✓ 仓库 {repository.name} 分支 {branch_name}: 找到 {len(commits)} 个提交")
-    
-    # 根据提交用户分组
-    user_dict = defaultdict(list)
-    for commit_record in commits:
-        commit = Commit()
-        commit.id = commit_record['id']
-        commit.repository_name = repository.name
-        commit.committer_name = commit_record['committer_name']
-        commit.committer_email = commit_record['committer_email']
-        user_dict[commit.committer_email].append(commit)
-
+    print(f"  ✓ 仓库 {repository.name} 分支 {branch_name}: 找到 {commit_count} 个提交")
     return user_dict
 
 
 def get_commit_stats(repository_id, commit_id):
-    """获取每个提交的明细"""
+    """获取每个提交的明细，优先使用提交统计缓存（提交列表中已包含统计信息时不需要调用）"""
+    if stats_cache is not None:
+        stats = stats_cache.get(repository_id, commit_id)
+        if stats is not None:
+            return stats
     url = f"{root_url}/api/v4/projects/{repository_id}/repository/commits/{commit_id}?private_token={token}"
     try:
-        response = requests.get(url)
+        response = gitlab_client.get(url, repository_id)
         detail = safe_json_response(response, url, f"获取提交 {commit_id} 的统计信息")
     except Exception as e:
         print(f"获取提交 {commit_id} 的统计信息失败: {str(e)}")
@@ -269,12 +773,16 @@ def get_commit_stats(repository_id, commit_id):
         stats.total = 0
         stats.deletions = 0
         stats.additions = 0
+        stats.failed = True
         return stats
     
     stats = CommitStats()
     stats.total = detail.get('stats', {}).get('total', 0)
     stats.deletions = detail.get('stats', {}).get('deletions', 0)
     stats.additions = detail.get('stats', {}).get('additions', 0)
+    # 只缓存请求成功的结果，失败时返回的空统计下次运行会重新请求
+    if stats_cache is not None:
+        stats_cache.put(repository_id, commit_id, stats)
     return stats
 
 
@@ -290,13 +798,11 @@ def get_project_by_path(project_path):
     Returns:
         Repository 对象，如果获取失败或不符合时间范围返回 None
     """
-    import urllib.parse
-    
     # 首先尝试直接通过路径获取（支持完整路径或项目 ID）
     encoded_path = urllib.parse.quote(project_path, safe='')
     url = f"{root_url}/api/v4/projects/{encoded_path}?private_token={token}"
     try:
-        response = requests.get(url)
+        response = gitlab_client.get(url)
         e = safe_json_response(response, url, f"获取项目 {project_path}")
         
         # 检查时间范围
@@ -338,12 +844,11 @@ def get_project_by_search(project_name):
     Returns:
         Repository 对象，如果未找到或不符合时间范围返回 None
     """
-    import urllib.parse
     encoded_name = urllib.parse.quote(project_name, safe='')
     # 使用搜索 API，搜索项目名称
     url = f"{root_url}/api/v4/projects?search={encoded_name}&private_token={token}&per_page=100"
     try:
-        response = requests.get(url)
+        response = gitlab_client.get(url)
         projects = safe_json_response(response, url, f"搜索项目 {project_name}")
         
         # 查找完全匹配的项目名称
@@ -386,6 +891,33 @@ def get_project_by_search(project_name):
         return None
 
 
+def get_branches_to_stat(repository):
+    """
+    确定仓库要统计的分支列表
+    优先使用 project_branch_map 中的配置，如果没有则使用全局的 specified_branches
+    
+    Args:
+        repository: Repository 对象
+    
+    Returns:
+        list: 分支名称列表，None 表示使用默认分支
+    """
+    if project_branch_map and repository.path in project_branch_map:
+        config = project_branch_map[repository.path]
+        branches_to_stat = []
+        # 如果需要包含默认分支，添加 None（None 表示使用默认分支）
+        if config["include_default"]:
+            branches_to_stat.append(None)
+        # 添加指定的分支
+        branches_to_stat.extend(config["branches"])
+        # 如果没有配置任何分支，使用默认分支
+        if not branches_to_stat:
+            branches_to_stat = [None]
+        return branches_to_stat
+    # 使用全局分支配置
+    return specified_branches if specified_branches else [None]  # None 表示使用默认分支
+
+
 def start():
     """启动统计"""
     repositories = []
@@ -393,8 +925,10 @@ def start():
     # 如果指定了要统计的仓库，则只获取指定的仓库
     if specified_projects:
         print(f"指定了 {len(specified_projects)} 个仓库进行统计：{', '.join(specified_projects)}")
-        for project_identifier in specified_projects:
-            repository = get_project_by_path(project_identifier)
+        # 并发获取仓库信息，结果按配置顺序收集
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            fetched_repositories = list(executor.map(get_project_by_path, specified_projects))
+        for project_identifier, repository in zip(specified_projects, fetched_repositories):
             if repository:
                 repositories.append(repository)
                 print(f"✓ 已添加仓库: {repository.path} ({repository.name})")
@@ -407,26 +941,11 @@ def start():
     else:
         # 如果未指定仓库，则获取所有仓库
         print("未指定仓库，将统计所有仓库...")
-        for i in range(1, 100):
-            # 返回的每页的最大数量是有限制的，所以分页查询
-            url = f"{query_repository_list_url}&page={i}"
-            try:
-                response = requests.get(url)
-                res = safe_json_response(response, url, f"获取第 {i} 页仓库列表")
-            except Exception as e:
-                print(f"获取第 {i} 页仓库列表失败: {str(e)}")
-                # 如果第一页就失败，说明可能是配置问题，直接退出
-                if i == 1:
-                    print("无法获取仓库列表，请检查配置（URL、Token等）是否正确")
-                    return
-                # 其他页失败，可能是已经到最后一页了，退出循环
-                break
-            
-            # print(f"仓库总数量：{len(res)}")
-            if len(res) <= 0:
-                break
-            # 先遍历所有的仓库
-            for e in res:
+        project_count = 0
+        try:
+            # 按分页响应头逐页获取所有仓库
+            for e in iter_pages(query_repository_list_url, error_context="获取仓库列表"):
+                project_count += 1
                 last_active_time = parse_gitlab_datetime(e['last_activity_at'])
                 # 转换为本地时间进行比较（去掉时区信息）
                 if last_active_time.tzinfo:
@@ -454,6 +973,12 @@ def start():
                     continue
 
                 repositories.append(repository)
+        except Exception as error:
+            print(f"获取仓库列表失败: {str(error)}")
+            # 如果第一页就失败，说明可能是配置问题，直接退出
+            if project_count == 0:
+                print("无法获取仓库列表，请检查配置（URL、Token等）是否正确")
+                return
     print(f"本轮需要统计的仓库数量: {len(repositories)}")
     for r in repositories:
         # 显示每个仓库对应的分支配置
@@ -486,58 +1011,117 @@ def start():
     else:
         print(f"\n未指定分支，将使用各仓库的默认分支")
     
+    # 增量统计时读取每个分支的水位线，只获取水位线之后的提交
+    state = IncrementalState(incremental_state_path, start_day, end_day) if incremental else None
+    if state is not None:
+        print(f"\n已启用增量统计，状态文件: {incremental_state_path}")
+    
     user_commit_statistics_list = []
-    i = 0
-    # 获取每个仓库的统计信息
-    for repository in repositories:
-        # 确定要统计的分支列表
-        # 优先使用 project_branch_map 中的配置，如果没有则使用全局的 specified_branches
-        if project_branch_map and repository.path in project_branch_map:
-            config = project_branch_map[repository.path]
-            branches_to_stat = []
-            # 如果需要包含默认分支，添加 None（None 表示使用默认分支）
-            if config["include_default"]:
-                branches_to_stat.append(None)
-            # 添加指定的分支
-            branches_to_stat.extend(config["branches"])
-            # 如果没有配置任何分支，使用默认分支
-            if not branches_to_stat:
-                branches_to_stat = [None]
-        else:
-            # 使用全局分支配置
-            branches_to_stat = specified_branches if specified_branches else [None]  # None 表示使用默认分支
+    # 提交列表和提交统计使用不同的线程池：获取提交列表的线程较少，
+    # 已获取到的提交的统计请求不需要排在所有提交列表请求之后
+    with ThreadPoolExecutor(max_workers=max_workers) as executor, \
+            ThreadPoolExecutor(max_workers=max(1, max_workers // 4)) as listing_executor:
+        # 提交列表中没有统计信息时（GitLab 不支持 with_stats），每获取到一个提交就提交它的统计请求，
+        # 同一个提交出现在多个分支中时只请求一次
+        stats_futures = {}
+        stats_lock = threading.Lock()
         
-        # 遍历每个分支
-        for branch_name in branches_to_stat:
-            branch_display = branch_name if branch_name else repository.default_branch
-            print(f"\n正在统计仓库 {repository.name} 的分支: {branch_display}")
-            
-            # 当前仓库，每个用户的所有提交记录
-            user_commits_dict = get_all_commits(repository, branch_name)
+        def request_stats(repository_id, commit_id):
+            key = (repository_id, commit_id)
+            with stats_lock:
+                if key not in stats_futures:
+                    stats_futures[key] = executor.submit(get_commit_stats, repository_id, commit_id)
+        
+        def prefetch_stats(repository_id, skip_shas):
+            def on_commit(commit):
+                if commit.stats is None and commit.id not in skip_shas:
+                    request_stats(repository_id, commit.id)
+            return on_commit
+        
+        # 并发获取每个仓库每个分支的提交记录
+        commit_tasks = []
+        submitted_branches = set()
+        for repository in repositories:
+            for branch_name in get_branches_to_stat(repository):
+                branch_key = branch_name or repository.default_branch or "main"
+                watermark = None
+                if state is not None:
+                    # 同一分支重复配置时只统计一次，避免重复合并
+                    if (repository.id, branch_key) in submitted_branches:
+                        continue
+                    submitted_branches.add((repository.id, branch_key))
+                    watermark = state.get_watermark(repository.id, branch_key)
+                since = watermark.committed_at if watermark is not None else None
+                skip_shas = watermark.shas if watermark is not None else set()
+                future = listing_executor.submit(get_all_commits, repository, branch_name, since,
+                                                 prefetch_stats(repository.id, skip_shas))
+                commit_tasks.append((repository, branch_name, branch_key, watermark, future))
+        
+        # 按提交顺序收集提交记录
+        branch_results = []
+        # 提交列表获取失败的分支，统计结束时与获取失败的提交统计一起提示
+        failed_branches = []
+        for repository, branch_name, branch_key, watermark, future in commit_tasks:
+            user_commits_dict = future.result()
             if user_commits_dict is None:
+                failed_branches.append(f"{repository.path}:{branch_key}")
+                user_commits_dict = {}
+            if watermark is not None:
+                # since 包含水位线时间点本身，跳过该时间点上已统计过的提交
+                user_commits_dict = {
+                    email: [commit for commit in commits if commit.id not in watermark.shas]
+                    for email, commits in user_commits_dict.items()
+                }
+                user_commits_dict = {email: commits for email, commits in user_commits_dict.items() if commits}
+            if not user_commits_dict and state is None:
                 continue
-            # i += 1
-            # if i > 2:
-            #     break
+            branch_results.append((repository, branch_name, branch_key, watermark, user_commits_dict))
+        
+        # 按与串行执行相同的顺序汇总，保证输出结果一致
+        failed_commit_count = 0
+        for repository, branch_name, branch_key, watermark, user_commits_dict in branch_results:
+            branch_display = branch_name if branch_name else repository.default_branch
+            print(f"\n正在统计仓库 {repository.name} 的分支: {branch_display}")
+            branch_users = []
+            branch_commits = []
+            failed = False
             for email, commits in user_commits_dict.items():
                 user = CommitRepositoryUser()
                 user.email = email
                 user.repository_name = repository.name
-                exist = []
+                exist = set()
                 for commit in commits:
                     # 避免重复（跨分支可能有相同的提交）
                     if commit.id in exist:
                         continue
-                    exist.append(commit.id)
+                    exist.add(commit.id)
+                    branch_commits.append(commit)
                     user.username = commit.committer_name
                     user.commit_total += 1
-                    stats = get_commit_stats(repository.id, commit.id)
+                    stats = commit.stats or stats_futures[(repository.id, commit.id)].result()
+                    if stats.failed:
+                        failed = True
+                        failed_commit_count += 1
                     user.total += stats.total
                     user.additions += stats.additions
                     user.deletions += stats.deletions
                 print(
                     f"    [{repository.name}] {user.username} ({user.email}): 提交数={user.commit_total}, 总行数={user.total}, 新增={user.additions}, 删除={user.deletions}")
-                user_commit_statistics_list.append(user)
+                branch_users.append(user)
+            
+            if state is None:
+                user_commit_statistics_list.extend(branch_users)
+                continue
+            # 增量统计：有提交获取统计信息失败时不合并、不推进水位线，下次运行重新统计这些提交
+            if failed:
+                print(f"  ⚠ 仓库 {repository.name} 分支 {branch_display} 有提交的统计信息获取失败，本次不更新该分支的累计统计")
+            else:
+                state.merge(repository.id, branch_key, branch_users, branch_commits, watermark)
+                if branch_commits:
+                    print(f"  ✓ 新增 {len(branch_commits)} 个提交已合并到累计统计")
+            user_commit_statistics_list.extend(state.load_users(repository.id, branch_key))
+    if stats_cache is not None:
+        stats_cache.flush()
     print("\n✓ 用户统计完成")
     #
     # 计算每个用户的提交总数
@@ -596,6 +1180,14 @@ def start():
         for line in repository_out_lines:
             csvfile.write(line + "\r\n")
     print(f"\n✓ 仓库统计已保存到 repository-output.csv")
+    
+    # 获取失败的数据放在最后汇总提示，避免淹没在统计过程的输出中
+    if failed_branches or failed_commit_count:
+        print("\n⚠ 以下数据在重试后仍然获取失败，统计报告不完整，请检查网络或稍后重新运行：")
+        if failed_branches:
+            print(f"  - {len(failed_branches)} 个分支的提交列表获取失败，本次未统计这些分支的提交: {', '.join(failed_branches)}")
+        if failed_commit_count:
+            print(f"  - {failed_commit_count} 个提交的统计信息获取失败，报告中按 0 行计入")
 class Repository:
     """仓库信息，只定义关注的字段"""
     id = None
@@ -612,6 +1204,10 @@ class Commit:
     committer_name = None
     committer_email = None
     repository_name = None
+    # 提交时间（UTC 时间字符串）
+    committed_at = None
+    # 提交列表中返回的统计信息（CommitStats），GitLab 不支持 with_stats 时为 None
+    stats = None
 
 
 class CommitStats:
@@ -619,6 +1215,8 @@ class CommitStats:
     additions = 0
     deletions = 0
     total = 0
+    # 获取统计信息失败（此时各项统计为 0）
+    failed = False
 
 
 class CommitUser:
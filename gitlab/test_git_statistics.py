@@ -0,0 +1,204 @@
+# test_git_statistics.py
+"""
+分页请求测试（使用本地的模拟 GitLab 服务）和增量统计状态测试
+
+运行方式：python -m unittest test_git_statistics
+"""
+import importlib
+import json
+import os
+import tempfile
+import threading
+import unittest
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TOKEN = "test-token"
+PROJECT_COUNT = 250
+COMMIT_COUNTS = {1: 250, 2: 100, 3: 0}
+
+
+def make_commit(project_id, index):
+    return {
+        "id": f"{project_id:02d}{index:038d}",
+        "committer_name": f"user{index % 3}",
+        "committer_email": f"user{index % 3}@example.com",
+        "committed_date": f"2023-01-{1 + index % 28:02d}T10:00:00.000+08:00",
+        "stats": {"additions": index, "deletions": 1, "total": index + 1},
+    }
+
+
+class FakeGitLabHandler(BaseHTTPRequestHandler):
+    """模拟 GitLab 的仓库列表（keyset 分页）和提交列表（页码分页）接口，单页最多 100 条"""
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, data, headers=()):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parts = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(parts.query))
+        self.server.requests.append((parts.path, query))
+        if query.get("private_token") != TOKEN:
+            self.send_response(401)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        per_page = min(int(query.get("per_page", 20)), 100)
+        if parts.path == "/api/v4/projects":
+            # keyset 分页：只返回 Link 响应头，且下一页链接中不包含 private_token
+            id_after = int(query.get("id_after", 0))
+            ids = list(range(id_after + 1, min(id_after + per_page, PROJECT_COUNT) + 1))
+            headers = []
+            if ids and ids[-1] < PROJECT_COUNT:
+                next_url = (f"http://127.0.0.1:{self.server.server_port}/api/v4/projects?pagination=keyset"
+                            f"&per_page={per_page}&order_by=id&sort=asc&id_after={ids[-1]}")
+                headers.append(("Link", f'<{next_url}>; rel="next"'))
+            self.send_json([{"id": project_id} for project_id in ids], headers)
+            return
+        # /api/v4/projects/<id>/repository/commits：按页码分页，最后一页的 X-Next-Page 为空
+        project_id = int(parts.path.split("/")[4])
+        page = int(query.get("page", 1))
+        total = COMMIT_COUNTS[project_id]
+        start = (page - 1) * per_page
+        commits = [make_commit(project_id, index) for index in range(start, min(start + per_page, total))]
+        next_page = str(page + 1) if start + per_page < total else ""
+        self.send_json(commits, [("X-Page", str(page)), ("X-Next-Page", next_page)])
+
+
+server = None
+git_statistics = None
+
+
+def setUpModule():
+    """启动模拟 GitLab 服务，并在导入 git_statistics 前设置环境变量（未设置 GITLAB_TOKEN 时导入会报错）"""
+    global server, git_statistics
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGitLabHandler)
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["GITLAB_ROOT_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["GITLAB_TOKEN"] = TOKEN
+    os.environ["STATS_CACHE_PATH"] = ""
+    os.environ["MAX_RETRIES"] = "0"
+    git_statistics = importlib.import_module("git_statistics")
+
+
+def tearDownModule():
+    server.shutdown()
+    server.server_close()
+
+
+def make_repository(project_id):
+    repository = git_statistics.Repository()
+    repository.id = project_id
+    repository.name = f"project{project_id}"
+    repository.path = f"group/project{project_id}"
+    repository.default_branch = "main"
+    return repository
+
+
+class PaginationTest(unittest.TestCase):
+
+    def setUp(self):
+        server.requests.clear()
+
+    def get_requests(self, path):
+        return [query for request_path, query in server.requests if request_path == path]
+
+    def test_keyset_pagination_follows_link_header(self):
+        projects = list(git_statistics.iter_pages(git_statistics.query_repository_list_url))
+        self.assertEqual([project["id"] for project in projects], list(range(1, PROJECT_COUNT + 1)))
+        requests = self.get_requests("/api/v4/projects")
+        self.assertEqual(len(requests), 3)
+        # Link 中缺少的 private_token 会被补充上去
+        self.assertTrue(all(query.get("private_token") == TOKEN for query in requests))
+        self.assertEqual([query.get("id_after") for query in requests], [None, "100", "200"])
+
+    def test_offset_pagination_follows_x_next_page(self):
+        user_dict = git_statistics.get_all_commits(make_repository(1))
+        commits = [commit for commits in user_dict.values() for commit in commits]
+        # 超过 100 个提交的分支不会被截断
+        self.assertEqual(len(commits), COMMIT_COUNTS[1])
+        self.assertEqual(len({commit.id for commit in commits}), COMMIT_COUNTS[1])
+        requests = self.get_requests("/api/v4/projects/1/repository/commits")
+        self.assertEqual([query.get("page") for query in requests], [None, "2", "3"])
+        self.assertTrue(all(query["per_page"] == "100" and query["with_stats"] == "true" for query in requests))
+
+    def test_empty_x_next_page_ends_listing(self):
+        user_dict = git_statistics.get_all_commits(make_repository(2))
+        self.assertEqual(sum(len(commits) for commits in user_dict.values()), COMMIT_COUNTS[2])
+        # 第一页正好 100 条、X-Next-Page 为空时不再请求下一页
+        self.assertEqual(len(self.get_requests("/api/v4/projects/2/repository/commits")), 1)
+
+    def test_no_commits_returns_empty_dict(self):
+        self.assertEqual(git_statistics.get_all_commits(make_repository(3)), {})
+
+    def test_on_commit_fires_before_listing_finishes(self):
+        pages_requested = []
+
+        def on_commit(commit):
+            pages_requested.append(len(self.get_requests("/api/v4/projects/1/repository/commits")))
+
+        git_statistics.get_all_commits(make_repository(1), on_commit=on_commit)
+        self.assertEqual(len(pages_requested), COMMIT_COUNTS[1])
+        # 第一个提交在只请求了第一页时就已经回调
+        self.assertEqual(pages_requested[0], 1)
+        self.assertEqual(pages_requested[-1], 3)
+
+
+class IncrementalStateTest(unittest.TestCase):
+    """统计区间变化时增量统计状态的处理"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory(ignore_cleanup_errors=True)
+        self.path = os.path.join(self.directory.name, "incremental.sqlite3")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def open_state(self, start_day, end_day):
+        return git_statistics.IncrementalState(self.path, start_day, end_day)
+
+    def save_commit(self, start_day, end_day):
+        """保存一个分支的统计结果和水位线"""
+        commit = git_statistics.Commit()
+        commit.id = "a" * 40
+        commit.committed_at = "2024-06-01T00:00:00.000000Z"
+        user = git_statistics.CommitRepositoryUser()
+        user.email, user.repository_name, user.username = "user@example.com", "project", "user"
+        user.commit_total, user.total, user.additions, user.deletions = 1, 2, 1, 1
+        self.open_state(start_day, end_day).merge(1, "main", [user], [commit], None)
+
+    def has_saved_state(self, start_day, end_day):
+        return self.open_state(start_day, end_day).get_watermark(1, "main") is not None
+
+    def test_end_day_moving_later_or_empty_keeps_state(self):
+        self.save_commit("2022-01-01", "2024-12-01")
+        self.assertTrue(self.has_saved_state("2022-01-01", "2025-01-01"))
+        self.assertTrue(self.has_saved_state("2022-01-01", ""))
+        self.assertTrue(self.has_saved_state("2022-01-01", ""))
+
+    def test_end_day_moving_earlier_resets_state(self):
+        self.save_commit("2022-01-01", "2025-01-01")
+        self.assertFalse(self.has_saved_state("2022-01-01", "2024-01-01"))
+
+    def test_end_day_set_after_empty_resets_state(self):
+        self.save_commit("2022-01-01", "")
+        self.assertFalse(self.has_saved_state("2022-01-01", "2030-01-01"))
+
+    def test_start_day_change_resets_state(self):
+        self.save_commit("2022-01-01", "2025-01-01")
+        self.assertFalse(self.has_saved_state("2023-01-01", "2025-01-01"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,475 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Mock服务性能基准测试
+
+在 mock 目录下运行：
+
+    # 路由表构建（接口注册）耗时和路由查找耗时
+    python benchmark.py registration --endpoints 100 1000 10000
+
+    # 压力测试：启动服务，使用多进程并发客户端请求，统计RPS、延迟分位数、内存和各阶段耗时
+    python benchmark.py load --endpoints 100 --template-fields 10 100 --concurrency 32 --duration 10
+
+    # 接口指标在请求处理路径上的额外开销
+    python benchmark.py metrics --iterations 1000000
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import Dict, Any, List, Callable, Optional, Tuple
+
+try:
+    import resource
+except ImportError:
+    # Windows 没有 resource 模块，不统计内存
+    resource = None
+
+
+def generate_config(endpoint_count: int, param_ratio: float = 0.5, template_fields: int = 10,
+                    validation: bool = False, log_request: bool = False,
+                    serializer: Optional[str] = None) -> Dict[str, Any]:
+    """
+    生成包含指定数量接口的合成配置
+
+    Args:
+        endpoint_count: 接口数量
+        param_ratio: 带路径参数的接口比例
+        template_fields: 每个响应模板的字段数量
+        validation: 是否为每个接口配置请求验证（必需查询参数 token）
+        log_request: 是否为每个接口开启请求日志
+        serializer: global_settings.serializer 配置
+
+    Returns:
+        配置字典
+    """
+    endpoints = []
+    param_count = int(endpoint_count * param_ratio)
+    for index in range(endpoint_count):
+        if index < param_count:
+            path = f"/api/resource{index}/<id>/detail"
+        else:
+            path = f"/api/service{index}/query"
+        template = {f"field{i}": f"value{i}" for i in range(template_fields)}
+        template['timestamp'] = '{{timestamp}}'
+        endpoint = {
+            'path': path,
+            'methods': ['GET', 'POST'],
+            'description': f"合成接口 {index}",
+            'response': {'status_code': 200, 'template': template},
+        }
+        if validation:
+            endpoint['request_validation'] = {'required_params': ['token']}
+        if log_request:
+            endpoint['log_request'] = True
+        endpoints.append(endpoint)
+    global_settings = {'serializer': serializer} if serializer else {}
+    return {'server': {}, 'endpoints': endpoints, 'global_settings': global_settings}
+
+
+def sample_request_paths(config: Dict[str, Any], count: int) -> List[str]:
+    """根据配置随机生成请求路径（路径参数替换为随机ID）"""
+    paths = []
+    endpoints = config['endpoints']
+    for _ in range(count):
+        path = random.choice(endpoints)['path']
+        paths.append(path.replace('<id>', str(random.randint(1, 10 ** 9))))
+    return paths
+
+
+def bench_registration(endpoint_counts: List[int], lookups: int) -> List[Dict[str, Any]]:
+    """
+    测试不同接口数量下路由表的构建耗时和查找耗时
+
+    Args:
+        endpoint_counts: 要测试的接口数量列表
+        lookups: 每组测试的查找次数
+
+    Returns:
+        测试结果列表
+    """
+    import main
+
+    results = []
+    for endpoint_count in endpoint_counts:
+        config = generate_config(endpoint_count)
+        started = time.perf_counter()
+        route_table = main.RouteTable(config)
+        build_seconds = time.perf_counter() - started
+
+        paths = sample_request_paths(config, lookups)
+        router = route_table.router
+        started = time.perf_counter()
+        for path in paths:
+            if router.match('GET', path).handler is None:
+                raise RuntimeError(f"路由查找失败: {path}")
+        lookup_seconds = time.perf_counter() - started
+
+        result = {
+            'endpoints': endpoint_count,
+            'build_ms': round(build_seconds * 1000, 2),
+            'build_us_per_endpoint': round(build_seconds * 1e6 / endpoint_count, 2),
+            'lookup_ns': round(lookup_seconds * 1e9 / lookups, 1),
+        }
+        results.append(result)
+        print(f"接口数量: {endpoint_count:>7}  构建路由表: {result['build_ms']:>9.2f} ms "
+              f"({result['build_us_per_endpoint']:.2f} us/接口)  路由查找: {result['lookup_ns']:>8.1f} ns/次")
+    return results
+
+
+class StageTimer:
+    """
+    阶段耗时统计 - 包装请求处理中的各个阶段函数，记录每次调用的耗时
+
+    只在压力测试进程中替换函数，不修改服务本身的代码
+    """
+
+    def __init__(self):
+        self.durations: Dict[str, List[float]] = {}
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        """
+        包装阶段函数
+
+        Args:
+            name: 阶段名称
+            func: 原函数
+
+        Returns:
+            记录耗时的包装函数
+        """
+        durations = self.durations.setdefault(name, [])
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                # list.append 是原子操作，多个服务线程可以同时记录
+                durations.append(time.perf_counter() - started)
+        return timed
+
+    def reset(self):
+        for durations in self.durations.values():
+            durations.clear()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """各阶段的调用次数、平均耗时和分位数（微秒）"""
+        result = {}
+        for name, durations in self.durations.items():
+            if not durations:
+                continue
+            values = sorted(durations)
+            result[name] = {
+                'count': len(values),
+                'avg_us': round(sum(values) * 1e6 / len(values), 2),
+                'p50_us': round(percentile(values, 50) * 1e6, 2),
+                'p99_us': round(percentile(values, 99) * 1e6, 2),
+            }
+        return result
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    """计算已排序数据的分位数（最近秩法）"""
+    if not sorted_values:
+        return 0.0
+    index = max(int(round(percent / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def get_peak_rss_mb() -> Optional[float]:
+    """当前进程的峰值常驻内存（MB），不支持的平台返回None"""
+    if resource is None:
+        return None
+    # Linux 上单位为KB，macOS 上单位为字节
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 1024 / (1024 if os.uname().sysname == 'Darwin' else 1), 1)
+
+
+def _client_process(port: int, paths: List[str], threads: int, duration: float) -> Tuple[List[float], int]:
+    """
+    压力测试客户端进程：多个线程各自保持一个长连接，循环发送请求直到测试结束
+
+    客户端运行在独立进程中，避免与服务线程争用GIL影响测试结果
+
+    Returns:
+        (每个请求的延迟秒数, 错误数)
+    """
+    latencies: List[float] = []
+    errors = [0]
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local_latencies = []
+        local_errors = 0
+        rng = random.Random()
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            path = rng.choice(paths)
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                ok = False
+            if ok:
+                local_latencies.append(time.perf_counter() - now)
+            else:
+                local_errors += 1
+        connection.close()
+        latencies.extend(local_latencies)
+        errors[0] += local_errors
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return latencies, errors[0]
+
+
+def start_benchmark_server(log_path: str) -> Tuple[Any, StageTimer]:
+    """
+    在当前进程中启动Mock服务（多线程WSGI服务器，随机端口），并包装各阶段函数
+
+    Args:
+        log_path: 请求日志文件路径
+
+    Returns:
+        (服务器对象, 阶段耗时统计)
+    """
+    import main
+    from request_logger import RequestLogger
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    # 压测期间不检查配置文件变化，请求日志写入临时文件
+    main.server_config['hot_reload'] = False
+    main.request_logger = RequestLogger({'output': 'file', 'path': log_path, 'policy': 'drop'})
+
+    stage_timer = StageTimer()
+    main.RequestValidator.validate = stage_timer.wrap('validation', main.RequestValidator.validate)
+    main.ResponseBuilder.build_response = stage_timer.wrap('template', main.ResponseBuilder.build_response)
+    # 预编码模式下模板构建和序列化合并为一次片段拼接
+    main.CompiledTemplate.render_fragments = stage_timer.wrap('pre_encoded', main.CompiledTemplate.render_fragments)
+    main._log_request = stage_timer.wrap('logging', main._log_request)
+
+    class KeepAliveRequestHandler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, main.app, threaded=True, request_handler=KeepAliveRequestHandler)
+    threading.Thread(target=server.serve_forever, name='benchmark-server', daemon=True).start()
+    return server, stage_timer
+
+
+def bench_load(endpoint_counts: List[int], template_fields_list: List[int], concurrency: int,
+               client_processes: int, duration: float, warmup: float,
+               validation: bool, log_request: bool, serializer: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    压力测试：对每组 (接口数量, 模板字段数) 生成合成配置，替换路由表后施加并发负载
+
+    Args:
+        endpoint_counts: 要测试的接口数量列表
+        template_fields_list: 要测试的模板字段数列表
+        concurrency: 并发连接总数
+        client_processes: 客户端进程数
+        duration: 每组测试的持续秒数
+        warmup: 每组测试的预热秒数
+        validation: 是否开启请求验证
+        log_request: 是否开启请求日志
+        serializer: 序列化后端（stdlib、orjson 或 pre_encoded）
+
+    Returns:
+        测试结果列表
+    """
+    import main
+
+    log_dir = tempfile.mkdtemp(prefix='mock-benchmark-')
+    server, stage_timer = start_benchmark_server(os.path.join(log_dir, 'requests.jsonl'))
+    port = server.server_port
+    client_processes = max(min(client_processes, concurrency), 1)
+    threads_per_process = [concurrency // client_processes + (1 if i < concurrency % client_processes else 0)
+                           for i in range(client_processes)]
+    # spawn 方式启动客户端进程，不继承服务线程
+    context = multiprocessing.get_context('spawn')
+
+    results = []
+    try:
+        with context.Pool(client_processes) as pool:
+            for endpoint_count in endpoint_counts:
+                for template_fields in template_fields_list:
+                    config = generate_config(endpoint_count, template_fields=template_fields,
+                                             validation=validation, log_request=log_request,
+                                             serializer=serializer)
+                    table = main.RouteTable(config)
+                    serializer_used = table.response_builder.serializer
+                    table.response_builder.serializer = stage_timer.wrap(
+                        'serialization', table.response_builder.serializer
+                    )
+                    main.route_table = table
+                    paths = [f"{path}?token=benchmark" if validation else path
+                             for path in sample_request_paths(config, 1000)]
+                    # 预热：建立连接、填充缓存，预热期间的请求和阶段耗时不计入结果
+                    if warmup > 0:
+                        pool.starmap(_client_process, [
+                            (port, paths, threads, warmup) for threads in threads_per_process
+                        ])
+                    stage_timer.reset()
+
+                    outputs = pool.starmap(_client_process, [
+                        (port, paths, threads, duration) for threads in threads_per_process
+                    ])
+                    latencies = sorted(latency for output in outputs for latency in output[0])
+                    errors = sum(output[1] for output in outputs)
+                    result = {
+                        'endpoints': endpoint_count,
+                        'template_fields': template_fields,
+                        'concurrency': concurrency,
+                        'serializer': serializer_used.backend + (' (pre_encoded)' if serializer_used.pre_encoded else ''),
+                        'requests': len(latencies),
+                        'errors': errors,
+                        'rps': round(len(latencies) / duration, 1),
+                        'latency_ms': {
+                            'p50': round(percentile(latencies, 50) * 1000, 3),
+                            'p95': round(percentile(latencies, 95) * 1000, 3),
+                            'p99': round(percentile(latencies, 99) * 1000, 3),
+                            'max': round(latencies[-1] * 1000, 3) if latencies else 0.0,
+                        },
+                        'peak_rss_mb': get_peak_rss_mb(),
+                        'stages': stage_timer.summary(),
+                    }
+                    results.append(result)
+                    latency = result['latency_ms']
+                    print(f"接口数量: {endpoint_count:>6}  模板字段: {template_fields:>5}  "
+                          f"RPS: {result['rps']:>9.1f}  p50/p95/p99: {latency['p50']:.2f}/"
+                          f"{latency['p95']:.2f}/{latency['p99']:.2f} ms  错误: {errors}  "
+                          f"峰值内存: {result['peak_rss_mb']} MB")
+                    for name, stage in result['stages'].items():
+                        print(f"    {name:<14} 平均 {stage['avg_us']:>9.2f} us  p99 {stage['p99_us']:>9.2f} us  "
+                              f"({stage['count']} 次)")
+    finally:
+        server.shutdown()
+    return results
+
+
+def bench_metrics(iterations: int) -> List[Dict[str, Any]]:
+    """
+    测试接口指标在请求处理路径上的额外开销
+
+    模拟一次请求的全部记录操作：4个阶段耗时 + 1次请求记录，以及对应的计时调用
+
+    Args:
+        iterations: 模拟的请求次数
+
+    Returns:
+        测试结果列表
+    """
+    from metrics import MetricsRegistry
+
+    registry = MetricsRegistry()
+    endpoints = [f"/api/service{index}/query" for index in range(100)]
+    perf_counter = time.perf_counter
+    stages = ('validation', 'logging', 'latency', 'response')
+
+    # 基准：相同的循环和计时调用，但不记录指标
+    started = perf_counter()
+    for index in range(iterations):
+        endpoint = endpoints[index % 100]
+        request_started = perf_counter()
+        for stage in stages:
+            stage_started = perf_counter()
+            perf_counter() - stage_started
+        perf_counter() - request_started
+    baseline = perf_counter() - started
+
+    started = perf_counter()
+    for index in range(iterations):
+        endpoint = endpoints[index % 100]
+        request_started = perf_counter()
+        for stage in stages:
+            stage_started = perf_counter()
+            registry.observe_stage(endpoint, stage, perf_counter() - stage_started)
+        registry.observe_request(endpoint, 'GET', 200, 512, perf_counter() - request_started)
+    elapsed = perf_counter() - started
+
+    started = perf_counter()
+    text = registry.render_prometheus()
+    render_ms = (perf_counter() - started) * 1000
+
+    result = {
+        'iterations': iterations,
+        'overhead_us_per_request': round(elapsed * 1e6 / iterations, 3),
+        'recording_us_per_request': round((elapsed - baseline) * 1e6 / iterations, 3),
+        'render_ms': round(render_ms, 2),
+        'render_bytes': len(text),
+    }
+    print(f"每个请求的指标开销: {result['overhead_us_per_request']:.3f} us "
+          f"(其中记录指标 {result['recording_us_per_request']:.3f} us，其余为计时调用)  "
+          f"输出Prometheus文本: {result['render_ms']:.2f} ms ({result['render_bytes']} 字节)")
+    return [result]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock服务性能基准测试')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    registration = subparsers.add_parser('registration', help='路由表构建和路由查找耗时')
+    registration.add_argument('--endpoints', type=int, nargs='+', default=[100, 1000, 10000],
+                              help='接口数量，可指定多个')
+    registration.add_argument('--lookups', type=int, default=100000, help='每组测试的路由查找次数')
+    registration.add_argument('--output', help='把测试结果保存为JSON文件')
+
+    load = subparsers.add_parser('load', help='并发压力测试：RPS、延迟分位数、内存和各阶段耗时')
+    load.add_argument('--endpoints', type=int, nargs='+', default=[100], help='接口数量，可指定多个')
+    load.add_argument('--template-fields', type=int, nargs='+', default=[10, 100],
+                      help='响应模板字段数，可指定多个')
+    load.add_argument('--concurrency', type=int, default=16, help='并发连接总数')
+    load.add_argument('--client-processes', type=int, default=2, help='客户端进程数')
+    load.add_argument('--duration', type=float, default=5.0, help='每组测试的持续秒数')
+    load.add_argument('--warmup', type=float, default=1.0, help='每组测试的预热秒数')
+    load.add_argument('--validation', action='store_true', help='为接口开启请求验证')
+    load.add_argument('--log-request', action='store_true', help='为接口开启请求日志')
+    load.add_argument('--serializer', choices=['stdlib', 'orjson', 'pre_encoded'],
+                      help='序列化后端，默认使用 stdlib')
+    load.add_argument('--output', help='把测试结果保存为JSON文件')
+
+    metrics_parser = subparsers.add_parser('metrics', help='接口指标在请求处理路径上的额外开销')
+    metrics_parser.add_argument('--iterations', type=int, default=1000000, help='模拟的请求次数')
+    metrics_parser.add_argument('--output', help='把测试结果保存为JSON文件')
+
+    args = parser.parse_args()
+    if args.command == 'registration':
+        results = bench_registration(args.endpoints, args.lookups)
+    elif args.command == 'load':
+        results = bench_load(args.endpoints, args.template_fields, args.concurrency, args.client_processes,
+                             args.duration, args.warmup, args.validation, args.log_request, args.serializer)
+    elif args.command == 'metrics':
+        results = bench_metrics(args.iterations)
+    else:
+        parser.error(f"未知命令: {args.command}")
+        return
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'command': args.command, 'arguments': vars(args), 'results': results},
+                      f, ensure_ascii=False, indent=2)
+        print(f"测试结果已保存到 {args.output}")
+
+
+if __name__ == '__main__':
+    main()
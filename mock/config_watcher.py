@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+配置文件监听器 - 轮询配置文件的修改时间，文件变化时触发重新加载
+"""
+
+import os
+import threading
+from typing import Any, Callable, Optional
+
+
+class ConfigWatcher:
+    """
+    配置文件监听器
+
+    后台线程按固定间隔检查文件的修改时间和大小（mtime轮询，不依赖平台相关的inotify），
+    变化时调用回调函数。线程按进程启动，多进程模式下每个工作进程各自监听。
+    """
+
+    def __init__(self, path: str, callback: Callable[[], None], interval: float = 1.0,
+                 get_signature: Optional[Callable[[], Any]] = None):
+        """
+        初始化配置文件监听器
+
+        Args:
+            path: 要监听的文件路径
+            callback: 文件变化时调用的函数
+            interval: 轮询间隔（秒）
+            get_signature: 自定义签名函数（如多文件配置时覆盖全部配置片段），默认使用单个文件的修改时间和大小
+        """
+        self.path = path
+        self.callback = callback
+        self.interval = interval
+        if get_signature is not None:
+            self._get_signature = get_signature
+        self._signature = self._get_signature()
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._stop_event = threading.Event()
+
+    def _get_signature(self) -> Any:
+        """获取文件的 (修改时间, 大小)，文件不存在时返回None"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def ensure_started(self):
+        """在当前进程中启动监听线程（已启动时直接返回）"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            thread = threading.Thread(target=self._run, name='config-watcher', daemon=True)
+            thread.start()
+            self._pid = pid
+
+    def stop(self):
+        """停止监听"""
+        self._stop_event.set()
+
+    def check(self) -> bool:
+        """
+        检查文件是否变化，变化时调用回调函数
+
+        Returns:
+            文件是否发生变化
+        """
+        signature = self._get_signature()
+        # 文件被删除或正在被替换时保持原状态，等待下一次检查
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            self.callback()
+        except Exception as e:
+            print(f"⚠ 配置文件重新加载回调执行失败: {str(e)}")
+        # 回调可能改变了监听范围（如新增 include），以回调后的签名为准
+        self._signature = self._get_signature() or signature
+        return True
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.check()
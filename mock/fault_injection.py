@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+故障注入 - 为Mock接口模拟慢速上游：响应延迟、带宽限制和按概率返回错误
+
+延迟和限速使用协作式休眠：在gevent工作进程（server.worker_class 为 gevent）中
+休眠只会让出当前协程，不会占用线程，单个进程即可同时保持数万个慢速连接
+"""
+
+import bisect
+import random
+import time
+from typing import Dict, Any, List, Optional, Callable, Iterable, Iterator, Tuple
+
+
+# 休眠函数在首次使用时确定（gunicorn的gevent工作进程在fork之后才打补丁）
+_sleep: Optional[Callable[[float], None]] = None
+
+
+def _get_sleep() -> Callable[[float], None]:
+    """获取休眠函数：gevent已打补丁时使用gevent.sleep，否则使用time.sleep"""
+    global _sleep
+    if _sleep is None:
+        _sleep = _detect_sleep()
+    return _sleep
+
+
+def _detect_sleep() -> Callable[[float], None]:
+    try:
+        from gevent import monkey, sleep as gevent_sleep
+    except ImportError:
+        return time.sleep
+    if monkey.is_module_patched('socket'):
+        return gevent_sleep
+    return time.sleep
+
+
+def cooperative_sleep(seconds: float):
+    """
+    协作式休眠
+
+    gevent工作进程中只挂起当前协程；普通线程模式下退化为 time.sleep
+
+    Args:
+        seconds: 休眠秒数
+    """
+    if seconds > 0:
+        _get_sleep()(seconds)
+
+
+class LatencyDistribution:
+    """
+    响应延迟分布
+
+    配置示例（单位毫秒）：
+        {"type": "fixed", "ms": 100}
+        {"type": "uniform", "min_ms": 50, "max_ms": 200}
+        {"type": "percentile", "p50": 20, "p90": 80, "p99": 300, "max_ms": 1000}
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        初始化延迟分布
+
+        Args:
+            config: latency 配置
+
+        Raises:
+            ValueError: 配置不合法
+        """
+        self.type = config.get('type', 'fixed')
+        if self.type == 'fixed':
+            self.ms = float(config.get('ms', 0))
+        elif self.type == 'uniform':
+            self.min_ms = float(config.get('min_ms', 0))
+            self.max_ms = float(config.get('max_ms', self.min_ms))
+            if self.max_ms < self.min_ms:
+                raise ValueError("latency.max_ms 不能小于 latency.min_ms")
+        elif self.type == 'percentile':
+            # 分位点：[(累计概率, 延迟毫秒)]，在相邻分位点之间线性插值
+            points: List[Tuple[float, float]] = [(0.0, float(config.get('min_ms', 0)))]
+            for key, value in config.items():
+                if key.startswith('p') and key[1:].replace('.', '', 1).isdigit():
+                    points.append((float(key[1:]) / 100, float(value)))
+            if len(points) == 1:
+                raise ValueError("percentile 延迟分布至少需要一个分位点，如 p50")
+            points.sort()
+            points.append((1.0, float(config.get('max_ms', points[-1][1]))))
+            for (_, lower), (_, upper) in zip(points, points[1:]):
+                if upper < lower:
+                    raise ValueError("percentile 延迟分布的分位点必须随百分位递增")
+            self._quantiles = [quantile for quantile, _ in points]
+            self._values = [value for _, value in points]
+        else:
+            raise ValueError(f"不支持的延迟分布类型: {self.type}，可选值为 fixed、uniform 或 percentile")
+
+    def sample(self) -> float:
+        """
+        按分布采样一次延迟
+
+        Returns:
+            延迟秒数
+        """
+        if self.type == 'fixed':
+            return self.ms / 1000
+        if self.type == 'uniform':
+            return random.uniform(self.min_ms, self.max_ms) / 1000
+        # 逆分布函数采样
+        u = random.random()
+        index = max(bisect.bisect_right(self._quantiles, u), 1)
+        if index >= len(self._quantiles):
+            return self._values[-1] / 1000
+        q0, q1 = self._quantiles[index - 1], self._quantiles[index]
+        v0, v1 = self._values[index - 1], self._values[index]
+        ratio = (u - q0) / (q1 - q0) if q1 > q0 else 0.0
+        return (v0 + (v1 - v0) * ratio) / 1000
+
+
+class FaultInjector:
+    """
+    接口级故障注入
+
+    接口配置示例：
+        "latency": {"type": "uniform", "min_ms": 50, "max_ms": 200},
+        "bandwidth": {"bytes_per_second": 10240},
+        "failures": [{"probability": 0.05, "status": 503, "body": {"message": "服务不可用"}}]
+    """
+
+    # 限速时每次输出的时间片（秒）
+    THROTTLE_INTERVAL = 0.1
+
+    def __init__(self, endpoint_config: Dict[str, Any]):
+        """
+        根据接口配置初始化故障注入
+
+        Args:
+            endpoint_config: 接口配置
+
+        Raises:
+            ValueError: 配置不合法
+        """
+        latency_config = endpoint_config.get('latency')
+        self.latency: Optional[LatencyDistribution] = LatencyDistribution(latency_config) if latency_config else None
+
+        bandwidth = endpoint_config.get('bandwidth') or {}
+        self.bytes_per_second = int(bandwidth.get('bytes_per_second', 0))
+        if self.bytes_per_second < 0:
+            raise ValueError("bandwidth.bytes_per_second 不能小于0")
+
+        # 故障按配置顺序累加概率，一次请求最多命中一个故障
+        self.failures: List[Dict[str, Any]] = []
+        self._cumulative: List[float] = []
+        total = 0.0
+        for failure in endpoint_config.get('failures', []):
+            probability = float(failure.get('probability', 0))
+            if not 0 <= probability <= 1:
+                raise ValueError("failures.probability 必须在0到1之间")
+            total += probability
+            self.failures.append(failure)
+            self._cumulative.append(total)
+        if total > 1:
+            raise ValueError("failures 的概率之和不能大于1")
+
+    @classmethod
+    def from_endpoint(cls, endpoint_config: Dict[str, Any]) -> Optional['FaultInjector']:
+        """
+        创建故障注入，接口未配置任何故障时返回None（请求处理时无额外开销）
+
+        Args:
+            endpoint_config: 接口配置
+
+        Returns:
+            故障注入对象或None
+        """
+        if not any(endpoint_config.get(key) for key in ('latency', 'bandwidth', 'failures')):
+            return None
+        return cls(endpoint_config)
+
+    def delay(self):
+        """按延迟分布等待（协作式休眠）"""
+        if self.latency is not None:
+            cooperative_sleep(self.latency.sample())
+
+    def pick_failure(self) -> Optional[Dict[str, Any]]:
+        """
+        按概率选择本次请求要注入的故障
+
+        Returns:
+            故障配置，未命中时返回None
+        """
+        if not self.failures:
+            return None
+        index = bisect.bisect_right(self._cumulative, random.random())
+        return self.failures[index] if index < len(self.failures) else None
+
+    def throttle(self, body: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        按带宽限制逐片输出响应体
+
+        Args:
+            body: 原始响应体分块
+
+        Yields:
+            限速后的响应体分块
+        """
+        slice_size = max(int(self.bytes_per_second * self.THROTTLE_INTERVAL), 1)
+        started = time.monotonic()
+        sent = 0
+        try:
+            for chunk in body:
+                for offset in range(0, len(chunk), slice_size):
+                    piece = chunk[offset:offset + slice_size]
+                    yield piece
+                    sent += len(piece)
+                    # 按已发送字节数计算应到达的时间，补足差值
+                    cooperative_sleep(started + sent / self.bytes_per_second - time.monotonic())
+        finally:
+            close = getattr(body, 'close', None)
+            if close is not None:
+                close()
@@ -5,28 +5,83 @@ Mock服务 - 用于模拟API接口
 基于配置文件动态加载接口定义，支持灵活的Mock数据配置
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, abort
 from flask_cors import CORS
+import gc
+import glob
+import hashlib
 import json
 import os
+import pickle
 from datetime import datetime
-from typing import Dict, Any, List, Optional
-import copy
+from contextlib import contextmanager
+from functools import cached_property, lru_cache
+from typing import Dict, Any, List, Optional, Callable, Set, Tuple
 import re
+import time
+
+from config_watcher import ConfigWatcher
+from recorder import RecordingProxy
+from fault_injection import FaultInjector
+from metrics import MetricsRegistry
+from request_logger import RequestLogger
+from response_cache import ResponseCache
+from response_stream import create_response_stream
+from router import Router
+from schema_validator import compile_schema
+from serializers import JsonSerializer, create_serializer
+from server_runner import run_server
+from store import CollectionStore, StoreEndpoint
+
+
+# 编译快照格式版本，快照结构变化时递增，使旧快照失效
+CONFIG_SNAPSHOT_VERSION = 1
+
+# 配置路径中出现这些字符时按glob模式匹配
+GLOB_CHARACTERS = frozenset('*?[')
+
+
+@contextmanager
+def gc_paused():
+    """
+    暂停循环垃圾回收
+
+    解析大型配置时会一次性创建大量容器对象，期间反复触发的分代回收占了相当一部分耗时，
+    而这些对象不会形成需要回收的循环引用
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
 
 
 class ConfigLoader:
-    """配置加载器 - 负责加载和解析配置文件"""
+    """
+    配置加载器 - 负责加载和解析配置文件
+
+    配置路径可以是单个文件、目录（加载其中全部 *.json，按文件名排序）或glob模式；
+    每个配置片段都可以通过 include 引用其他片段，合并后的配置校验通过后写入编译快照，
+    下次启动时所有来源文件均未变化则直接读取快照，跳过解析和校验
+    """
     
-    def __init__(self, config_path: str = 'config.json'):
+    def __init__(self, config_path: str = 'config.json', snapshot_dir: Optional[str] = '.mock_cache'):
         """
         初始化配置加载器
         
         Args:
-            config_path: 配置文件路径，默认为config.json
+            config_path: 配置文件、目录或glob模式，默认为config.json
+            snapshot_dir: 编译快照目录，为None时不使用快照
         """
         self.config_path = config_path
+        self.snapshot_dir = snapshot_dir
         self.config = None
+        # 最近一次加载使用的配置来源：[(路径或glob模式, 匹配到的文件)]
+        self.sources: List[Tuple[str, Tuple[str, ...]]] = []
+        # 已解析的配置片段：文件路径 -> ((修改时间, 大小), 内容)，热加载时只重新解析变化的片段
+        self._fragments: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
         self.load_config()
     
     def load_config(self) -> Dict[str, Any]:
@@ -40,13 +95,239 @@ class ConfigLoader:
             FileNotFoundError: 配置文件不存在
             json.JSONDecodeError: 配置文件格式错误
         """
-        if not os.path.exists(self.config_path):
+        self.config = self.read_config()
+        return self.config
+    
+    def read_config(self) -> Dict[str, Any]:
+        """
+        读取并校验配置文件（不修改当前配置，用于热加载时先校验再替换）
+        
+        Returns:
+            配置字典
+            
+        Raises:
+            FileNotFoundError: 配置文件不存在
+            json.JSONDecodeError: 配置文件格式错误
+            ValueError: 配置内容不合法
+        """
+        snapshot = self._read_snapshot()
+        if snapshot is not None:
+            self.sources = snapshot['sources']
+            return snapshot['config']
+        
+        sources: List[Tuple[str, Tuple[str, ...]]] = []
+        files = self._expand(self.config_path, sources)
+        if not files:
             raise FileNotFoundError(f"配置文件不存在: {self.config_path}")
+        config: Dict[str, Any] = {}
+        merged: Set[str] = set()
+        for path in files:
+            self._merge_file(path, config, sources, merged, [])
+        
+        self.validate_config(config)
+        self.sources = sources
+        self._write_snapshot(config, sources)
+        return config
+    
+    def get_signature(self, sources: Optional[List[Tuple[str, Tuple[str, ...]]]] = None) -> Tuple[Any, ...]:
+        """
+        计算配置来源的签名：重新匹配每个路径或glob模式，并记录匹配到的文件的 (修改时间, 大小)
         
-        with open(self.config_path, 'r', encoding='utf-8') as f:
-            self.config = json.load(f)
+        新增、删除或修改任意一个配置片段都会改变签名
         
-        return self.config
+        Args:
+            sources: 配置来源，默认为最近一次加载使用的来源
+            
+        Returns:
+            签名
+        """
+        signature = []
+        for pattern, _ in (self.sources if sources is None else sources):
+            files = []
+            for path in self._match(pattern):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    files.append((path, None))
+                    continue
+                files.append((path, stat.st_mtime_ns, stat.st_size))
+            signature.append((pattern, tuple(files)))
+        return tuple(signature)
+    
+    @staticmethod
+    def _match(pattern: str) -> List[str]:
+        """匹配路径或glob模式，目录展开为其中的 *.json 文件，结果按路径排序"""
+        if GLOB_CHARACTERS.intersection(pattern):
+            return sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+        if os.path.isdir(pattern):
+            return sorted(glob.glob(os.path.join(pattern, '*.json')))
+        return [pattern] if os.path.isfile(pattern) else []
+    
+    def _expand(self, pattern: str, sources: List[Tuple[str, Tuple[str, ...]]]) -> List[str]:
+        """匹配路径或glob模式，并把结果记录到配置来源中"""
+        pattern = os.path.abspath(pattern)
+        files = self._match(pattern)
+        sources.append((pattern, tuple(files)))
+        return files
+    
+    def _merge_file(self, path: str, config: Dict[str, Any], sources: List[Tuple[str, Tuple[str, ...]]],
+                    merged: Set[str], stack: List[str]):
+        """
+        解析一个配置片段并合并到配置中，include 引用的片段先于当前片段合并
+        
+        Args:
+            path: 配置片段路径
+            config: 合并结果
+            sources: 配置来源，记录 include 匹配到的文件
+            merged: 已合并的片段（被多次引用的片段只合并一次）
+            stack: 当前的 include 引用链，用于检测循环引用
+            
+        Raises:
+            ValueError: 循环引用或配置片段不合法
+            FileNotFoundError: include 没有匹配到任何文件
+        """
+        real_path = os.path.realpath(path)
+        if real_path in stack:
+            chain = ' -> '.join(stack[stack.index(real_path):] + [real_path])
+            raise ValueError(f"配置文件存在循环引用: {chain}")
+        if real_path in merged:
+            return
+        fragment = self._parse_fragment(path)
+        
+        includes = fragment.get('include', [])
+        if isinstance(includes, str):
+            includes = [includes]
+        if not isinstance(includes, list) or not all(isinstance(item, str) for item in includes):
+            raise ValueError(f"{path} 的 include 必须是字符串或字符串数组")
+        stack.append(real_path)
+        for include in includes:
+            # 相对路径以引用它的文件所在目录为基准
+            files = self._expand(os.path.join(os.path.dirname(path), include), sources)
+            if not files:
+                raise FileNotFoundError(f"{path} 的 include 没有匹配到任何配置文件: {include}")
+            for include_path in files:
+                self._merge_file(include_path, config, sources, merged, stack)
+        stack.pop()
+        
+        merged.add(real_path)
+        self._merge_fragment(config, fragment, path)
+    
+    def _parse_fragment(self, path: str) -> Dict[str, Any]:
+        """解析配置片段，文件未变化时复用上一次的解析结果"""
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._fragments.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        with open(path, 'r', encoding='utf-8') as f, gc_paused():
+            fragment = json.load(f)
+        if not isinstance(fragment, dict):
+            raise ValueError(f"配置文件顶层必须是对象: {path}")
+        self._fragments[path] = (signature, fragment)
+        return fragment
+    
+    @classmethod
+    def _merge_fragment(cls, config: Dict[str, Any], fragment: Dict[str, Any], path: str):
+        """
+        合并配置片段：endpoints 按顺序追加，对象逐层合并，其他值由后合并的片段覆盖
+        
+        合并时复制对象，不修改缓存的片段内容
+        """
+        for key, value in fragment.items():
+            if key == 'include':
+                continue
+            if key == 'endpoints':
+                if not isinstance(value, list):
+                    raise ValueError(f"{path} 的 endpoints 必须是数组")
+                config.setdefault('endpoints', []).extend(value)
+            elif isinstance(value, dict) and isinstance(config.get(key), dict):
+                merged = dict(config[key])
+                cls._merge_fragment(merged, value, path)
+                config[key] = merged
+            elif isinstance(value, dict):
+                config[key] = dict(value)
+            else:
+                config[key] = value
+    
+    def _get_snapshot_path(self) -> str:
+        """编译快照路径，按配置路径区分"""
+        digest = hashlib.sha1(os.path.abspath(self.config_path).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.snapshot_dir, f"config-{digest}.pickle")
+    
+    def _read_snapshot(self) -> Optional[Dict[str, Any]]:
+        """读取编译快照，快照不存在、损坏或任意来源文件发生变化时返回None"""
+        if not self.snapshot_dir:
+            return None
+        try:
+            with open(self._get_snapshot_path(), 'rb') as f, gc_paused():
+                snapshot = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠ 配置快照读取失败，重新解析配置文件: {str(e)}")
+            return None
+        if not isinstance(snapshot, dict) or snapshot.get('version') != CONFIG_SNAPSHOT_VERSION:
+            return None
+        if snapshot['signature'] != self.get_signature(snapshot['sources']):
+            return None
+        return snapshot
+    
+    def _write_snapshot(self, config: Dict[str, Any], sources: List[Tuple[str, Tuple[str, ...]]]):
+        """写入编译快照（先写临时文件再替换，写入失败不影响启动）"""
+        if not self.snapshot_dir:
+            return
+        path = self._get_snapshot_path()
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        snapshot = {
+            'version': CONFIG_SNAPSHOT_VERSION,
+            'sources': sources,
+            'signature': self.get_signature(sources),
+            'config': config,
+        }
+        try:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"⚠ 配置快照写入失败: {str(e)}")
+    
+    @staticmethod
+    def validate_config(config: Any):
+        """
+        校验配置结构
+        
+        Args:
+            config: 配置字典
+            
+        Raises:
+            ValueError: 配置内容不合法
+        """
+        if not isinstance(config, dict):
+            raise ValueError("配置文件顶层必须是对象")
+        endpoints = config.get('endpoints', [])
+        if not isinstance(endpoints, list):
+            raise ValueError("endpoints 必须是数组")
+        for index, endpoint in enumerate(endpoints):
+            if not isinstance(endpoint, dict):
+                raise ValueError(f"第 {index + 1} 个接口配置必须是对象")
+            path = endpoint.get('path')
+            if not isinstance(path, str) or not path.startswith('/'):
+                raise ValueError(f"第 {index + 1} 个接口的 path 必须是以 / 开头的字符串")
+            methods = endpoint.get('methods', ['GET'])
+            if not isinstance(methods, list) or not all(isinstance(m, str) for m in methods):
+                raise ValueError(f"接口 {path} 的 methods 必须是字符串数组")
+            response = endpoint.get('response', {} if 'store' in endpoint else None)
+            if not isinstance(response, dict):
+                raise ValueError(f"接口 {path} 的 response 必须是对象")
+            # 有状态接口未配置模板时直接返回存储操作结果
+            if 'template' not in response and 'stream' not in response and 'store' not in endpoint:
+                raise ValueError(f"接口 {path} 缺少 response.template 或 response.stream")
+            if 'store' in endpoint and not isinstance(endpoint['store'], dict):
+                raise ValueError(f"接口 {path} 的 store 必须是对象")
+        for key in ('server', 'global_settings'):
+            if not isinstance(config.get(key, {}), dict):
+                raise ValueError(f"{key} 必须是对象")
     
     def get_server_config(self) -> Dict[str, Any]:
         """获取服务器配置"""
@@ -61,76 +342,496 @@ class ConfigLoader:
         return self.config.get('global_settings', {})
 
 
+# 模板变量解析表：变量名 -> 解析函数(RequestContext)
+# 解析函数只在模板引用到该变量时才会被调用
+TEMPLATE_VARIABLE_RESOLVERS: Dict[str, Callable[['RequestContext'], Any]] = {
+    'timestamp': lambda ctx: datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    'request_method': lambda ctx: request.method,
+    'request_headers': lambda ctx: ctx.response_builder._get_original_headers(),
+    'request_data': lambda ctx: ctx.body.value,
+    'request_args': lambda ctx: dict(request.args),
+    'request_url': lambda ctx: request.url,
+    'request_path': lambda ctx: request.path,
+    'request_remote_addr': lambda ctx: request.remote_addr,
+    'server_port': lambda ctx: ctx.server_port,
+    'endpoints_info': lambda ctx: ctx.route_table.endpoints_info,
+}
+
+
+
+def _lookup_json_path(data: Any, keys: Tuple[str, ...]) -> Any:
+    """
+    按路径查找JSON数据中的值，列表使用数字下标，如 ('items', '0', 'id')
+    
+    Returns:
+        查找到的值，路径不存在时返回None
+    """
+    for key in keys:
+        if isinstance(data, dict):
+            data = data.get(key)
+        elif isinstance(data, list) and key.lstrip('-').isdigit():
+            index = int(key)
+            data = data[index] if -len(data) <= index < len(data) else None
+        else:
+            return None
+    return data
+
+
+def _body_resolver(key: str) -> Callable[['RequestContext'], Any]:
+    """创建请求体JSON路径的解析函数，如 body.user.name"""
+    keys = tuple(key.split('.'))
+    return lambda ctx: _lookup_json_path(ctx.body.json, keys)
+
+
+# 带命名空间的模板变量：命名空间 -> 解析函数工厂(键)，如 {{path.id}}、{{query.page}}
+TEMPLATE_NAMESPACE_RESOLVERS: Dict[str, Callable[[str], Callable[['RequestContext'], Any]]] = {
+    'path': lambda key: lambda ctx: ctx.path_params.get(key),
+    'query': lambda key: lambda ctx: request.args.get(key),
+    'header': lambda key: lambda ctx: request.headers.get(key),
+    'body': _body_resolver,
+}
+# 兼容写法：{{request_args.id}} 等同于 {{query.id}}，{{request_data.name}} 等同于 {{body.name}}
+TEMPLATE_NAMESPACE_RESOLVERS['request_args'] = TEMPLATE_NAMESPACE_RESOLVERS['query']
+TEMPLATE_NAMESPACE_RESOLVERS['request_data'] = TEMPLATE_NAMESPACE_RESOLVERS['body']
+
+# 带命名空间的变量在编译模板时解析一次并缓存，请求时只需一次字典查找
+_namespace_resolver_cache: Dict[str, Callable[['RequestContext'], Any]] = {}
+
+
+def get_variable_resolver(name: str) -> Optional[Callable[['RequestContext'], Any]]:
+    """
+    获取模板变量的解析函数
+    
+    Args:
+        name: 变量名，如 timestamp、path.id、body.user.name
+        
+    Returns:
+        解析函数，不支持的变量返回None
+    """
+    resolver = TEMPLATE_VARIABLE_RESOLVERS.get(name)
+    if resolver is not None:
+        return resolver
+    resolver = _namespace_resolver_cache.get(name)
+    if resolver is not None:
+        return resolver
+    namespace, _, key = name.partition('.')
+    factory = TEMPLATE_NAMESPACE_RESOLVERS.get(namespace)
+    if factory is None or not key:
+        return None
+    resolver = _namespace_resolver_cache[name] = factory(key)
+    return resolver
+
+
+# 模板变量，如 "{{timestamp}}"、"用户{{path.id}}"
+TEMPLATE_VARIABLE_PATTERN = re.compile(r'\{\{([\w.\-]+)\}\}')
+
+
+def _stringify(value: Any) -> str:
+    """把模板变量的值转换为字符串，用于嵌入到更长的字符串中"""
+    if isinstance(value, str):
+        return value
+    if value is None:
+        return ''
+    return json.dumps(value, ensure_ascii=False)
+
+
+class RequestBodyTooLarge(Exception):
+    """请求体超过配置的最大长度"""
+    
+    def __init__(self, size: int, max_size: int):
+        self.size = size
+        self.max_size = max_size
+        super().__init__(f"请求体过大: {size} 字节，最大允许 {max_size} 字节")
+
+
+class RequestBody:
+    """
+    请求体缓存 - 单次请求内最多读取和解析一次
+    
+    请求验证、响应构建和请求日志共享同一份解析结果；
+    没有任何使用方访问请求体时，既不读取也不解析
+    """
+    
+    def __init__(self, max_size: Optional[int] = None):
+        """
+        初始化请求体缓存
+        
+        Args:
+            max_size: 允许的最大请求体字节数，None或0表示不限制
+        """
+        self.max_size = max_size
+    
+    @cached_property
+    def raw(self) -> bytes:
+        """
+        原始请求体字节串
+        
+        Raises:
+            RequestBodyTooLarge: 请求体超过最大长度
+        """
+        if self.max_size:
+            # 先根据Content-Length拒绝，避免读取超大请求体
+            content_length = request.content_length
+            if content_length is not None and content_length > self.max_size:
+                raise RequestBodyTooLarge(content_length, self.max_size)
+            data = request.get_data(cache=True)
+            # 分块传输没有Content-Length，读取后再检查一次
+            if len(data) > self.max_size:
+                raise RequestBodyTooLarge(len(data), self.max_size)
+            return data
+        return request.get_data(cache=True)
+    
+    @cached_property
+    def _parsed(self) -> Tuple[bool, Any]:
+        """解析请求体，返回 (是否为JSON, 解析结果或原始文本)"""
+        data = self.raw
+        if not data:
+            return False, None
+        try:
+            return True, json.loads(data)
+        except (ValueError, UnicodeDecodeError):
+            return False, data.decode('utf-8', errors='ignore')
+    
+    @property
+    def json(self) -> Any:
+        """JSON请求体，无法解析为JSON时返回None"""
+        is_json, value = self._parsed
+        return value if is_json else None
+    
+    @property
+    def value(self) -> Any:
+        """请求体数据：能解析为JSON时返回JSON，否则返回原始文本"""
+        return self._parsed[1]
+
+
+class RequestContext:
+    """
+    请求上下文 - 按需计算当前请求的模板变量
+    
+    每个变量在首次使用时才解析，并在本次请求内缓存，
+    未被模板引用的字段（请求头还原、请求体解析、完整URL等）不会被计算
+    """
+    
+    def __init__(self, route_table: 'RouteTable', server_port: int,
+                 path_params: Optional[Dict[str, Any]] = None):
+        """
+        初始化请求上下文
+        
+        Args:
+            route_table: 处理当前请求的路由表（热加载时新旧请求各自使用自己的路由表）
+            server_port: 服务器端口
+            path_params: 路径参数，如 /api/users/<id> 匹配 /api/users/1 时为 {'id': '1'}
+        """
+        self.route_table = route_table
+        self.path_params = path_params or {}
+        self.response_builder = route_table.response_builder
+        self.server_port = server_port
+        self.body = RequestBody(route_table.global_settings.get('max_body_size'))
+        self._values: Dict[str, Any] = {}
+    
+    def get(self, name: str) -> Any:
+        """
+        获取模板变量的值（首次访问时解析并缓存）
+        
+        Args:
+            name: 变量名
+            
+        Returns:
+            变量值
+        """
+        try:
+            return self._values[name]
+        except KeyError:
+            value = self._values[name] = get_variable_resolver(name)(self)
+            return value
+    
+    def set(self, name: str, value: Any):
+        """
+        设置本次请求的变量值（用于由处理函数提供的变量，如 store_result）
+        
+        Args:
+            name: 变量名
+            value: 变量值
+        """
+        self._values[name] = value
+
+
+class CompiledTemplate:
+    """
+    预编译的响应模板
+    
+    注册接口时对模板做一次分析，记录所有占位符所在的位置：
+    - 纯静态模板：预先序列化为字节串，请求时直接返回
+    - 动态模板：请求时只重建占位符所在路径上的容器，静态子树按引用共享，无需整树深拷贝
+    - 预编码模式（serializer 为 pre_encoded）：动态模板编译为字节串片段，静态部分预先序列化，
+      请求时只序列化占位符对应的值并拼接
+    """
+    
+    def __init__(self, template: Any, serializer: Callable[[Any], bytes],
+                 local_variables: Optional[Set[str]] = None):
+        """
+        编译模板
+        
+        Args:
+            template: 响应模板
+            serializer: JSON 序列化函数（返回UTF-8字节串）
+            local_variables: 由调用方在渲染时提供的额外变量名，如流式响应条目的 index
+        """
+        self.template = template
+        self.serializer = serializer
+        self.local_variables = local_variables or set()
+        # 模板中引用到的变量名
+        self.variables: Set[str] = set()
+        self.is_static, self._renderer = self._compile(template)
+        self.static_body: Optional[bytes] = None
+        # 预编码片段：[(是否为静态字节串, 字节串或渲染函数)]
+        self.fragments: Optional[List[Tuple[bool, Any]]] = None
+        if self.is_static:
+            self.static_body = serializer(template)
+        elif getattr(serializer, 'pre_encoded', False):
+            self.fragments = self._merge_fragments(
+                self._compile_fragments(template, serializer.sort_keys)
+            )
+    
+    def _parse_string(self, data: str) -> Optional[List[Tuple[bool, str]]]:
+        """
+        把字符串拆分为字面量和变量：[(是否为变量, 字面量或变量名)]
+        
+        Returns:
+            拆分结果，不包含支持的变量时返回None
+        """
+        parts: List[Tuple[bool, str]] = []
+        position = 0
+        for match in TEMPLATE_VARIABLE_PATTERN.finditer(data):
+            name = match.group(1)
+            # 不支持的变量保持原样
+            if name not in self.local_variables and get_variable_resolver(name) is None:
+                continue
+            if match.start() > position:
+                parts.append((False, data[position:match.start()]))
+            parts.append((True, name))
+            position = match.end()
+        if not parts:
+            return None
+        if position < len(data):
+            parts.append((False, data[position:]))
+        return parts
+    
+    def _compile(self, data: Any) -> Tuple[bool, Any]:
+        """
+        递归编译模板节点
+        
+        Args:
+            data: 模板节点
+            
+        Returns:
+            (是否为静态节点, 静态值或渲染函数)
+        """
+        if isinstance(data, dict):
+            items = [(key, self._compile(value)) for key, value in data.items()]
+            if all(is_static for _, (is_static, _) in items):
+                return True, data
+            
+            def render_dict(resolve: Callable[[str], Any]) -> Dict[str, Any]:
+                return {key: value if is_static else value(resolve)
+                        for key, (is_static, value) in items}
+            return False, render_dict
+        elif isinstance(data, list):
+            items = [self._compile(item) for item in data]
+            if all(is_static for is_static, _ in items):
+                return True, data
+            
+            def render_list(resolve: Callable[[str], Any]) -> List[Any]:
+                return [value if is_static else value(resolve) for is_static, value in items]
+            return False, render_list
+        elif isinstance(data, str) and '{{' in data:
+            parts = self._parse_string(data)
+            if parts is None:
+                return True, data
+            
+            for is_variable, name in parts:
+                if is_variable:
+                    self.variables.add(name)
+            
+            # 整个字符串就是一个变量时，保留变量值的原始类型（对象、数字等）
+            if len(parts) == 1:
+                name = parts[0][1]
+                return False, lambda resolve: resolve(name)
+            
+            def render_string(resolve: Callable[[str], Any]) -> str:
+                return ''.join(_stringify(resolve(value)) if is_variable else value
+                               for is_variable, value in parts)
+            return False, render_string
+        return True, data
+    
+    def _compile_fragments(self, data: Any, sort_keys: bool) -> List[Any]:
+        """
+        把模板节点编译为片段列表，元素为字节串（静态部分）或渲染函数（占位符）
+        
+        Args:
+            data: 模板节点
+            sort_keys: 对象的键是否按字母排序（与序列化后端保持一致）
+            
+        Returns:
+            片段列表
+        """
+        encode = self.serializer
+        if isinstance(data, dict):
+            fragments: List[Any] = [b'{']
+            items = sorted(data.items()) if sort_keys else data.items()
+            for index, (key, value) in enumerate(items):
+                if index:
+                    fragments.append(b',')
+                fragments.append(encode(str(key)) + b':')
+                fragments.extend(self._compile_fragments(value, sort_keys))
+            fragments.append(b'}')
+            return fragments
+        if isinstance(data, list):
+            fragments = [b'[']
+            for index, item in enumerate(data):
+                if index:
+                    fragments.append(b',')
+                fragments.extend(self._compile_fragments(item, sort_keys))
+            fragments.append(b']')
+            return fragments
+        if isinstance(data, str) and '{{' in data:
+            parts = self._parse_string(data)
+            if parts is not None:
+                if len(parts) == 1:
+                    name = parts[0][1]
+                    return [lambda resolve: encode(resolve(name))]
+                return [lambda resolve: encode(''.join(_stringify(resolve(value)) if is_variable else value
+                                                       for is_variable, value in parts))]
+        return [encode(data)]
+    
+    @staticmethod
+    def _merge_fragments(fragments: List[Any]) -> List[Tuple[bool, Any]]:
+        """合并相邻的静态字节串，减少请求时的拼接次数"""
+        merged: List[Tuple[bool, Any]] = []
+        for fragment in fragments:
+            if isinstance(fragment, bytes):
+                if merged and merged[-1][0]:
+                    merged[-1] = (True, merged[-1][1] + fragment)
+                else:
+                    merged.append((True, fragment))
+            else:
+                merged.append((False, fragment))
+        return merged
+    
+    def render_fragments(self, resolve: Callable[[str], Any]) -> bytes:
+        """
+        拼接预编码片段，只序列化占位符对应的值
+        
+        Args:
+            resolve: 变量解析函数
+            
+        Returns:
+            JSON 响应体字节串
+        """
+        return b''.join(fragment if is_static else fragment(resolve) for is_static, fragment in self.fragments)
+    
+    def render_bytes(self, resolve: Callable[[str], Any]) -> bytes:
+        """
+        渲染并序列化模板
+        
+        Args:
+            resolve: 变量解析函数
+            
+        Returns:
+            JSON 字节串
+        """
+        if self.is_static:
+            return self.static_body
+        if self.fragments is not None:
+            return self.render_fragments(resolve)
+        return self.serializer(self._renderer(resolve))
+    
+    def render(self, resolve: Callable[[str], Any]) -> Any:
+        """
+        渲染模板
+        
+        Args:
+            resolve: 变量解析函数，参数为变量名，返回变量值
+            
+        Returns:
+            渲染后的数据（静态子树与原模板共享，调用方不得修改）
+        """
+        if self.is_static:
+            return self.template
+        return self._renderer(resolve)
+
+
 class ResponseBuilder:
     """响应构建器 - 负责根据模板构建响应数据"""
     
-    def __init__(self, global_settings: Dict[str, Any]):
+    def __init__(self, global_settings: Dict[str, Any], serializer: Optional[JsonSerializer] = None):
         """
         初始化响应构建器
         
         Args:
             global_settings: 全局设置
+            serializer: JSON 序列化器（返回UTF-8字节串），用于预先序列化静态模板和序列化动态响应，
+                默认按 global_settings.serializer 配置创建
+            
+        Raises:
+            ValueError: 序列化配置不合法
         """
         self.global_settings = global_settings
+        self.serializer = serializer or create_serializer(global_settings.get('serializer'))
     
-    def build_response(self, template: Dict[str, Any], endpoint_config: Dict[str, Any], 
-                      server_port: int) -> Dict[str, Any]:
+    def compile_template(self, template: Any, local_variables: Optional[Set[str]] = None) -> 'CompiledTemplate':
         """
-        根据模板构建响应数据
+        预编译响应模板（在注册接口时调用一次）
         
         Args:
             template: 响应模板
-            endpoint_config: 接口配置
-            server_port: 服务器端口
+            local_variables: 由调用方在渲染时提供的额外变量名
+            
+        Returns:
+            编译后的模板
+        """
+        return CompiledTemplate(template, self.serializer, local_variables)
     
-    Returns:
+    def build_response(self, compiled_template: 'CompiledTemplate') -> Any:
+        """
+        根据预编译模板构建响应数据
+        
+        Args:
+            compiled_template: 预编译的响应模板
+    
+        Returns:
             构建好的响应数据
         """
-        # 深拷贝模板，避免修改原始配置
-        response_data = copy.deepcopy(template)
+        # 纯静态模板无需任何替换，直接返回原始模板（只读共享）
+        if compiled_template.is_static:
+            return compiled_template.template
         
-        # 获取请求信息
-        request_info = self._get_request_info()
+        # 惰性请求上下文：只计算模板实际引用到的请求字段
+        context = get_request_context()
         
-        # 替换模板变量
-        response_data = self._replace_template_variables(
-            response_data, 
-            request_info, 
-            endpoint_config,
-            server_port
-        )
+        # 只重建占位符所在的路径，静态子树按引用共享
+        return compiled_template.render(context.get)
+    
+    def build_response_body(self, compiled_template: 'CompiledTemplate') -> bytes:
+        """
+        构建序列化后的响应体
         
-        return response_data
-    
-    def _get_request_info(self) -> Dict[str, Any]:
-        """获取当前请求信息"""
-        # 获取请求头信息（保留原始大小写）
-        headers = self._get_original_headers()
-        
-        # 获取请求体数据（如果有）
-        request_data = None
-        if request.is_json:
-            request_data = request.get_json()
-        elif request.data:
-            try:
-                request_data = json.loads(request.data.decode('utf-8'))
-            except:
-                request_data = request.data.decode('utf-8', errors='ignore')
-        
-        # 获取URL查询参数
-        request_args = dict(request.args)
-        
-        return {
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'request_method': request.method,
-            'request_headers': headers,
-            'request_data': request_data,
-            'request_args': request_args,
-            'request_url': request.url,
-            'request_path': request.path,
-            'request_remote_addr': request.remote_addr
-        }
+        静态模板直接返回注册时预先序列化好的字节串
         
+        Args:
+            compiled_template: 预编译的响应模板
+            
+        Returns:
+            JSON 响应体字节串
+        """
+        if compiled_template.is_static:
+            return compiled_template.static_body
+        if compiled_template.fragments is not None:
+            # 预编码模式：模板构建和序列化合并为一次片段拼接
+            return compiled_template.render_fragments(get_request_context().get)
+        response_data = self.build_response(compiled_template)
+        return self.serializer(response_data)
+    
     def _get_original_headers(self) -> Dict[str, str]:
         """
         获取原始请求头（尽可能保留大小写）
@@ -144,32 +845,15 @@ class ResponseBuilder:
         - Authorization-Key -> HTTP_AUTHORIZATION_KEY
         - Content-Type -> HTTP_CONTENT_TYPE
         
+        只在模板引用 {{request_headers}} 或记录请求日志时调用；
+        请求头名称的还原结果按environ键缓存（见 restore_environ_header），每个不同的请求头在进程内只计算一次
+        
         Returns:
             尽可能保留原始格式的请求头字典
         """
-        headers_dict = {}
-        
+        restore = restore_environ_header
         # 从environ中读取所有HTTP_开头的键
-        for key, value in request.environ.items():
-            if key.startswith('HTTP_'):
-                # 移除HTTP_前缀
-                header_key = key[5:]
-                
-                # 检查是否包含下划线（说明原始请求头可能有连字符）
-                if '_' in header_key:
-                    # 将下划线替换为连字符
-                    header_key = header_key.replace('_', '-')
-                    # 还原为Title Case格式（每个单词首字母大写）
-                    # 例如：AUTHORIZATION-KEY -> Authorization-Key
-                    header_key = self._restore_header_case(header_key)
-                else:
-                    # 没有下划线，说明原始请求头可能是驼峰命名或单个单词
-                    # 例如：AUTHORIZATIONKEY -> AuthorizationKey
-                    # 尝试检测可能的单词边界（通过检测连续的大写字母）
-                    # 并还原为驼峰命名格式
-                    header_key = self._restore_camel_case(header_key)
-                
-                headers_dict[header_key] = value
+        headers_dict = {restore(key): value for key, value in request.environ.items() if key.startswith('HTTP_')}
         
         # 如果headers_dict为空，回退到request.headers（小写版本）
         if not headers_dict:
@@ -177,7 +861,31 @@ class ResponseBuilder:
         
         return headers_dict
     
-    def _restore_header_case(self, header_name: str) -> str:
+    @staticmethod
+    def _restore_environ_key(key: str) -> str:
+        """
+        把environ中的请求头键还原为请求头名称，如 HTTP_CONTENT_TYPE -> Content-Type
+        
+        Args:
+            key: HTTP_ 开头的environ键
+            
+        Returns:
+            还原后的请求头名称
+        """
+        # 移除HTTP_前缀
+        header_key = key[5:]
+        
+        # 检查是否包含下划线（说明原始请求头可能有连字符）
+        if '_' in header_key:
+            # 将下划线替换为连字符，还原为Title Case格式（每个单词首字母大写）
+            # 例如：AUTHORIZATION_KEY -> Authorization-Key
+            return ResponseBuilder._restore_header_case(header_key.replace('_', '-'))
+        # 没有下划线，说明原始请求头可能是驼峰命名或单个单词
+        # 例如：AUTHORIZATIONKEY -> AuthorizationKey
+        return ResponseBuilder._restore_camel_case(header_key)
+    
+    @staticmethod
+    def _restore_header_case(header_name: str) -> str:
         """
         还原请求头的大小写格式（Title Case）
         
@@ -203,7 +911,8 @@ class ResponseBuilder:
                 restored_parts.append('-')
         return '-'.join(restored_parts)
     
-    def _restore_camel_case(self, header_name: str) -> str:
+    @staticmethod
+    def _restore_camel_case(header_name: str) -> str:
         """
         尝试还原驼峰命名的请求头
         
@@ -248,71 +957,53 @@ class ResponseBuilder:
         # 但尝试检测可能的单词边界（通过检测连续的大写字母）
         # 简单实现：首字母大写，其余小写
         return header_name.capitalize()
-    
-    def _replace_template_variables(self, data: Any, request_info: Dict[str, Any], 
-                                   endpoint_config: Dict[str, Any], 
-                                   server_port: int) -> Any:
-        """
-        递归替换模板变量
-        
-        Args:
-            data: 要处理的数据（可能是字典、列表或字符串）
-            request_info: 请求信息
-            endpoint_config: 接口配置
-            server_port: 服务器端口
-            
-        Returns:
-            替换后的数据
-        """
-        if isinstance(data, dict):
-            return {k: self._replace_template_variables(v, request_info, endpoint_config, server_port) 
-                   for k, v in data.items()}
-        elif isinstance(data, list):
-            return [self._replace_template_variables(item, request_info, endpoint_config, server_port) 
-                   for item in data]
-        elif isinstance(data, str):
-            # 替换模板变量
-            if data == '{{timestamp}}':
-                return request_info['timestamp']
-            elif data == '{{request_method}}':
-                return request_info['request_method']
-            elif data == '{{request_headers}}':
-                return request_info['request_headers']
-            elif data == '{{request_data}}':
-                return request_info['request_data']
-            elif data == '{{request_args}}':
-                return request_info['request_args']
-            elif data == '{{request_url}}':
-                return request_info['request_url']
-            elif data == '{{request_path}}':
-                return request_info['request_path']
-            elif data == '{{request_remote_addr}}':
-                return request_info['request_remote_addr']
-            elif data == '{{server_port}}':
-                return server_port
-            elif data == '{{endpoints_info}}':
-                # 构建接口信息字典
-                endpoints_info = {}
-                for ep in config_loader.get_endpoints():
-                    endpoints_info[ep['path']] = ep.get('description', '')
-                return endpoints_info
-            else:
-                return data
-        else:
-            return data
 
 
 class RequestValidator:
-    """请求验证器 - 负责验证请求是否符合配置要求"""
+    """
+    请求验证器 - 负责验证请求是否符合配置要求
+    
+    在注册接口时根据验证配置编译一次：必需字段转换为集合，JSON Schema 编译为校验函数，
+    请求时只执行编译好的检查
+    """
     
     def __init__(self, validation_config: Dict[str, Any]):
         """
-        初始化请求验证器
+        初始化请求验证器（编译验证规则）
         
         Args:
             validation_config: 验证配置
+            
+        Raises:
+            ValueError: 验证配置不合法（如 JSON Schema 格式错误）
         """
         self.validation_config = validation_config
+        
+        # 必需的请求头：预先计算对应的 WSGI environ 键，请求时直接查字典
+        self.required_headers: List[Tuple[str, str]] = []
+        for header in validation_config.get('required_headers', []):
+            key = header.upper().replace('-', '_')
+            if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                key = f"HTTP_{key}"
+            self.required_headers.append((header, key))
+        self.required_header_keys = frozenset(key for _, key in self.required_headers)
+        
+        # 必需的查询参数
+        self.required_params: List[str] = list(validation_config.get('required_params', []))
+        self.required_param_set = frozenset(self.required_params)
+        
+        # 必需的请求体字段：顶层字段使用集合检查，user.name 形式的嵌套字段按路径查找
+        self.required_body_fields: List[str] = list(validation_config.get('required_body_fields', []))
+        self.required_body_set = frozenset(field for field in self.required_body_fields if '.' not in field)
+        self.nested_body_fields = [(field, tuple(field.split('.')))
+                                   for field in self.required_body_fields if '.' in field]
+        
+        # JSON Schema
+        self.params_schema = compile_schema(validation_config['params_schema']) \
+            if 'params_schema' in validation_config else None
+        self.body_schema = compile_schema(validation_config['body_schema']) \
+            if 'body_schema' in validation_config else None
+        self.needs_body = bool(self.required_body_fields) or self.body_schema is not None
     
     def validate(self) -> tuple[bool, Optional[str]]:
         """
@@ -322,79 +1013,162 @@ class RequestValidator:
             (是否通过验证, 错误信息)
         """
         # 验证必需的请求头
-        required_headers = self.validation_config.get('required_headers', [])
-        for header in required_headers:
-            if header not in request.headers:
-                return False, f"缺少必需的请求头: {header}"
+        if self.required_header_keys and not self.required_header_keys <= request.environ.keys():
+            for header, key in self.required_headers:
+                if key not in request.environ:
+                    return False, f"缺少必需的请求头: {header}"
         
         # 验证必需的查询参数
-        required_params = self.validation_config.get('required_params', [])
-        for param in required_params:
-            if param not in request.args:
-                return False, f"缺少必需的查询参数: {param}"
-        
-        # 验证必需的请求体字段
-        required_body_fields = self.validation_config.get('required_body_fields', [])
-        if required_body_fields:
-            request_data = None
-            if request.is_json:
-                request_data = request.get_json()
-            elif request.data:
-                try:
-                    request_data = json.loads(request.data.decode('utf-8'))
-                except:
-                    pass
+        if self.required_param_set and not self.required_param_set <= request.args.keys():
+            for param in self.required_params:
+                if param not in request.args:
+                    return False, f"缺少必需的查询参数: {param}"
+        
+        if self.params_schema is not None:
+            error = self.params_schema(request.args.to_dict(), 'query')
+            if error is not None:
+                return False, f"查询参数校验失败: {error}"
+        
+        if self.needs_body:
+            # 与响应构建、请求日志共享同一份请求体解析结果
+            request_data = get_request_context().body.json
             
-            if not request_data:
-                return False, "请求体为空，但配置要求必需字段"
+            if self.required_body_fields:
+                if not request_data or not isinstance(request_data, dict):
+                    return False, "请求体为空，但配置要求必需字段"
+                if self.required_body_set and not self.required_body_set <= request_data.keys():
+                    for field in self.required_body_fields:
+                        if field in self.required_body_set and field not in request_data:
+                            return False, f"缺少必需的请求体字段: {field}"
+                for field, keys in self.nested_body_fields:
+                    if _lookup_json_path(request_data, keys) is None:
+                        return False, f"缺少必需的请求体字段: {field}"
             
-            for field in required_body_fields:
-                if field not in request_data:
-                    return False, f"缺少必需的请求体字段: {field}"
+            if self.body_schema is not None:
+                error = self.body_schema(request_data, 'body')
+                if error is not None:
+                    return False, f"请求体校验失败: {error}"
         
         return True, None
 
 
-# 初始化配置加载器
-config_loader = ConfigLoader()
+# 初始化配置加载器（MOCK_CONFIG 指定配置文件、目录或glob模式，MOCK_CONFIG_CACHE_DIR 为空时不使用编译快照）
+config_loader = ConfigLoader(
+    os.environ.get('MOCK_CONFIG', 'config.json'),
+    os.environ.get('MOCK_CONFIG_CACHE_DIR', '.mock_cache') or None
+)
 
 # 创建Flask应用实例
 app = Flask(__name__)
 
-# 根据配置启用CORS
+# 根据配置启用CORS（CORS、服务器和日志配置在启动时确定，热加载只更新接口和全局设置）
 global_settings = config_loader.get_global_settings()
 if global_settings.get('enable_cors', True):
     CORS(app)
 
-# 初始化响应构建器
-response_builder = ResponseBuilder(global_settings)
+# 请求头名称还原缓存：environ键 -> 请求头名称，按LRU淘汰（global_settings.header_cache_size，默认1024）
+restore_environ_header = lru_cache(maxsize=global_settings.get('header_cache_size', 1024))(
+    ResponseBuilder._restore_environ_key
+)
+
+# 初始化异步请求日志记录器
+request_logger = RequestLogger(global_settings.get('request_log'))
+
+# 接口指标（global_settings.metrics.enabled 为 false 时为None）
+metrics = MetricsRegistry.from_settings(global_settings.get('metrics'))
+
+# 录制回放代理：未配置的路径转发到上游或从录制文件回放（未配置 proxy.mode 时为None）
+recording_proxy = RecordingProxy.from_settings(global_settings.get('proxy'))
+
+# 有状态接口的集合存储（独立于路由表，热加载后数据仍然保留）
+collection_store = CollectionStore(global_settings.get('store'))
 
 # 获取服务器配置
 server_config = config_loader.get_server_config()
 SERVER_PORT = server_config.get('port', 8011)
 
+# 单一分发入口支持的HTTP方法
+DISPATCH_METHODS = ['GET', 'POST', 'PUT', 'DELETE', 'PATCH', 'OPTIONS', 'HEAD']
+
+# 有状态接口的模板中表示存储操作结果的变量
+STORE_RESULT_VARIABLE = 'store_result'
 
-def create_endpoint_handler(endpoint_config: Dict[str, Any]):
+
+def get_request_context() -> RequestContext:
+    """
+    获取当前请求的上下文
+    
+    上下文由分发函数创建并保存在 flask.g 中，请求验证、响应构建和请求日志共享同一个实例
+    
+    Returns:
+        当前请求的上下文
+    """
+    return g.mock_context
+
+
+def create_endpoint_handler(endpoint_config: Dict[str, Any], route_table: 'RouteTable'):
     """
     创建接口处理函数
     
     Args:
         endpoint_config: 接口配置
+        route_table: 接口所属的路由表
         
     Returns:
         处理函数
     """
-    def handler():
+    global_settings = route_table.global_settings
+    response_builder = route_table.response_builder
+    # 注册时预编译响应模板，请求时不再深拷贝和遍历整个模板
+    response_config = endpoint_config.get('response', {})
+    compiled_template = None
+    response_stream = None
+    # 有状态接口：请求映射为集合的增删改查
+    store_endpoint = None
+    if 'store' in endpoint_config:
+        store_endpoint = StoreEndpoint(collection_store, endpoint_config['store'])
+        if 'template' in response_config:
+            compiled_template = response_builder.compile_template(
+                response_config['template'], {STORE_RESULT_VARIABLE}
+            )
+    elif 'stream' in response_config:
+        # 流式响应：边生成边输出，内存占用与响应大小无关
+        response_stream = create_response_stream(
+            response_config['stream'],
+            response_builder.compile_template,
+            response_builder.serializer,
+            app.root_path
+        )
+    else:
+        compiled_template = response_builder.compile_template(response_config['template'])
+    # 响应缓存（只用于普通模板响应），未配置 cache 时为None
+    response_cache = None
+    if compiled_template is not None and store_endpoint is None:
+        response_cache = ResponseCache.from_endpoint(endpoint_config, compiled_template.variables,
+                                                     response_builder.serializer)
+    # 故障注入（延迟、限速、按概率返回错误），未配置时为None
+    fault_injector = FaultInjector.from_endpoint(endpoint_config)
+    # 注册时编译验证规则，请求时不再创建验证器
+    validation_config = endpoint_config.get('request_validation', {})
+    validator = RequestValidator(validation_config) if validation_config else None
+    endpoint_path = endpoint_config['path']
+    
+    def observe_stage(stage: str, started: float):
+        """记录阶段耗时（未启用指标时不记录）"""
+        if metrics is not None:
+            metrics.observe_stage(endpoint_path, stage, time.perf_counter() - started)
+    
+    def handle():
         """
         接口处理函数
         根据配置处理请求并返回响应
         """
         try:
             # 请求验证
-            validation_config = endpoint_config.get('request_validation', {})
-            if validation_config:
-                validator = RequestValidator(validation_config)
+            if validator is not None:
+                stage_started = time.perf_counter()
                 is_valid, error_msg = validator.validate()
+                observe_stage('validation', stage_started)
                 if not is_valid:
                     error_status = global_settings.get('default_error_status', 400)
                     return jsonify({
@@ -405,21 +1179,69 @@ def create_endpoint_handler(endpoint_config: Dict[str, Any]):
             
             # 记录请求日志
             if endpoint_config.get('log_request', False):
+                stage_started = time.perf_counter()
                 _log_request(endpoint_config)
+                observe_stage('logging', stage_started)
             
-            # 构建响应
-            response_template = endpoint_config['response']['template']
-            response_data = response_builder.build_response(
-                response_template, 
-                endpoint_config, 
-                SERVER_PORT
-            )
+            # 故障注入：先模拟响应延迟，再按概率返回错误
+            if fault_injector is not None:
+                stage_started = time.perf_counter()
+                fault_injector.delay()
+                observe_stage('latency', stage_started)
+                failure = fault_injector.pick_failure()
+                if failure is not None:
+                    failure_status = failure.get('status', 503)
+                    failure_body = failure.get('body', {
+                        'status': failure_status,
+                        'message': '模拟故障',
+                        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    })
+                    return jsonify(failure_body), failure_status
             
             # 获取响应状态码
-            status_code = endpoint_config['response'].get('status_code', 200)
+            status_code = response_config.get('status_code', 200)
             
-            return jsonify(response_data), status_code
+            stage_started = time.perf_counter()
+            if store_endpoint is not None:
+                context = get_request_context()
+                store_status, store_result = store_endpoint.handle(
+                    request.method, context.path_params, request.args, context.body.json
+                )
+                if store_status is not None and store_status >= 400:
+                    return jsonify({
+                        'status': store_status,
+                        'message': store_result['message'],
+                        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    }), store_status
+                status_code = store_status or status_code
+                if compiled_template is None:
+                    response_body = response_builder.serializer(store_result)
+                else:
+                    context.set(STORE_RESULT_VARIABLE, store_result)
+                    response_body = response_builder.build_response_body(compiled_template)
+                response = app.response_class(response_body, status=status_code, mimetype=app.json.mimetype)
+            elif response_stream is not None:
+                response = response_stream.respond(app, status_code, get_request_context().get)
+            elif response_cache is not None:
+                response = respond_with_cache(response_cache, compiled_template, endpoint_config, status_code)
+            else:
+                # 构建响应（静态模板直接使用预先序列化的字节串）
+                response_body = response_builder.build_response_body(compiled_template)
+                response = app.response_class(response_body, status=status_code, mimetype=app.json.mimetype)
+            observe_stage('response', stage_started)
             
+            # 带宽限制：响应体在视图返回后按限速逐片输出
+            if fault_injector is not None and fault_injector.bytes_per_second:
+                response.direct_passthrough = False
+                response.response = fault_injector.throttle(response.response)
+            return response
+            
+        except RequestBodyTooLarge as e:
+            return jsonify({
+                'status': 413,
+                'message': str(e),
+                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }), 413
         except Exception as e:
             # 错误处理
             error_status = global_settings.get('default_error_status', 500)
@@ -432,74 +1254,253 @@ def create_endpoint_handler(endpoint_config: Dict[str, Any]):
             print(f"错误: {str(e)}")
             return jsonify(error_response), error_status
     
+    def handler():
+        """处理请求并记录请求数、状态码、响应字节数和处理耗时"""
+        if metrics is None:
+            return handle()
+        started = time.perf_counter()
+        response = app.make_response(handle())
+        method = request.method
+        bytes_out = response.content_length
+        if bytes_out is None:
+            # 流式响应在输出结束后才知道字节数
+            bytes_out = 0
+            response.direct_passthrough = False
+            response.response = _count_response_bytes(response.response, endpoint_path, method)
+        metrics.observe_request(endpoint_path, method, response.status_code, bytes_out,
+                                time.perf_counter() - started)
+        return response
+    
     # 设置函数名称，方便调试
     handler.__name__ = f"handle_{endpoint_config['path'].replace('/', '_').replace(' ', '_')}"
     return handler
 
 
+def respond_with_cache(response_cache: ResponseCache, compiled_template: 'CompiledTemplate',
+                       endpoint_config: Dict[str, Any], status_code: int):
+    """
+    使用响应缓存构建响应
+    
+    相同输入的请求直接返回缓存的响应体；客户端的 If-None-Match 与ETag匹配时返回304
+    
+    Args:
+        response_cache: 接口的响应缓存
+        compiled_template: 预编译的响应模板
+        endpoint_config: 接口配置
+        status_code: 响应状态码
+        
+    Returns:
+        Flask响应对象
+    """
+    endpoint_path = endpoint_config['path']
+    context = get_request_context()
+    cache_key = response_cache.make_key(context.get)
+    cached = response_cache.get(cache_key)
+    if metrics is not None:
+        metrics.observe_cache(endpoint_path, cached is not None)
+    if cached is None:
+        body = context.response_builder.build_response_body(compiled_template)
+        cached = response_cache.put(cache_key, body)
+    
+    if request.if_none_match.contains_weak(cached.etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(cached.body, status=status_code, mimetype=app.json.mimetype)
+    response.set_etag(cached.etag)
+    return response
+
+
+def _count_response_bytes(body, endpoint_path: str, method: str):
+    """
+    统计流式响应的输出字节数，输出结束后计入指标
+    
+    Args:
+        body: 原始响应体分块
+        endpoint_path: 接口路径
+        method: HTTP方法
+        
+    Yields:
+        响应体分块
+    """
+    sent = 0
+    try:
+        for chunk in body:
+            sent += len(chunk)
+            yield chunk
+    finally:
+        metrics.add_bytes(endpoint_path, method, sent)
+        close = getattr(body, 'close', None)
+        if close is not None:
+            close()
+
+
 def _log_request(endpoint_config: Dict[str, Any]):
     """
     记录请求日志
     
+    只在请求线程中收集紧凑的日志记录，序列化和写入由后台线程完成
+    
     Args:
         endpoint_config: 接口配置
     """
-    # 使用响应构建器的方法获取原始请求头（保留大小写）
-    headers = response_builder._get_original_headers()
-    request_data = None
-    if request.is_json:
-        request_data = request.get_json()
-    elif request.data:
-        try:
-            request_data = json.loads(request.data.decode('utf-8'))
-        except:
-            request_data = request.data.decode('utf-8', errors='ignore')
-    request_args = dict(request.args)
+    # 未被采样的请求不收集任何请求信息
+    if not request_logger.sample():
+        return
+    
+    # 复用本次请求的上下文，请求头和请求体在同一请求内只解析一次
+    context = get_request_context()
+    request_logger.log({
+        'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'method': request.method,
+        'path': request.path,
+        'endpoint': endpoint_config['path'],
+        'headers': context.get('request_headers'),
+        'body': context.body.value,
+        'args': context.get('request_args'),
+    })
+        
+
+class RouteTable:
+    """
+    路由表 - 由一份配置编译得到的全部接口处理函数
     
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {request.method} {request.path}")
-    print(f"请求头: {json.dumps(headers, ensure_ascii=False, indent=2)}")
-    if request_data:
-        print(f"请求体: {json.dumps(request_data, ensure_ascii=False, indent=2)}")
-    if request_args:
-        print(f"查询参数: {json.dumps(request_args, ensure_ascii=False, indent=2)}")
-    print("-" * 80)
+    热加载时在后台构建新的路由表，构建成功后整体替换；
+    正在处理的请求继续使用旧路由表，不会被阻塞
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        """
+        根据配置构建路由表（编译所有响应模板）
         
+        Args:
+            config: 完整配置
+        """
+        self.config = config
+        self.global_settings = config.get('global_settings', {})
+        self.endpoints = config.get('endpoints', [])
+        self.endpoints_info = {ep['path']: ep.get('description', '') for ep in self.endpoints}
+        # 序列化后端由 global_settings.serializer 决定，stdlib 后端使用Flask的JSON配置
+        serializer = create_serializer(self.global_settings.get('serializer'), app.json.dumps,
+                                       getattr(app.json, 'sort_keys', False))
+        self.response_builder = ResponseBuilder(self.global_settings, serializer)
+        # 字面路径使用哈希表，带参数的路径使用前缀树，查找耗时与接口数量无关
+        self.router = Router()
+        for endpoint_config in self.endpoints:
+            handler = create_endpoint_handler(endpoint_config, self)
+            self.router.add(endpoint_config['path'], endpoint_config.get('methods', ['GET']), handler)
+
+
+# 当前生效的路由表，热加载时整体替换（引用赋值是原子操作）
+route_table = RouteTable(config_loader.config)
+
+
+def reload_config() -> bool:
+    """
+    重新加载配置文件并替换路由表
+    
+    新配置解析、校验和模板编译全部成功后才会替换，否则保留原路由表
+    
+    Returns:
+        是否成功加载
+    """
+    global route_table
+    try:
+        new_config = config_loader.read_config()
+        new_route_table = RouteTable(new_config)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"⚠ 配置文件重新加载失败，继续使用原配置: {str(e)}")
+        return False
+    config_loader.config = new_config
+    route_table = new_route_table
+    print(f"✓ 配置文件已重新加载，接口数量: {len(new_route_table.endpoints)}")
+    return True
+
+
+# 配置文件监听器（server.hot_reload 为 false 时不启用）
+config_watcher = ConfigWatcher(
+    config_loader.config_path,
+    reload_config,
+    server_config.get('reload_interval', 1.0),
+    config_loader.get_signature
+)
+
+
+def dispatch(path: str = ''):
+    """
+    单一分发入口：根据当前路由表查找并调用接口处理函数
+    """
+    if server_config.get('hot_reload', True):
+        config_watcher.ensure_started()
+    collection_store.ensure_snapshot_thread()
+    
+    # 整个请求使用同一个路由表，热加载不会影响正在处理的请求
+    table = route_table
+    match = table.router.match(request.method, request.path)
+    if match.handler is None:
+        if not match.allowed_methods:
+            if recording_proxy is not None:
+                return recording_proxy.respond(app)
+            abort(404)
+        # 与Flask路由一致：Allow 只列出该路径配置的方法，GET接口自动支持HEAD，并自动响应OPTIONS请求
+        allowed_methods = set(match.allowed_methods) | {'OPTIONS'}
+        if 'GET' in allowed_methods:
+            allowed_methods.add('HEAD')
+        if request.method == 'OPTIONS':
+            response = app.response_class()
+            response.allow.update(allowed_methods)
+            return response
+        abort(405, valid_methods=sorted(allowed_methods))
+    
+    g.mock_context = RequestContext(table, SERVER_PORT, match.params)
+    return match.handler()
+
+
+def metrics_view():
+    """以Prometheus文本格式输出接口指标"""
+    return app.response_class(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+def metrics_json_view():
+    """以JSON格式输出接口指标"""
+    return jsonify(metrics.render_json())
 
-# 动态注册所有接口
-def register_endpoints():
-    """根据配置文件动态注册所有接口"""
-    endpoints = config_loader.get_endpoints()
-    for endpoint_config in endpoints:
-        path = endpoint_config['path']
-        methods = endpoint_config.get('methods', ['GET'])
-        handler = create_endpoint_handler(endpoint_config)
-        app.route(path, methods=methods)(handler)
-        print(f"已注册接口: {path} [{', '.join(methods)}]")
 
+# 指标路径是字面路径，优先于分发入口匹配
+if metrics is not None:
+    app.add_url_rule(metrics.path, 'metrics', metrics_view, methods=['GET'])
+    app.add_url_rule(f"{metrics.path}.json", 'metrics_json', metrics_json_view, methods=['GET'])
 
-# 注册所有接口
-register_endpoints()
+# 注册单一分发入口，所有接口通过路由表分发
+app.add_url_rule('/', 'dispatch', dispatch, methods=DISPATCH_METHODS, provide_automatic_options=False)
+app.add_url_rule('/<path:path>', 'dispatch', dispatch, methods=DISPATCH_METHODS, provide_automatic_options=False)
+# 接口数量较多时（如由OpenAPI生成的配置）只输出汇总信息
+ENDPOINT_LIST_LIMIT = server_config.get('endpoint_list_limit', 100)
+if len(route_table.endpoints) <= ENDPOINT_LIST_LIMIT:
+    for endpoint_config in route_table.endpoints:
+        print(f"已注册接口: {endpoint_config['path']} [{', '.join(endpoint_config.get('methods', ['GET']))}]")
+else:
+    print(f"已注册接口: {len(route_table.endpoints)} 个")
 
 
 if __name__ == '__main__':
     """
-    启动Flask开发服务器
-    根据配置文件中的设置启动服务
+    启动Mock服务
+    根据配置文件中的 server.mode 选择开发服务器（dev）或多进程生产服务器（serve）
     """
-    host = server_config.get('host', '0.0.0.0')
     port = server_config.get('port', 8011)
-    debug = server_config.get('debug', True)
     
     print("=" * 80)
     print("Mock服务启动中...")
     print(f"服务地址: http://localhost:{port}")
+    print(f"启动模式: {server_config.get('mode', 'dev')}")
     print(f"配置文件: {config_loader.config_path}")
     print(f"已注册接口数量: {len(config_loader.get_endpoints())}")
-    print("-" * 80)
-    for endpoint in config_loader.get_endpoints():
-        methods_str = ', '.join(endpoint.get('methods', ['GET']))
-        print(f"  {endpoint['path']} [{methods_str}] - {endpoint.get('description', '')}")
+    if len(config_loader.get_endpoints()) <= ENDPOINT_LIST_LIMIT:
+        print("-" * 80)
+        for endpoint in config_loader.get_endpoints():
+            methods_str = ', '.join(endpoint.get('methods', ['GET']))
+            print(f"  {endpoint['path']} [{methods_str}] - {endpoint.get('description', '')}")
     print("=" * 80)
     
     # 启动服务器
-    app.run(host=host, port=port, debug=debug)
+    run_server(app, server_config)
@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+接口指标 - 统计每个接口的请求数、状态码、响应字节数和延迟直方图
+
+- 每个线程写入自己的分片，请求处理路径上没有任何锁
+- 读取指标时合并全部分片；已退出线程的分片会并入汇总分片，分片数量不随线程创建无限增长
+- 以Prometheus文本格式和JSON两种方式输出
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Dict, Any, List, Optional, Tuple
+
+
+# 延迟直方图的桶上界（秒）
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# 默认的指标路径，JSON格式的路径为该路径加 .json
+DEFAULT_METRICS_PATH = '/__mock__/metrics'
+
+
+class MetricsShard:
+    """单个线程的指标分片，只由所属线程写入"""
+
+    __slots__ = ('thread', 'requests', 'bytes_out', 'latency', 'stages', 'cache')
+
+    def __init__(self, thread: Optional[threading.Thread]):
+        self.thread = thread
+        # (接口, 方法, 状态码) -> 请求数
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        # (接口, 方法) -> 响应字节数
+        self.bytes_out: Dict[Tuple[str, str], int] = {}
+        # (接口, 方法) -> 直方图：[各桶计数..., 超出最大桶的计数, 总和]
+        self.latency: Dict[Tuple[str, str], List[float]] = {}
+        # (接口, 阶段) -> 直方图
+        self.stages: Dict[Tuple[str, str], List[float]] = {}
+        # (接口, hit 或 miss) -> 响应缓存查找次数
+        self.cache: Dict[Tuple[str, str], int] = {}
+
+    def merge(self, other: 'MetricsShard'):
+        """把另一个分片的数据累加到当前分片"""
+        for target, source in ((self.requests, other.requests), (self.bytes_out, other.bytes_out),
+                               (self.cache, other.cache)):
+            for key, value in source.copy().items():
+                target[key] = target.get(key, 0) + value
+        for target, source in ((self.latency, other.latency), (self.stages, other.stages)):
+            for key, histogram in source.copy().items():
+                merged = target.get(key)
+                if merged is None:
+                    target[key] = list(histogram)
+                else:
+                    for index, value in enumerate(histogram):
+                        merged[index] += value
+
+
+class MetricsRegistry:
+    """
+    指标注册表
+
+    配置示例（global_settings.metrics）：
+        {"enabled": true, "path": "/__mock__/metrics"}
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, path: str = DEFAULT_METRICS_PATH):
+        """
+        初始化指标注册表
+
+        Args:
+            buckets: 延迟直方图的桶上界（秒，递增）
+            path: 指标路径
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.path = path
+        self._local = threading.local()
+        self._shards: List[MetricsShard] = []
+        # 已退出线程的数据汇总
+        self._retired = MetricsShard(None)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict[str, Any]]) -> Optional['MetricsRegistry']:
+        """
+        根据配置创建指标注册表，enabled 为 false 时返回None（请求处理时无额外开销）
+
+        Args:
+            settings: global_settings.metrics 配置
+
+        Returns:
+            指标注册表或None
+        """
+        settings = settings or {}
+        if not settings.get('enabled', True):
+            return None
+        return cls(tuple(settings.get('buckets', DEFAULT_BUCKETS)), settings.get('path', DEFAULT_METRICS_PATH))
+
+    def _shard(self) -> MetricsShard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            return self._register_shard()
+
+    def _register_shard(self) -> MetricsShard:
+        """为当前线程创建分片（每个线程只执行一次）"""
+        shard = self._local.shard = MetricsShard(threading.current_thread())
+        with self._lock:
+            self._retire_dead_shards()
+            self._shards.append(shard)
+        return shard
+
+    def _retire_dead_shards(self):
+        """把已退出线程的分片并入汇总分片（调用方需持有锁）"""
+        alive = []
+        for shard in self._shards:
+            if shard.thread.is_alive():
+                alive.append(shard)
+            else:
+                self._retired.merge(shard)
+        self._shards = alive
+
+    def _new_histogram(self) -> List[float]:
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe_request(self, endpoint: str, method: str, status: int, bytes_out: int, seconds: float):
+        """
+        记录一次请求
+
+        Args:
+            endpoint: 接口路径（配置中的路径模式）
+            method: HTTP方法
+            status: 响应状态码
+            bytes_out: 响应体字节数
+            seconds: 处理耗时（秒）
+        """
+        # 请求处理路径：只有字典和列表操作，不加锁
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._register_shard()
+        key = (endpoint, method, status)
+        requests = shard.requests
+        requests[key] = requests.get(key, 0) + 1
+        key = (endpoint, method)
+        if bytes_out:
+            shard.bytes_out[key] = shard.bytes_out.get(key, 0) + bytes_out
+        try:
+            histogram = shard.latency[key]
+        except KeyError:
+            histogram = shard.latency[key] = self._new_histogram()
+        histogram[bisect_left(self.buckets, seconds)] += 1
+        histogram[-1] += seconds
+
+    def observe_stage(self, endpoint: str, stage: str, seconds: float):
+        """
+        记录一次阶段耗时
+
+        Args:
+            endpoint: 接口路径
+            stage: 阶段名称，如 validation、response、logging
+            seconds: 耗时（秒）
+        """
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._register_shard()
+        key = (endpoint, stage)
+        try:
+            histogram = shard.stages[key]
+        except KeyError:
+            histogram = shard.stages[key] = self._new_histogram()
+        histogram[bisect_left(self.buckets, seconds)] += 1
+        histogram[-1] += seconds
+
+    def observe_cache(self, endpoint: str, hit: bool):
+        """
+        记录一次响应缓存查找
+
+        Args:
+            endpoint: 接口路径
+            hit: 是否命中
+        """
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._register_shard()
+        key = (endpoint, 'hit' if hit else 'miss')
+        shard.cache[key] = shard.cache.get(key, 0) + 1
+
+    def add_bytes(self, endpoint: str, method: str, bytes_out: int):
+        """补记流式响应在输出结束后才确定的响应字节数"""
+        shard = self._shard()
+        key = (endpoint, method)
+        shard.bytes_out[key] = shard.bytes_out.get(key, 0) + bytes_out
+
+    def collect(self) -> MetricsShard:
+        """
+        合并全部分片
+
+        Returns:
+            合并后的指标
+        """
+        with self._lock:
+            self._retire_dead_shards()
+            merged = MetricsShard(None)
+            merged.merge(self._retired)
+            for shard in self._shards:
+                merged.merge(shard)
+        return merged
+
+    def estimate_quantile(self, histogram: List[float], quantile: float) -> float:
+        """
+        根据直方图估算分位数（在桶内线性插值）
+
+        Args:
+            histogram: 直方图
+            quantile: 分位（0到1）
+
+        Returns:
+            估算的耗时（秒）
+        """
+        counts = histogram[:-1]
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank = quantile * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index >= len(self.buckets):
+                    # 超出最大桶时只能返回最大桶的上界
+                    return self.buckets[-1]
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def render_prometheus(self) -> str:
+        """
+        以Prometheus文本格式输出指标
+
+        Returns:
+            指标文本
+        """
+        data = self.collect()
+        lines = [
+            '# HELP mock_requests_total Mock接口请求数',
+            '# TYPE mock_requests_total counter',
+        ]
+        for (endpoint, method, status), count in sorted(data.requests.items()):
+            lines.append(f'mock_requests_total{{{_labels(endpoint=endpoint, method=method, status=status)}}} {count}')
+        lines += [
+            '# HELP mock_response_bytes_total Mock接口响应体字节数',
+            '# TYPE mock_response_bytes_total counter',
+        ]
+        for (endpoint, method), count in sorted(data.bytes_out.items()):
+            lines.append(f'mock_response_bytes_total{{{_labels(endpoint=endpoint, method=method)}}} {count}')
+        lines += [
+            '# HELP mock_request_duration_seconds Mock接口处理耗时',
+            '# TYPE mock_request_duration_seconds histogram',
+        ]
+        for (endpoint, method), histogram in sorted(data.latency.items()):
+            lines += self._render_histogram('mock_request_duration_seconds',
+                                            _labels(endpoint=endpoint, method=method), histogram)
+        lines += [
+            '# HELP mock_stage_duration_seconds Mock接口各处理阶段耗时',
+            '# TYPE mock_stage_duration_seconds histogram',
+        ]
+        for (endpoint, stage), histogram in sorted(data.stages.items()):
+            lines += self._render_histogram('mock_stage_duration_seconds',
+                                            _labels(endpoint=endpoint, stage=stage), histogram)
+        lines += [
+            '# HELP mock_response_cache_total Mock接口响应缓存查找次数',
+            '# TYPE mock_response_cache_total counter',
+        ]
+        for (endpoint, result), count in sorted(data.cache.items()):
+            lines.append(f'mock_response_cache_total{{{_labels(endpoint=endpoint, result=result)}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def _render_histogram(self, name: str, labels: str, histogram: List[float]) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, histogram):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        cumulative += histogram[len(self.buckets)]
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {histogram[-1]}')
+        lines.append(f'{name}_count{{{labels}}} {cumulative}')
+        return lines
+
+    def render_json(self) -> Dict[str, Any]:
+        """
+        以JSON结构输出指标（延迟为毫秒，分位数由直方图估算）
+
+        Returns:
+            指标字典：{接口: {"methods": {方法: {...}}, "stages": {阶段: {...}}}}
+        """
+        data = self.collect()
+        endpoints: Dict[str, Any] = {}
+
+        def method_entry(endpoint: str, method: str) -> Dict[str, Any]:
+            methods = endpoints.setdefault(endpoint, {'methods': {}, 'stages': {}})['methods']
+            return methods.setdefault(method, {'requests': 0, 'status': {}, 'bytes_out': 0})
+
+        for (endpoint, method, status), count in data.requests.items():
+            entry = method_entry(endpoint, method)
+            entry['requests'] += count
+            entry['status'][str(status)] = entry['status'].get(str(status), 0) + count
+        for (endpoint, method), count in data.bytes_out.items():
+            method_entry(endpoint, method)['bytes_out'] = count
+        for (endpoint, method), histogram in data.latency.items():
+            method_entry(endpoint, method)['latency'] = self._summarize(histogram)
+        for (endpoint, stage), histogram in data.stages.items():
+            stages = endpoints.setdefault(endpoint, {'methods': {}, 'stages': {}})['stages']
+            stages[stage] = self._summarize(histogram)
+        for (endpoint, result), count in data.cache.items():
+            entry = endpoints.setdefault(endpoint, {'methods': {}, 'stages': {}})
+            entry.setdefault('cache', {'hit': 0, 'miss': 0})[result] = count
+        return {'endpoints': endpoints}
+
+    def _summarize(self, histogram: List[float]) -> Dict[str, Any]:
+        count = int(sum(histogram[:-1]))
+        return {
+            'count': count,
+            'avg_ms': round(histogram[-1] * 1000 / count, 3) if count else 0.0,
+            'p50_ms': round(self.estimate_quantile(histogram, 0.5) * 1000, 3),
+            'p95_ms': round(self.estimate_quantile(histogram, 0.95) * 1000, 3),
+            'p99_ms': round(self.estimate_quantile(histogram, 0.99) * 1000, 3),
+        }
+
+
+def _labels(**labels: Any) -> str:
+    """生成Prometheus标签文本，转义反斜杠、双引号和换行"""
+    return ','.join(f'{name}="{_escape_label(str(value))}"' for name, value in labels.items())
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
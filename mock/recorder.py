@@ -0,0 +1,345 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+录制回放代理 - 把未配置的路径转发到上游服务，录制请求和响应，之后直接回放
+
+- 录制文件（cassette）只追加写入：每条记录为一行JSON头信息，紧跟原始响应体字节
+- 索引文件（录制文件名 + .idx）以 方法 + 路径 + 查询参数 + 规范化请求体哈希 为键，
+  记录响应体在录制文件中的偏移量；启动时只读取索引，索引落后于录制文件时只扫描新增部分
+- 回放时通过内存映射读取响应体，数GB的录制文件也能立即加载，且不会整体读入内存
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import threading
+import urllib.error
+import urllib.request
+from typing import Dict, Any, Optional, Iterator, List, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from flask import Flask, request
+
+
+# 代理模式
+PROXY_MODES = ('record', 'replay', 'auto')
+
+# 不转发、不录制的逐跳请求头和响应头
+HOP_BY_HOP_HEADERS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailers', 'transfer-encoding', 'upgrade', 'host', 'content-length',
+}
+
+# 回放大响应体时每次输出的字节数
+REPLAY_CHUNK_SIZE = 64 * 1024
+
+
+def normalize_body(body: bytes) -> bytes:
+    """
+    规范化请求体：JSON请求体按键排序并去掉空白，使字段顺序不同的相同请求得到相同的键
+
+    Args:
+        body: 原始请求体
+
+    Returns:
+        规范化后的请求体
+    """
+    if not body:
+        return b''
+    try:
+        data = json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        return body
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def make_cassette_key(method: str, path: str, query_string: str, body: bytes) -> str:
+    """
+    生成录制记录的键
+
+    Args:
+        method: HTTP方法
+        path: 请求路径
+        query_string: 查询字符串（按参数名排序后参与计算）
+        body: 原始请求体
+
+    Returns:
+        键，形如 "GET /api/users?page=1 <请求体哈希>"
+    """
+    query = urlencode(sorted(parse_qsl(query_string, keep_blank_values=True)))
+    body_hash = hashlib.sha1(normalize_body(body)).hexdigest()
+    return f"{method.upper()} {path}{'?' + query if query else ''} {body_hash}"
+
+
+class CassetteEntry:
+    """录制记录在录制文件中的位置和响应头信息"""
+
+    __slots__ = ('status', 'headers', 'offset', 'length')
+
+    def __init__(self, status: int, headers: List[Tuple[str, str]], offset: int, length: int):
+        self.status = status
+        self.headers = headers
+        # 响应体在录制文件中的起始偏移量和长度
+        self.offset = offset
+        self.length = length
+
+
+class Cassette:
+    """
+    录制文件
+
+    同一个键录制多次时以最后一次为准；写入在进程内串行执行，
+    录制模式下建议使用单个工作进程，避免多个进程同时追加
+    """
+
+    def __init__(self, path: str):
+        """
+        打开录制文件并加载索引
+
+        Args:
+            path: 录制文件路径
+        """
+        self.path = path
+        self.index_path = f"{path}.idx"
+        self._entries: Dict[str, CassetteEntry] = {}
+        self._write_lock = threading.Lock()
+        self._map_lock = threading.Lock()
+        self._mapped: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _load_index(self):
+        """读取索引文件，并扫描录制文件中索引未覆盖的部分"""
+        indexed_end = 0
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        item = json.loads(line)
+                        self._entries[item['key']] = CassetteEntry(
+                            item['status'], [tuple(h) for h in item['headers']], item['offset'], item['length']
+                        )
+                        indexed_end = max(indexed_end, item['offset'] + item['length'] + 1)
+            except (OSError, ValueError, KeyError) as e:
+                # 索引损坏时从头扫描录制文件
+                print(f"⚠ 录制索引读取失败，重新扫描录制文件: {str(e)}")
+                self._entries.clear()
+                indexed_end = 0
+        cassette_size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if cassette_size > indexed_end:
+            self._scan(indexed_end, cassette_size)
+
+    def _scan(self, start: int, end: int):
+        """
+        扫描录制文件（只解析头信息，通过长度跳过响应体），并把结果追加到索引文件
+
+        Args:
+            start: 起始偏移量
+            end: 文件大小
+        """
+        # 从头扫描时重写索引文件
+        index_mode = 'w' if start == 0 else 'a'
+        with open(self.path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, \
+                open(self.index_path, index_mode, encoding='utf-8') as index_file:
+            position = start
+            while position < end:
+                newline = mapped.find(b'\n', position, end)
+                if newline < 0:
+                    break
+                try:
+                    header = json.loads(mapped[position:newline])
+                except ValueError:
+                    print(f"⚠ 录制文件在偏移量 {position} 处损坏，忽略之后的内容")
+                    break
+                offset = newline + 1
+                length = header['length']
+                if offset + length > end:
+                    # 写入中途中断的不完整记录
+                    break
+                self._add_entry(header['key'], header['status'], header['headers'], offset, length, index_file)
+                position = offset + length + 1
+
+    def _add_entry(self, key: str, status: int, headers: List[Any], offset: int, length: int, index_file):
+        self._entries[key] = CassetteEntry(status, [tuple(h) for h in headers], offset, length)
+        index_file.write(json.dumps({
+            'key': key, 'status': status, 'headers': headers, 'offset': offset, 'length': length
+        }, ensure_ascii=False) + '\n')
+
+    def find(self, key: str) -> Optional[CassetteEntry]:
+        """按键查找录制记录"""
+        return self._entries.get(key)
+
+    def append(self, key: str, request_info: Dict[str, Any], status: int,
+               headers: List[Tuple[str, str]], body: bytes) -> CassetteEntry:
+        """
+        追加一条录制记录
+
+        Args:
+            key: 录制记录的键
+            request_info: 请求信息（方法、路径、查询参数、请求体），只用于人工查看录制文件
+            status: 响应状态码
+            headers: 响应头
+            body: 响应体
+
+        Returns:
+            录制记录
+        """
+        header = dict(request_info, key=key, status=status, headers=[list(h) for h in headers], length=len(body))
+        header_line = json.dumps(header, ensure_ascii=False).encode('utf-8') + b'\n'
+        with self._write_lock:
+            with open(self.path, 'ab') as f, open(self.index_path, 'a', encoding='utf-8') as index_file:
+                start = f.tell()
+                f.write(header_line)
+                f.write(body)
+                f.write(b'\n')
+                f.flush()
+                self._add_entry(key, status, header['headers'], start + len(header_line), len(body), index_file)
+        return self._entries[key]
+
+    def _get_mapped(self, end: int) -> mmap.mmap:
+        """获取录制文件的内存映射，文件增长到映射范围之外时重新映射"""
+        mapped = self._mapped
+        if mapped is not None and end <= self._mapped_size:
+            return mapped
+        with self._map_lock:
+            if self._mapped is None or end > self._mapped_size:
+                # 旧的映射可能仍在被正在输出的响应使用，由垃圾回收关闭
+                with open(self.path, 'rb') as f:
+                    self._mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._mapped_size = len(self._mapped)
+            return self._mapped
+
+    def read_body(self, entry: CassetteEntry) -> Iterator[bytes]:
+        """
+        从内存映射中分块读取响应体
+
+        Args:
+            entry: 录制记录
+
+        Yields:
+            响应体分块
+        """
+        end = entry.offset + entry.length
+        if entry.length == 0:
+            return
+        mapped = self._get_mapped(end)
+        for start in range(entry.offset, end, REPLAY_CHUNK_SIZE):
+            yield mapped[start:min(start + REPLAY_CHUNK_SIZE, end)]
+
+
+class RecordingProxy:
+    """
+    录制回放代理
+
+    配置示例（global_settings.proxy）：
+        {"mode": "auto", "upstream": "http://localhost:9000", "cassette": "cassettes/default.cassette"}
+
+    - record：全部转发到上游并录制
+    - replay：只从录制文件回放，未录制的请求返回404
+    - auto：已录制的请求直接回放，未录制的请求转发并录制
+    """
+
+    def __init__(self, settings: Dict[str, Any]):
+        """
+        初始化代理
+
+        Args:
+            settings: global_settings.proxy 配置
+
+        Raises:
+            ValueError: 配置不合法
+        """
+        self.mode = settings.get('mode', 'auto')
+        if self.mode not in PROXY_MODES:
+            raise ValueError(f"不支持的代理模式: {self.mode}，可选值为 {', '.join(PROXY_MODES)}")
+        self.upstream = (settings.get('upstream') or '').rstrip('/')
+        if self.mode != 'replay' and not self.upstream:
+            raise ValueError(f"{self.mode} 代理模式需要配置 upstream 上游地址")
+        self.timeout = float(settings.get('timeout', 30))
+        self.cassette = Cassette(settings.get('cassette', 'cassettes/default.cassette'))
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict[str, Any]]) -> Optional['RecordingProxy']:
+        """
+        根据配置创建代理，未配置或未设置 mode 时返回None
+
+        Args:
+            settings: global_settings.proxy 配置
+
+        Returns:
+            代理对象或None
+        """
+        if not settings or not settings.get('mode'):
+            return None
+        return cls(settings)
+
+    def respond(self, app: Flask):
+        """
+        处理当前请求：回放录制记录或转发到上游
+
+        Args:
+            app: Flask应用
+
+        Returns:
+            Flask响应对象
+        """
+        body = request.get_data(cache=True)
+        key = make_cassette_key(request.method, request.path, request.query_string.decode('latin-1'), body)
+        if self.mode != 'record':
+            entry = self.cassette.find(key)
+            if entry is not None:
+                return app.response_class(self.cassette.read_body(entry), status=entry.status,
+                                          headers=entry.headers)
+            if self.mode == 'replay':
+                return app.response_class(
+                    json.dumps({'status': 404, 'message': f"未找到录制记录: {key}"}, ensure_ascii=False),
+                    status=404, mimetype=app.json.mimetype
+                )
+
+        status, headers, response_body = self._forward(body)
+        if status is None:
+            return app.response_class(
+                json.dumps({'status': 502, 'message': f"上游请求失败: {headers}"}, ensure_ascii=False),
+                status=502, mimetype=app.json.mimetype
+            )
+        self.cassette.append(key, {
+            'method': request.method,
+            'path': request.path,
+            'query': request.query_string.decode('latin-1'),
+            'body': body.decode('utf-8', errors='replace'),
+        }, status, headers, response_body)
+        return app.response_class(response_body, status=status, headers=headers)
+
+    def _forward(self, body: bytes) -> Tuple[Optional[int], Any, bytes]:
+        """
+        把当前请求转发到上游
+
+        Returns:
+            (状态码, 响应头, 响应体)；上游无法连接时返回 (None, 错误信息, b'')
+        """
+        url = self.upstream + request.full_path if request.query_string else self.upstream + request.path
+        headers = {name: value for name, value in request.headers.items()
+                   if name.lower() not in HOP_BY_HOP_HEADERS}
+        upstream_request = urllib.request.Request(url, data=body or None, headers=headers, method=request.method)
+        try:
+            with urllib.request.urlopen(upstream_request, timeout=self.timeout) as upstream_response:
+                return upstream_response.status, self._filter_headers(upstream_response.headers.items()), \
+                    upstream_response.read()
+        except urllib.error.HTTPError as e:
+            # 上游返回的4xx/5xx同样录制
+            with e:
+                return e.code, self._filter_headers(e.headers.items()), e.read()
+        except (urllib.error.URLError, OSError) as e:
+            return None, str(e), b''
+
+    @staticmethod
+    def _filter_headers(headers) -> List[Tuple[str, str]]:
+        return [(name, value) for name, value in headers if name.lower() not in HOP_BY_HOP_HEADERS]
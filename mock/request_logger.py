@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+请求日志 - 异步、批量写入的请求日志管道
+
+请求线程只负责把紧凑的日志记录放入有界队列，由后台线程批量序列化为 JSON Lines
+写入标准输出或按大小滚动的日志文件；格式化展示交给离线查看工具：
+
+    python request_logger.py logs/requests.jsonl
+"""
+
+import argparse
+import atexit
+import itertools
+import json
+import os
+import queue
+import sys
+import threading
+from typing import Dict, Any, List, Optional, TextIO
+
+
+# 请求日志的默认配置（global_settings.request_log）
+DEFAULT_LOG_SETTINGS: Dict[str, Any] = {
+    'output': 'stdout',           # stdout 或 file
+    'path': 'logs/requests.jsonl',
+    'queue_size': 10000,
+    'batch_size': 200,
+    'flush_interval': 1.0,        # 秒
+    'policy': 'drop',             # 队列已满时：drop 丢弃，block 阻塞等待
+    'sample_rate': 1,             # 每N个请求记录1个
+    'max_bytes': 50 * 1024 * 1024,
+    'backup_count': 5,
+    'per_process_file': False,    # 多进程模式下每个进程写入单独的文件（文件名追加进程号）
+}
+
+
+class RotatingFileWriter:
+    """按文件大小滚动的日志文件写入器"""
+
+    def __init__(self, path: str, max_bytes: int, backup_count: int):
+        """
+        初始化写入器
+
+        Args:
+            path: 日志文件路径
+            max_bytes: 单个日志文件的最大字节数，0表示不滚动
+            backup_count: 保留的历史日志文件数量
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._size = self._file.tell()
+
+    def write(self, text: str):
+        """写入一批日志，超过大小限制时先滚动"""
+        size = len(text.encode('utf-8'))
+        if self.max_bytes and self._size and self._size + size > self.max_bytes:
+            self._rotate()
+        self._file.write(text)
+        self._file.flush()
+        self._size += size
+
+    def _rotate(self):
+        """滚动日志文件：requests.jsonl -> requests.jsonl.1 -> requests.jsonl.2 ..."""
+        self._file.close()
+        if self.backup_count > 0:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._size = 0
+
+    def close(self):
+        self._file.close()
+
+
+class StreamWriter:
+    """写入标准输出等文本流"""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+
+    def write(self, text: str):
+        self.stream.write(text)
+        self.stream.flush()
+
+    def close(self):
+        pass
+
+
+class RequestLogger:
+    """
+    异步请求日志记录器
+
+    - 请求线程调用 log() 把记录放入有界队列，不做任何格式化和IO
+    - 后台线程批量取出记录，序列化为 JSON Lines 后一次性写入
+    - 队列已满时按 policy 丢弃（drop）或阻塞等待（block）
+    - 支持按 sample_rate 采样，每N个请求记录1个
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        """
+        初始化请求日志记录器
+
+        Args:
+            settings: 日志配置，未配置的项使用 DEFAULT_LOG_SETTINGS
+        """
+        self.settings = dict(DEFAULT_LOG_SETTINGS)
+        self.settings.update(settings or {})
+        if self.settings['policy'] not in ('drop', 'block'):
+            raise ValueError(f"不支持的日志队列策略: {self.settings['policy']}，可选值为 drop 或 block")
+        self.sample_rate = max(int(self.settings['sample_rate']), 1)
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=self.settings['queue_size'])
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        atexit.register(self.close)
+
+    def sample(self) -> bool:
+        """
+        判断当前请求是否需要记录（在收集请求信息之前调用，未采中的请求不产生任何开销）
+
+        Returns:
+            是否记录
+        """
+        if self.sample_rate == 1:
+            return True
+        return next(self._counter) % self.sample_rate == 0
+
+    def log(self, record: Dict[str, Any]) -> bool:
+        """
+        提交一条日志记录
+
+        Args:
+            record: 日志记录（由后台线程序列化，调用方提交后不得再修改）
+
+        Returns:
+            是否成功放入队列（drop 策略下队列已满时返回 False）
+        """
+        self._ensure_started()
+        if self.settings['policy'] == 'block':
+            self._queue.put(record)
+            return True
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _ensure_started(self):
+        """按进程启动后台写入线程（多进程模式下fork后的子进程需要重新启动）"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            if self._thread is not None:
+                # fork继承的队列和线程状态不可用，重新创建
+                self._queue = queue.Queue(maxsize=self.settings['queue_size'])
+            self._thread = threading.Thread(target=self._run, name='request-logger', daemon=True)
+            self._thread.start()
+            self._pid = pid
+
+    def _create_writer(self):
+        if self.settings['output'] == 'file':
+            path = self.settings['path']
+            # 多进程同时滚动同一个文件会互相覆盖，可以按进程拆分文件
+            if self.settings['per_process_file']:
+                path = f"{path}.{os.getpid()}"
+            return RotatingFileWriter(path, self.settings['max_bytes'], self.settings['backup_count'])
+        return StreamWriter(sys.stdout)
+
+    def _run(self):
+        """后台线程：批量取出记录并写入"""
+        writer = self._create_writer()
+        batch_size = self.settings['batch_size']
+        flush_interval = self.settings['flush_interval']
+        while True:
+            try:
+                first = self._queue.get(timeout=flush_interval)
+            except queue.Empty:
+                continue
+            if first is None:
+                break
+            batch = [first]
+            stop = False
+            while len(batch) < batch_size:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    stop = True
+                    break
+                batch.append(record)
+            self._write_batch(writer, batch)
+            if stop:
+                break
+        writer.close()
+
+    def _write_batch(self, writer, batch: List[Dict[str, Any]]):
+        lines = []
+        for record in batch:
+            try:
+                lines.append(json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str))
+            except (TypeError, ValueError) as e:
+                lines.append(json.dumps({'log_error': str(e)}, ensure_ascii=False))
+        try:
+            writer.write('\n'.join(lines) + '\n')
+        except OSError as e:
+            print(f"写入请求日志失败: {str(e)}", file=sys.stderr)
+
+    def close(self, timeout: float = 5.0):
+        """
+        停止后台线程，并写入队列中剩余的日志
+
+        Args:
+            timeout: 等待后台线程结束的最长时间（秒）
+        """
+        thread = self._thread
+        if thread is None or self._pid != os.getpid() or not thread.is_alive():
+            return
+        self._queue.put(None)
+        thread.join(timeout)
+
+
+def format_record(record: Dict[str, Any]) -> str:
+    """
+    把一条日志记录格式化为便于阅读的文本
+
+    Args:
+        record: 日志记录
+
+    Returns:
+        格式化后的文本
+    """
+    lines = [f"[{record.get('time', '')}] {record.get('method', '')} {record.get('path', '')}"]
+    lines.append(f"请求头: {json.dumps(record.get('headers', {}), ensure_ascii=False, indent=2)}")
+    if record.get('body'):
+        lines.append(f"请求体: {json.dumps(record['body'], ensure_ascii=False, indent=2)}")
+    if record.get('args'):
+        lines.append(f"查询参数: {json.dumps(record['args'], ensure_ascii=False, indent=2)}")
+    lines.append("-" * 80)
+    return '\n'.join(lines)
+
+
+def main():
+    """离线查看请求日志"""
+    parser = argparse.ArgumentParser(description='格式化查看 JSON Lines 格式的请求日志')
+    parser.add_argument('files', nargs='*', help='日志文件，不指定时从标准输入读取')
+    parser.add_argument('--path', help='只显示指定路径的请求')
+    parser.add_argument('--method', help='只显示指定方法的请求')
+    args = parser.parse_args()
+
+    streams = [open(f, 'r', encoding='utf-8') for f in args.files] if args.files else [sys.stdin]
+    for stream in streams:
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                print(line)
+                continue
+            if args.path and record.get('path') != args.path:
+                continue
+            if args.method and record.get('method', '').upper() != args.method.upper():
+                continue
+            print(format_record(record))
+
+
+if __name__ == '__main__':
+    main()
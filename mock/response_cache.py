@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+响应缓存 - 为输出只取决于请求输入的接口缓存序列化后的响应体
+
+缓存键由模板实际引用的请求变量组成（如 path.id、query.page、body.user.name），
+相同输入的请求直接返回缓存的字节串和ETag；客户端携带匹配的 If-None-Match 时返回304
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Iterable, Optional
+
+
+# 不参与缓存键的变量：每次请求都会变化，参与后缓存永远不会命中
+VOLATILE_VARIABLES = frozenset({'timestamp'})
+
+
+class CachedResponse:
+    """缓存的响应体"""
+
+    __slots__ = ('body', 'etag', 'expires_at')
+
+    def __init__(self, body: bytes, expires_at: Optional[float]):
+        self.body = body
+        # 强ETag（不含引号），由响应体内容计算
+        self.etag = hashlib.sha1(body).hexdigest()[:20]
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """
+    接口级响应缓存（LRU + TTL）
+
+    接口配置示例：
+        "cache": {"max_entries": 1000, "ttl": 60}
+    """
+
+    def __init__(self, config: Dict[str, Any], variables: Iterable[str], serializer: Callable[[Any], bytes]):
+        """
+        初始化响应缓存
+
+        Args:
+            config: 接口的 cache 配置
+            variables: 模板引用的变量名
+            serializer: JSON序列化函数，用于把变量值编码为缓存键
+
+        Raises:
+            ValueError: 配置不合法
+        """
+        self.max_entries = int(config.get('max_entries', 1024))
+        self.ttl = float(config.get('ttl', 0))
+        if self.max_entries <= 0:
+            raise ValueError("cache.max_entries 必须大于0")
+        if self.ttl < 0:
+            raise ValueError("cache.ttl 不能小于0")
+        self.key_variables = sorted(name for name in variables if name not in VOLATILE_VARIABLES)
+        self.serializer = serializer
+        self._entries: 'OrderedDict[bytes, CachedResponse]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_endpoint(cls, endpoint_config: Dict[str, Any], variables: Iterable[str],
+                      serializer: Callable[[Any], bytes]) -> Optional['ResponseCache']:
+        """
+        创建响应缓存，接口未配置 cache 时返回None
+
+        Args:
+            endpoint_config: 接口配置
+            variables: 模板引用的变量名
+            serializer: JSON序列化函数
+
+        Returns:
+            响应缓存或None
+        """
+        config = endpoint_config.get('cache')
+        if not config:
+            return None
+        return cls(config if isinstance(config, dict) else {}, variables, serializer)
+
+    def make_key(self, resolve: Callable[[str], Any]) -> bytes:
+        """
+        根据模板引用的请求变量生成缓存键
+
+        Args:
+            resolve: 变量解析函数
+
+        Returns:
+            缓存键
+        """
+        if not self.key_variables:
+            return b''
+        return self.serializer([resolve(name) for name in self.key_variables])
+
+    def get(self, key: bytes) -> Optional[CachedResponse]:
+        """
+        查找缓存，过期的缓存视为未命中
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存的响应或None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at is not None and entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: bytes, body: bytes) -> CachedResponse:
+        """
+        写入缓存，超过容量时淘汰最久未使用的条目
+
+        Args:
+            key: 缓存键
+            body: 响应体
+
+        Returns:
+            缓存的响应
+        """
+        entry = CachedResponse(body, time.monotonic() + self.ttl if self.ttl else None)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+流式响应 - 生成大体积响应时不在内存中构建完整的响应数据
+
+支持两种方式（接口配置中的 response.stream）：
+- repeat：按条目模板重复生成JSON数组，边生成边分块输出，可选用外层对象包裹
+- file：直接返回磁盘上的文件，由WSGI服务器的 file_wrapper 输出（gunicorn下使用sendfile零拷贝）
+
+无论响应多大，每个请求占用的内存只与分块大小有关
+"""
+
+import json
+import os
+from typing import Dict, Any, Callable, Iterator, Optional
+
+from flask import Flask, request, send_file, stream_with_context
+
+
+# 外层对象中表示条目数组位置的变量
+STREAM_ITEMS_VARIABLE = '{{stream_items}}'
+
+# 条目模板中可以使用的条目序号变量（从0开始）
+STREAM_INDEX_VARIABLE = 'index'
+
+# 每次输出的默认字节数
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class RepeatStream:
+    """
+    按条目模板重复生成JSON数组的流式响应
+
+    条目模板是静态模板时直接重复预先序列化的字节串；
+    引用了 {{index}} 或请求变量时逐条渲染，请求变量在同一请求内只解析一次
+    """
+
+    def __init__(self, config: Dict[str, Any], compile_template: Callable[..., Any],
+                 serializer: Callable[[Any], bytes]):
+        """
+        初始化流式响应
+
+        Args:
+            config: response.stream 配置
+            compile_template: 模板编译函数
+            serializer: JSON序列化函数（返回UTF-8字节串）
+
+        Raises:
+            ValueError: 配置不合法
+        """
+        if 'item' not in config:
+            raise ValueError("repeat 流式响应缺少 item 条目模板")
+        self.count = int(config.get('count', 0))
+        self.count_param = config.get('count_param')
+        self.max_count = config.get('max_count')
+        self.chunk_size = int(config.get('chunk_size', DEFAULT_CHUNK_SIZE))
+        self.serializer = serializer
+        self.item_template = compile_template(config['item'], {STREAM_INDEX_VARIABLE})
+
+        # 外层对象：序列化后按 {{stream_items}} 的位置拆分为前缀和后缀
+        envelope = config.get('envelope')
+        if envelope is None:
+            self.prefix, self.suffix = b'[', b']'
+        else:
+            marker = 'MOCK_STREAM_ITEMS_MARKER'
+            encoded = serializer(self._replace_marker(envelope, marker))
+            quoted_marker = json.dumps(marker).encode('utf-8')
+            if encoded.count(quoted_marker) != 1:
+                raise ValueError(f"envelope 中必须有且只有一个 {STREAM_ITEMS_VARIABLE}")
+            prefix, suffix = encoded.split(quoted_marker)
+            self.prefix = prefix + b'['
+            self.suffix = b']' + suffix
+
+    @staticmethod
+    def _replace_marker(data: Any, marker: str) -> Any:
+        """把外层对象中的 {{stream_items}} 替换为占位标记"""
+        if isinstance(data, dict):
+            return {key: RepeatStream._replace_marker(value, marker) for key, value in data.items()}
+        if isinstance(data, list):
+            return [RepeatStream._replace_marker(item, marker) for item in data]
+        if data == STREAM_ITEMS_VARIABLE:
+            return marker
+        return data
+
+    def _get_count(self) -> int:
+        """获取本次请求的条目数量（可通过查询参数覆盖，不超过 max_count）"""
+        count = self.count
+        if self.count_param and self.count_param in request.args:
+            try:
+                count = int(request.args[self.count_param])
+            except ValueError:
+                pass
+        if self.max_count is not None:
+            count = min(count, int(self.max_count))
+        return max(count, 0)
+
+    def generate(self, resolve: Callable[[str], Any]) -> Iterator[bytes]:
+        """
+        生成响应体分块
+
+        Args:
+            resolve: 请求变量解析函数
+
+        Yields:
+            响应体分块
+        """
+        count = self._get_count()
+        chunk_size = self.chunk_size
+        buffer = bytearray(self.prefix)
+        item_template = self.item_template
+        for index in range(count):
+            if index:
+                buffer += b','
+            if item_template.is_static:
+                buffer += item_template.static_body
+            else:
+                def resolve_item(name: str, index: int = index) -> Any:
+                    return index if name == STREAM_INDEX_VARIABLE else resolve(name)
+                buffer += item_template.render_bytes(resolve_item)
+            if len(buffer) >= chunk_size:
+                yield bytes(buffer)
+                buffer.clear()
+        buffer += self.suffix
+        yield bytes(buffer)
+
+    def respond(self, app: Flask, status_code: int, resolve: Callable[[str], Any]):
+        """
+        创建流式响应
+
+        Args:
+            app: Flask应用
+            status_code: 响应状态码
+            resolve: 请求变量解析函数
+
+        Returns:
+            Flask响应对象
+        """
+        # 生成器在视图函数返回后才执行，需要保留请求上下文
+        body = stream_with_context(self.generate(resolve))
+        return app.response_class(body, status=status_code, mimetype=app.json.mimetype)
+
+
+class FileStream:
+    """返回磁盘上的文件，由WSGI服务器的 file_wrapper 零拷贝输出"""
+
+    def __init__(self, config: Dict[str, Any], root_path: str):
+        """
+        初始化文件响应
+
+        Args:
+            config: response.stream 配置
+            root_path: 相对路径的基准目录
+
+        Raises:
+            ValueError: 配置不合法
+        """
+        path = config.get('path')
+        if not path:
+            raise ValueError("file 流式响应缺少 path 文件路径")
+        self.path = path if os.path.isabs(path) else os.path.join(root_path, path)
+        self.content_type: Optional[str] = config.get('content_type')
+        self.download_name: Optional[str] = config.get('download_name')
+
+    def respond(self, app: Flask, status_code: int, resolve: Callable[[str], Any]):
+        """
+        创建文件响应
+
+        Args:
+            app: Flask应用
+            status_code: 响应状态码
+            resolve: 请求变量解析函数（未使用）
+
+        Returns:
+            Flask响应对象
+        """
+        response = send_file(
+            self.path,
+            mimetype=self.content_type,
+            as_attachment=self.download_name is not None,
+            download_name=self.download_name,
+            conditional=True
+        )
+        # 条件请求（304/206）保留send_file计算的状态码
+        if response.status_code == 200:
+            response.status_code = status_code
+        return response
+
+
+def create_response_stream(config: Dict[str, Any], compile_template: Callable[..., Any],
+                           serializer: Callable[[Any], bytes], root_path: str):
+    """
+    根据 response.stream 配置创建流式响应
+
+    Args:
+        config: response.stream 配置
+        compile_template: 模板编译函数
+        serializer: JSON序列化函数（返回UTF-8字节串）
+        root_path: 文件路径的基准目录
+
+    Returns:
+        流式响应对象
+
+    Raises:
+        ValueError: 不支持的流式响应类型
+    """
+    stream_type = config.get('type', 'repeat')
+    if stream_type == 'repeat':
+        return RepeatStream(config, compile_template, serializer)
+    if stream_type == 'file':
+        return FileStream(config, root_path)
+    raise ValueError(f"不支持的流式响应类型: {stream_type}，可选值为 repeat 或 file")
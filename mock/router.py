@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+路由器 - 按 (方法, 路径) 查找接口处理函数
+
+- 字面路径（如 /api/users）存放在以 (方法, 路径) 为键的哈希表中，查找为 O(1)
+- 带参数的路径（如 /api/users/<int:id>）编译为按路径段组织的前缀树，
+  查找耗时只与路径段数有关，与接口数量无关
+
+路径参数支持类型转换（与Flask写法一致）：
+    <id> / <string:id>  任意不含 / 的非空路径段
+    <int:id>            整数
+    <float:value>       浮点数
+    <uuid:id>           UUID
+    <path:rest>         剩余的全部路径（可包含 /，只能作为最后一个路径段）
+"""
+
+import re
+import uuid
+from typing import Dict, Any, Iterator, List, Optional, Callable, Tuple
+
+
+_INT_PATTERN = re.compile(r'-?\d+')
+_FLOAT_PATTERN = re.compile(r'-?\d+(\.\d+)?')
+
+
+def _convert_int(segment: str) -> int:
+    if not _INT_PATTERN.fullmatch(segment):
+        raise ValueError(segment)
+    return int(segment)
+
+
+def _convert_float(segment: str) -> float:
+    if not _FLOAT_PATTERN.fullmatch(segment):
+        raise ValueError(segment)
+    return float(segment)
+
+
+def _convert_uuid(segment: str) -> str:
+    return str(uuid.UUID(segment))
+
+
+# 路径参数类型 -> (匹配优先级, 转换函数)，同一位置有多种类型的参数时按优先级依次尝试
+PARAM_CONVERTERS: Dict[str, Tuple[int, Callable[[str], Any]]] = {
+    'int': (0, _convert_int),
+    'float': (1, _convert_float),
+    'uuid': (2, _convert_uuid),
+    'string': (3, str),
+    'path': (4, str),
+}
+
+
+def parse_param_segment(segment: str) -> Tuple[str, str]:
+    """
+    解析参数路径段
+
+    Args:
+        segment: 参数路径段，如 <id>、<int:id>
+
+    Returns:
+        (参数类型, 参数名)
+
+    Raises:
+        ValueError: 参数类型不支持
+    """
+    converter, _, name = segment[1:-1].rpartition(':')
+    converter = converter or 'string'
+    if converter not in PARAM_CONVERTERS:
+        raise ValueError(f"不支持的路径参数类型: {converter}，可选值为 {', '.join(PARAM_CONVERTERS)}")
+    if not name:
+        raise ValueError(f"路径参数缺少参数名: {segment}")
+    return converter, name
+
+
+class RouteNode:
+    """前缀树节点"""
+
+    __slots__ = ('children', 'params', 'handlers', 'pattern')
+
+    def __init__(self):
+        # 字面路径段 -> 子节点
+        self.children: Dict[str, 'RouteNode'] = {}
+        # 参数路径段对应的子节点，按类型优先级排序：[(参数类型, 参数名, 转换函数, 子节点)]
+        self.params: List[Tuple[str, str, Callable[[str], Any], 'RouteNode']] = []
+        # 方法 -> 处理函数（只有完整路径的终点节点才有）
+        self.handlers: Dict[str, Callable] = {}
+        # 终点节点对应的路径模式，如 /api/users/<id>
+        self.pattern: Optional[str] = None
+
+
+class RouteMatch:
+    """路由匹配结果"""
+
+    __slots__ = ('handler', 'params', 'allowed_methods', 'pattern')
+
+    def __init__(self, handler: Optional[Callable], params: Dict[str, Any],
+                 allowed_methods: List[str], pattern: Optional[str]):
+        self.handler = handler
+        self.params = params
+        self.allowed_methods = allowed_methods
+        self.pattern = pattern
+
+
+# 路径不存在时的匹配结果
+NO_MATCH = RouteMatch(None, {}, [], None)
+
+
+def is_param_segment(segment: str) -> bool:
+    """判断路径段是否为参数，如 <id>"""
+    return len(segment) > 2 and segment[0] == '<' and segment[-1] == '>'
+
+
+def split_path(path: str) -> List[str]:
+    """
+    把路径拆分为路径段：/api/users/1 -> ['api', 'users', '1']
+
+    末尾和重复的 / 保留为空路径段（/api/users/1/ -> ['api', 'users', '1', '']），
+    与字面路径的精确匹配规则一致：空路径段只能匹配注册路径中同一位置的空路径段
+    """
+    return path[1:].split('/') if path != '/' else []
+
+
+def _get_handler(handlers: Dict[str, Callable], method: str) -> Optional[Callable]:
+    """按方法查找处理函数，与Flask一致：GET接口自动支持HEAD"""
+    handler = handlers.get(method)
+    if handler is None and method == 'HEAD':
+        handler = handlers.get('GET')
+    return handler
+
+
+class Router:
+    """
+    路由器
+
+    后注册的同路径同方法接口会覆盖先注册的（与Flask路由行为一致）；
+    字面路径段优先于参数路径段匹配，但只在其有请求的方法时生效，否则继续尝试参数路径段；
+    路径末尾的 / 按严格规则匹配（与Flask的 strict_slashes 一致）
+    """
+
+    def __init__(self):
+        # (方法, 路径) -> 处理函数
+        self._static: Dict[Tuple[str, str], Callable] = {}
+        # 路径 -> 允许的方法列表（用于405响应）
+        self._static_methods: Dict[str, List[str]] = {}
+        self._root = RouteNode()
+        self.route_count = 0
+
+    def add(self, path: str, methods: List[str], handler: Callable):
+        """
+        注册接口
+
+        Args:
+            path: 路径，支持 <name>、<int:name> 等形式的路径参数
+            methods: HTTP方法列表
+            handler: 处理函数
+        """
+        segments = split_path(path)
+        methods = [method.upper() for method in methods]
+        if not any(is_param_segment(segment) for segment in segments):
+            allowed = self._static_methods.setdefault(path, [])
+            for method in methods:
+                self._static[(method, path)] = handler
+                if method not in allowed:
+                    allowed.append(method)
+            self.route_count += 1
+            return
+
+        node = self._root
+        for index, segment in enumerate(segments):
+            if is_param_segment(segment):
+                converter, name = parse_param_segment(segment)
+                if converter == 'path' and index != len(segments) - 1:
+                    raise ValueError(f"路径 {path} 中的 <path:{name}> 只能作为最后一个路径段")
+                node = self._add_param_child(node, converter, name, path)
+            else:
+                node = node.children.setdefault(segment, RouteNode())
+        node.pattern = path
+        for method in methods:
+            node.handlers[method] = handler
+        self.route_count += 1
+
+    @staticmethod
+    def _add_param_child(node: RouteNode, converter: str, name: str, path: str) -> RouteNode:
+        """获取或创建参数路径段对应的子节点"""
+        for existing_converter, existing_name, _, child in node.params:
+            if existing_converter == converter:
+                if existing_name != name:
+                    raise ValueError(f"路径 {path} 的参数名 <{converter}:{name}> "
+                                     f"与已注册路径的参数名 <{converter}:{existing_name}> 冲突")
+                return child
+        child = RouteNode()
+        node.params.append((converter, name, PARAM_CONVERTERS[converter][1], child))
+        node.params.sort(key=lambda item: PARAM_CONVERTERS[item[0]][0])
+        return child
+
+    def match(self, method: str, path: str) -> RouteMatch:
+        """
+        查找请求对应的处理函数
+
+        字面路径没有该方法时继续在前缀树中查找，同一路径段有多种类型的参数时，
+        没有该方法的节点视为不匹配并回溯尝试下一种类型
+
+        Args:
+            method: HTTP方法
+            path: 请求路径
+
+        Returns:
+            匹配结果；路径不存在时 handler 为 None 且 allowed_methods 为空，
+            路径存在但方法不允许时 handler 为 None，allowed_methods 为所有匹配该路径的接口的方法
+        """
+        # 字面路径：一次哈希查找
+        handler = self._static.get((method, path))
+        if handler is None and method == 'HEAD':
+            handler = self._static.get(('GET', path))
+        if handler is not None:
+            return RouteMatch(handler, {}, [], path)
+
+        # 带参数的路径：在前缀树中查找
+        segments = split_path(path)
+        params: Dict[str, Any] = {}
+        node = self._match_node(self._root, segments, 0, params, method)
+        if node is not None:
+            return RouteMatch(_get_handler(node.handlers, method), params, [], node.pattern)
+
+        # 方法不匹配时汇总字面路径和前缀树中所有匹配该路径的接口的方法（用于405响应）
+        allowed = list(self._static_methods.get(path, ()))
+        pattern = path if allowed else None
+        for found in self._iter_path_nodes(self._root, segments, 0):
+            pattern = pattern or found.pattern
+            allowed.extend(method for method in found.handlers if method not in allowed)
+        if not allowed:
+            return NO_MATCH
+        return RouteMatch(None, {}, allowed, pattern)
+
+    def _match_node(self, node: RouteNode, segments: List[str], index: int,
+                    params: Dict[str, Any], method: str) -> Optional[RouteNode]:
+        """
+        按路径段递归匹配，字面路径段优先，失败时按类型优先级回溯尝试参数路径段；
+        终点节点没有该方法的处理函数时视为不匹配
+        """
+        if index == len(segments):
+            return node if _get_handler(node.handlers, method) is not None else None
+        segment = segments[index]
+        child = node.children.get(segment)
+        if child is not None:
+            found = self._match_node(child, segments, index + 1, params, method)
+            if found is not None:
+                return found
+        if not segment:
+            return None
+        for converter, name, convert, child in node.params:
+            if converter == 'path':
+                # 剩余的全部路径
+                if _get_handler(child.handlers, method) is not None:
+                    params[name] = '/'.join(segments[index:])
+                    return child
+                continue
+            try:
+                value = convert(segment)
+            except ValueError:
+                continue
+            found = self._match_node(child, segments, index + 1, params, method)
+            if found is not None:
+                params[name] = value
+                return found
+        return None
+
+    def _iter_path_nodes(self, node: RouteNode, segments: List[str], index: int) -> Iterator[RouteNode]:
+        """依次产生所有与路径匹配的终点节点（不考虑方法），匹配规则与 _match_node 一致"""
+        if index == len(segments):
+            if node.handlers:
+                yield node
+            return
+        segment = segments[index]
+        child = node.children.get(segment)
+        if child is not None:
+            yield from self._iter_path_nodes(child, segments, index + 1)
+        if not segment:
+            return
+        for converter, _, convert, child in node.params:
+            if converter == 'path':
+                if child.handlers:
+                    yield child
+                continue
+            try:
+                convert(segment)
+            except ValueError:
+                continue
+            yield from self._iter_path_nodes(child, segments, index + 1)
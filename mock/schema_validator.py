@@ -0,0 +1,389 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+JSON Schema 校验 - 在加载配置时把 JSON Schema 编译为校验函数
+
+编译时完成全部解析工作（类型映射、枚举集合、正则预编译、必需字段集合），
+请求时只执行编译好的检查，不再遍历和解释Schema本身。
+
+支持的关键字（Draft 7 常用子集）：
+    type、enum、const
+    properties、required、additionalProperties、patternProperties、minProperties、maxProperties
+    items（单个Schema或元组形式）、minItems、maxItems、uniqueItems
+    minLength、maxLength、pattern
+    minimum、maximum、exclusiveMinimum、exclusiveMaximum、multipleOf
+    allOf、anyOf、oneOf、not
+    $ref（仅支持文档内引用，如 #/definitions/User、#/$defs/User）
+"""
+
+import json
+import re
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+
+# 校验函数：参数为 (数据, 数据路径)，通过时返回None，否则返回错误信息
+Checker = Callable[[Any, str], Optional[str]]
+
+
+class SchemaError(ValueError):
+    """Schema 本身不合法（在加载配置时抛出）"""
+
+
+def _is_integer(value: Any) -> bool:
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, int) or (isinstance(value, float) and value.is_integer())
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# JSON类型 -> 判断函数
+TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    'string': lambda value: isinstance(value, str),
+    'integer': _is_integer,
+    'number': _is_number,
+    'boolean': lambda value: isinstance(value, bool),
+    'null': lambda value: value is None,
+    'object': lambda value: isinstance(value, dict),
+    'array': lambda value: isinstance(value, list),
+}
+
+
+def _freeze(value: Any) -> Any:
+    """把JSON值转换为可哈希的形式，用于枚举和唯一性判断（1 与 true 视为不同的值）"""
+    if isinstance(value, dict):
+        return ('object', json.dumps(value, sort_keys=True))
+    if isinstance(value, list):
+        return ('array', json.dumps(value, sort_keys=True))
+    if isinstance(value, bool):
+        return ('boolean', value)
+    return value
+
+
+class SchemaCompiler:
+    """把一份 JSON Schema（可包含 definitions/$defs）编译为校验函数"""
+
+    def __init__(self, root: Dict[str, Any]):
+        """
+        初始化编译器
+
+        Args:
+            root: 根Schema，$ref 在其中解析
+        """
+        self.root = root
+        # 引用路径 -> 编译结果，递归引用通过延迟查找实现
+        self._refs: Dict[str, Checker] = {}
+
+    def compile(self, schema: Any) -> Checker:
+        """
+        编译Schema
+
+        Args:
+            schema: 要编译的Schema
+
+        Returns:
+            校验函数
+
+        Raises:
+            SchemaError: Schema 不合法
+        """
+        if schema is True or schema == {}:
+            return lambda value, path: None
+        if schema is False:
+            return lambda value, path: f"{path}: 不允许出现该值"
+        if not isinstance(schema, dict):
+            raise SchemaError(f"Schema 必须是对象或布尔值: {schema!r}")
+
+        if '$ref' in schema:
+            return self._compile_ref(schema['$ref'])
+
+        checks: List[Checker] = []
+        for compile_keyword in (self._compile_type, self._compile_enum, self._compile_object,
+                                self._compile_array, self._compile_string, self._compile_number,
+                                self._compile_combinators):
+            checks.extend(compile_keyword(schema))
+
+        if not checks:
+            return lambda value, path: None
+        if len(checks) == 1:
+            return checks[0]
+
+        def check_all(value: Any, path: str) -> Optional[str]:
+            for check in checks:
+                error = check(value, path)
+                if error is not None:
+                    return error
+            return None
+        return check_all
+
+    def _compile_ref(self, ref: str) -> Checker:
+        if not isinstance(ref, str) or not ref.startswith('#'):
+            raise SchemaError(f"只支持文档内引用: {ref!r}")
+        if ref not in self._refs:
+            # 先放入占位，支持递归引用
+            self._refs[ref] = None
+            target: Any = self.root
+            for part in ref[1:].lstrip('/').split('/') if ref != '#' else []:
+                part = part.replace('~1', '/').replace('~0', '~')
+                if not isinstance(target, dict) or part not in target:
+                    raise SchemaError(f"无法解析引用: {ref}")
+                target = target[part]
+            self._refs[ref] = self.compile(target)
+        refs = self._refs
+
+        def check_ref(value: Any, path: str) -> Optional[str]:
+            return refs[ref](value, path)
+        return check_ref
+
+    @staticmethod
+    def _compile_type(schema: Dict[str, Any]) -> List[Checker]:
+        if 'type' not in schema:
+            return []
+        types = schema['type'] if isinstance(schema['type'], list) else [schema['type']]
+        for name in types:
+            if name not in TYPE_CHECKS:
+                raise SchemaError(f"不支持的类型: {name!r}")
+        type_checks = tuple(TYPE_CHECKS[name] for name in types)
+        expected = ' 或 '.join(types)
+        if len(type_checks) == 1:
+            type_check = type_checks[0]
+
+            def check_type(value: Any, path: str) -> Optional[str]:
+                if not type_check(value):
+                    return f"{path}: 类型应为 {expected}"
+                return None
+        else:
+            def check_type(value: Any, path: str) -> Optional[str]:
+                for type_check in type_checks:
+                    if type_check(value):
+                        return None
+                return f"{path}: 类型应为 {expected}"
+        return [check_type]
+
+    @staticmethod
+    def _compile_enum(schema: Dict[str, Any]) -> List[Checker]:
+        checks = []
+        if 'enum' in schema:
+            if not isinstance(schema['enum'], list) or not schema['enum']:
+                raise SchemaError("enum 必须是非空数组")
+            allowed = frozenset(_freeze(item) for item in schema['enum'])
+            description = ', '.join(json.dumps(item, ensure_ascii=False) for item in schema['enum'])
+
+            def check_enum(value: Any, path: str) -> Optional[str]:
+                if _freeze(value) not in allowed:
+                    return f"{path}: 取值应为 {description} 之一"
+                return None
+            checks.append(check_enum)
+        if 'const' in schema:
+            expected = _freeze(schema['const'])
+            description = json.dumps(schema['const'], ensure_ascii=False)
+
+            def check_const(value: Any, path: str) -> Optional[str]:
+                if _freeze(value) != expected:
+                    return f"{path}: 取值应为 {description}"
+                return None
+            checks.append(check_const)
+        return checks
+
+    def _compile_object(self, schema: Dict[str, Any]) -> List[Checker]:
+        keywords = ('properties', 'required', 'additionalProperties', 'patternProperties',
+                    'minProperties', 'maxProperties')
+        if not any(keyword in schema for keyword in keywords):
+            return []
+        required = schema.get('required', [])
+        if not isinstance(required, list):
+            raise SchemaError("required 必须是数组")
+        # 必需字段集合：一次集合运算完成检查，与字段数量基本无关
+        required_set = frozenset(required)
+        properties: Dict[str, Checker] = {
+            name: self.compile(sub_schema) for name, sub_schema in schema.get('properties', {}).items()
+        }
+        pattern_properties: List[Tuple[re.Pattern, Checker]] = []
+        for pattern, sub_schema in schema.get('patternProperties', {}).items():
+            pattern_properties.append((self._compile_pattern(pattern), self.compile(sub_schema)))
+        additional = schema.get('additionalProperties', True)
+        additional_check: Optional[Checker] = None
+        if additional is not True:
+            additional_check = self.compile(additional)
+        min_properties = schema.get('minProperties')
+        max_properties = schema.get('maxProperties')
+
+        def check_object(value: Any, path: str) -> Optional[str]:
+            if not isinstance(value, dict):
+                return None
+            if required_set:
+                missing = required_set.difference(value)
+                if missing:
+                    # 按配置顺序报告第一个缺少的字段，保证错误信息稳定
+                    first = next(name for name in required if name in missing)
+                    return f"{path}: 缺少必需字段 {first}"
+            if min_properties is not None and len(value) < min_properties:
+                return f"{path}: 字段数量不能少于 {min_properties}"
+            if max_properties is not None and len(value) > max_properties:
+                return f"{path}: 字段数量不能多于 {max_properties}"
+            # 只检查请求中实际出现的字段，未出现的可选字段没有任何开销
+            for name, item in value.items():
+                check = properties.get(name)
+                matched = check is not None
+                if matched:
+                    error = check(item, f"{path}.{name}")
+                    if error is not None:
+                        return error
+                for pattern, pattern_check in pattern_properties:
+                    if pattern.search(name):
+                        matched = True
+                        error = pattern_check(item, f"{path}.{name}")
+                        if error is not None:
+                            return error
+                if not matched and additional_check is not None:
+                    error = additional_check(item, f"{path}.{name}")
+                    if error is not None:
+                        return f"{path}: 不允许的字段 {name}" if additional is False else error
+            return None
+        return [check_object]
+
+    def _compile_array(self, schema: Dict[str, Any]) -> List[Checker]:
+        keywords = ('items', 'minItems', 'maxItems', 'uniqueItems')
+        if not any(keyword in schema for keyword in keywords):
+            return []
+        items = schema.get('items')
+        item_check: Optional[Checker] = None
+        tuple_checks: List[Checker] = []
+        if isinstance(items, list):
+            tuple_checks = [self.compile(sub_schema) for sub_schema in items]
+        elif items is not None:
+            item_check = self.compile(items)
+        min_items = schema.get('minItems')
+        max_items = schema.get('maxItems')
+        unique = schema.get('uniqueItems', False)
+
+        def check_array(value: Any, path: str) -> Optional[str]:
+            if not isinstance(value, list):
+                return None
+            if min_items is not None and len(value) < min_items:
+                return f"{path}: 元素数量不能少于 {min_items}"
+            if max_items is not None and len(value) > max_items:
+                return f"{path}: 元素数量不能多于 {max_items}"
+            if unique and len({_freeze(item) for item in value}) != len(value):
+                return f"{path}: 元素不能重复"
+            if item_check is not None:
+                for index, item in enumerate(value):
+                    error = item_check(item, f"{path}[{index}]")
+                    if error is not None:
+                        return error
+            for index, (check, item) in enumerate(zip(tuple_checks, value)):
+                error = check(item, f"{path}[{index}]")
+                if error is not None:
+                    return error
+            return None
+        return [check_array]
+
+    @staticmethod
+    def _compile_pattern(pattern: Any) -> re.Pattern:
+        try:
+            return re.compile(pattern)
+        except (re.error, TypeError) as e:
+            raise SchemaError(f"正则表达式不合法: {pattern!r} ({e})")
+
+    def _compile_string(self, schema: Dict[str, Any]) -> List[Checker]:
+        if not any(keyword in schema for keyword in ('minLength', 'maxLength', 'pattern')):
+            return []
+        min_length = schema.get('minLength')
+        max_length = schema.get('maxLength')
+        pattern = self._compile_pattern(schema['pattern']) if 'pattern' in schema else None
+
+        def check_string(value: Any, path: str) -> Optional[str]:
+            if not isinstance(value, str):
+                return None
+            if min_length is not None and len(value) < min_length:
+                return f"{path}: 长度不能小于 {min_length}"
+            if max_length is not None and len(value) > max_length:
+                return f"{path}: 长度不能大于 {max_length}"
+            if pattern is not None and not pattern.search(value):
+                return f"{path}: 不匹配格式 {pattern.pattern}"
+            return None
+        return [check_string]
+
+    @staticmethod
+    def _compile_number(schema: Dict[str, Any]) -> List[Checker]:
+        keywords = ('minimum', 'maximum', 'exclusiveMinimum', 'exclusiveMaximum', 'multipleOf')
+        if not any(keyword in schema for keyword in keywords):
+            return []
+        minimum = schema.get('minimum')
+        maximum = schema.get('maximum')
+        exclusive_minimum = schema.get('exclusiveMinimum')
+        exclusive_maximum = schema.get('exclusiveMaximum')
+        multiple_of = schema.get('multipleOf')
+        if multiple_of is not None and (not _is_number(multiple_of) or multiple_of <= 0):
+            raise SchemaError("multipleOf 必须是正数")
+
+        def check_number(value: Any, path: str) -> Optional[str]:
+            if not _is_number(value):
+                return None
+            if minimum is not None and value < minimum:
+                return f"{path}: 不能小于 {minimum}"
+            if maximum is not None and value > maximum:
+                return f"{path}: 不能大于 {maximum}"
+            if exclusive_minimum is not None and value <= exclusive_minimum:
+                return f"{path}: 必须大于 {exclusive_minimum}"
+            if exclusive_maximum is not None and value >= exclusive_maximum:
+                return f"{path}: 必须小于 {exclusive_maximum}"
+            if multiple_of is not None:
+                quotient = value / multiple_of
+                if abs(quotient - round(quotient)) > 1e-9:
+                    return f"{path}: 必须是 {multiple_of} 的整数倍"
+            return None
+        return [check_number]
+
+    def _compile_combinators(self, schema: Dict[str, Any]) -> List[Checker]:
+        checks = []
+        for sub_schema in schema.get('allOf', []):
+            checks.append(self.compile(sub_schema))
+        if 'anyOf' in schema:
+            any_checks = [self.compile(sub_schema) for sub_schema in schema['anyOf']]
+
+            def check_any_of(value: Any, path: str) -> Optional[str]:
+                errors = []
+                for check in any_checks:
+                    error = check(value, path)
+                    if error is None:
+                        return None
+                    errors.append(error)
+                return f"{path}: 不满足 anyOf 中的任何一项（{'；'.join(errors)}）"
+            checks.append(check_any_of)
+        if 'oneOf' in schema:
+            one_checks = [self.compile(sub_schema) for sub_schema in schema['oneOf']]
+
+            def check_one_of(value: Any, path: str) -> Optional[str]:
+                matched = sum(1 for check in one_checks if check(value, path) is None)
+                if matched != 1:
+                    return f"{path}: 应当恰好满足 oneOf 中的一项，实际满足 {matched} 项"
+                return None
+            checks.append(check_one_of)
+        if 'not' in schema:
+            not_check = self.compile(schema['not'])
+
+            def check_not(value: Any, path: str) -> Optional[str]:
+                if not_check(value, path) is None:
+                    return f"{path}: 不应满足 not 中的Schema"
+                return None
+            checks.append(check_not)
+        return checks
+
+
+def compile_schema(schema: Any) -> Checker:
+    """
+    编译 JSON Schema
+
+    Args:
+        schema: JSON Schema
+
+    Returns:
+        校验函数：参数为 (数据, 数据路径)，通过时返回None，否则返回错误信息
+
+    Raises:
+        SchemaError: Schema 不合法
+    """
+    return SchemaCompiler(schema if isinstance(schema, dict) else {}).compile(schema)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+JSON序列化后端 - 根据 global_settings.serializer 选择响应体的序列化方式
+
+- stdlib：标准库 json（通过Flask的JSON配置，与 jsonify 一样输出紧凑格式）
+- orjson：使用 orjson 直接输出UTF-8字节串，未安装时回退为 stdlib
+- pre_encoded：模板编译时把静态片段预先序列化为字节串，请求时只序列化占位符对应的值再拼接，
+  底层使用 orjson（已安装时）或 stdlib
+
+所有序列化函数都直接返回UTF-8字节串，且都使用紧凑格式（不含多余空格），
+同一模板在不同后端下输出相同的字节，ETag 和响应体长度不随配置变化
+"""
+
+import json
+from typing import Dict, Any, Callable, Optional, Tuple, Union
+
+
+# 序列化函数：数据 -> UTF-8字节串
+Encoder = Callable[[Any], bytes]
+
+SERIALIZER_BACKENDS = ('stdlib', 'orjson')
+
+
+class JsonSerializer:
+    """JSON序列化器"""
+
+    def __init__(self, backend: str, encode: Encoder, pre_encoded: bool = False, sort_keys: bool = False):
+        """
+        初始化序列化器
+
+        Args:
+            backend: 实际使用的后端名称
+            encode: 序列化函数
+            pre_encoded: 是否按片段预编码模板
+            sort_keys: 对象的键是否按字母排序（预编码片段需要与之保持一致）
+        """
+        self.backend = backend
+        self.encode = encode
+        self.pre_encoded = pre_encoded
+        self.sort_keys = sort_keys
+
+    def __call__(self, data: Any) -> bytes:
+        return self.encode(data)
+
+
+def _stdlib_serializer(dumps: Callable[..., str], sort_keys: bool, pre_encoded: bool) -> JsonSerializer:
+    def encode(data: Any) -> bytes:
+        # 与 app.json.response 的紧凑格式以及 orjson 的输出保持一致
+        return dumps(data, separators=(',', ':')).encode('utf-8')
+    return JsonSerializer('stdlib', encode, pre_encoded, sort_keys)
+
+
+def _orjson_serializer(sort_keys: bool, pre_encoded: bool) -> Optional[JsonSerializer]:
+    try:
+        import orjson
+    except ImportError:
+        return None
+    option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+    dumps = orjson.dumps
+
+    def encode(data: Any) -> bytes:
+        return dumps(data, option=option)
+    return JsonSerializer('orjson', encode, pre_encoded, sort_keys)
+
+
+def create_serializer(settings: Union[str, Dict[str, Any], None], stdlib_dumps: Callable[..., str] = json.dumps,
+                      sort_keys: bool = False) -> JsonSerializer:
+    """
+    根据配置创建序列化器
+
+    配置可以是字符串 "stdlib"、"orjson"、"pre_encoded"，
+    也可以是对象 {"backend": "orjson", "pre_encoded": true}
+
+    Args:
+        settings: global_settings.serializer 配置
+        stdlib_dumps: stdlib 后端使用的序列化函数（默认使用Flask的JSON配置）
+        sort_keys: stdlib_dumps 是否按字母排序对象的键
+
+    Returns:
+        序列化器
+
+    Raises:
+        ValueError: 配置不合法
+    """
+    backend, pre_encoded = _parse_settings(settings)
+    if backend == 'orjson' or (backend is None and pre_encoded):
+        serializer = _orjson_serializer(sort_keys, pre_encoded)
+        if serializer is not None:
+            return serializer
+        if backend == 'orjson':
+            print("⚠ 未安装orjson，序列化后端回退为 stdlib（pip install orjson 以启用）")
+    return _stdlib_serializer(stdlib_dumps, sort_keys, pre_encoded)
+
+
+def _parse_settings(settings: Union[str, Dict[str, Any], None]) -> Tuple[Optional[str], bool]:
+    """解析序列化配置，返回 (后端名称, 是否预编码)，后端为None时自动选择"""
+    if settings is None:
+        return 'stdlib', False
+    if isinstance(settings, str):
+        if settings == 'pre_encoded':
+            return None, True
+        settings = {'backend': settings}
+    if not isinstance(settings, dict):
+        raise ValueError("serializer 必须是字符串或对象")
+    backend = settings.get('backend', 'stdlib')
+    if backend not in SERIALIZER_BACKENDS:
+        raise ValueError(f"不支持的序列化后端: {backend}，可选值为 {', '.join(SERIALIZER_BACKENDS)} 或 pre_encoded")
+    return backend, bool(settings.get('pre_encoded', False))
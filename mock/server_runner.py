@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+服务启动器 - 根据配置选择开发模式或生产模式启动Mock服务
+
+- dev：Flask自带的开发服务器（单进程，支持debug和自动重载）
+- serve：基于gunicorn的多进程（pre-fork）+ 多线程服务，强制关闭debug，适合压测场景；
+  worker_class 设置为 gevent 时每个进程使用协程处理连接，适合模拟大量慢速连接
+"""
+
+import multiprocessing
+from typing import Dict, Any
+
+from flask import Flask
+
+
+# serve模式的默认配置
+DEFAULT_SERVE_OPTIONS: Dict[str, Any] = {
+    'workers': multiprocessing.cpu_count(),
+    'threads': 8,
+    'worker_class': 'gthread',
+    'keepalive': 5,
+    'backlog': 2048,
+    'timeout': 30,
+    'graceful_timeout': 30,
+    'max_requests': 0,
+    # gevent工作进程的最大并发连接数
+    'worker_connections': 10000,
+}
+
+
+def build_serve_options(server_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    根据 server 配置生成 serve 模式的启动参数
+
+    Args:
+        server_config: 配置文件中的 server 配置
+
+    Returns:
+        gunicorn 启动参数
+    """
+    options = {key: server_config.get(key, default) for key, default in DEFAULT_SERVE_OPTIONS.items()}
+    host = server_config.get('host', '0.0.0.0')
+    port = server_config.get('port', 8011)
+    options['bind'] = f"{host}:{port}"
+    # 单线程时使用sync worker，避免gthread的额外开销
+    if options['worker_class'] == 'gthread' and options['threads'] <= 1:
+        options['worker_class'] = 'sync'
+    return options
+
+
+def run_dev_server(app: Flask, server_config: Dict[str, Any]):
+    """
+    使用Flask开发服务器启动
+
+    Args:
+        app: Flask应用
+        server_config: 配置文件中的 server 配置
+    """
+    host = server_config.get('host', '0.0.0.0')
+    port = server_config.get('port', 8011)
+    debug = server_config.get('debug', True)
+    app.run(host=host, port=port, debug=debug)
+
+
+def run_production_server(app: Flask, server_config: Dict[str, Any]):
+    """
+    使用gunicorn以多进程 + 多线程方式启动，强制关闭debug
+
+    未安装gunicorn（如Windows环境）时回退为单进程多线程的WSGI服务器
+
+    Args:
+        app: Flask应用
+        server_config: 配置文件中的 server 配置
+    """
+    app.debug = False
+    options = build_serve_options(server_config)
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("⚠ 未安装gunicorn，回退为单进程多线程服务器（pip install gunicorn 以启用多进程模式）")
+        from werkzeug.serving import run_simple
+        host = server_config.get('host', '0.0.0.0')
+        port = server_config.get('port', 8011)
+        run_simple(host, port, app, threaded=True, use_reloader=False, use_debugger=False)
+        return
+
+    class MockApplication(BaseApplication):
+        """嵌入式gunicorn应用，直接复用已加载的Flask应用"""
+
+        def __init__(self, application: Flask, settings: Dict[str, Any]):
+            self.application = application
+            self.settings = settings
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.settings.items():
+                if key in self.cfg.settings and value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+    if options['worker_class'] == 'gevent':
+        try:
+            import gevent  # noqa: F401
+        except ImportError:
+            print("⚠ 未安装gevent，worker_class 回退为 gthread（pip install gevent 以启用协程模式）")
+            options['worker_class'] = 'gthread'
+
+    print(f"serve模式: workers={options['workers']}, threads={options['threads']}, "
+          f"worker_class={options['worker_class']}, keepalive={options['keepalive']}s, "
+          f"backlog={options['backlog']}")
+    MockApplication(app, options).run()
+
+
+def run_server(app: Flask, server_config: Dict[str, Any]):
+    """
+    根据 server.mode 启动服务
+
+    Args:
+        app: Flask应用
+        server_config: 配置文件中的 server 配置
+
+    Raises:
+        ValueError: 不支持的启动模式
+    """
+    mode = server_config.get('mode', 'dev')
+    if mode == 'dev':
+        run_dev_server(app, server_config)
+    elif mode == 'serve':
+        run_production_server(app, server_config)
+    else:
+        raise ValueError(f"不支持的启动模式: {mode}，可选值为 dev 或 serve")
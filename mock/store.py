@@ -0,0 +1,451 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+有状态Mock存储 - 内存中的集合存储，用于模拟CRUD上游
+
+- 每个集合以主键哈希表存放记录，按主键查找为 O(1)
+- 可为指定字段建立哈希索引，按索引字段查询为 O(1)
+- 记录按主键分段加锁，索引各自加锁，不同记录的写入互不阻塞
+- 可选定期把全部集合快照到文件，启动时通过内存映射读取快照恢复状态
+"""
+
+import atexit
+import itertools
+import json
+import mmap
+import os
+import threading
+from contextlib import ExitStack
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+
+# 分段锁数量
+LOCK_STRIPES = 64
+
+
+class Collection:
+    """记录集合"""
+
+    def __init__(self, name: str, id_field: str = 'id', indexes: Optional[List[str]] = None):
+        """
+        初始化集合
+
+        Args:
+            name: 集合名称
+            id_field: 主键字段
+            indexes: 需要建立哈希索引的字段列表
+        """
+        self.name = name
+        self.id_field = id_field
+        # 主键（统一转为字符串）-> 记录
+        self._records: Dict[str, Dict[str, Any]] = {}
+        # 字段 -> {字段值: 主键集合}；新增索引时整体替换（写时复制），写入方遍历时不会遇到字典被修改
+        self._indexes: Dict[str, Dict[Any, Set[str]]] = {}
+        # 字段 -> 索引锁，与 _indexes 一样整体替换
+        self._index_locks: Dict[str, threading.Lock] = {}
+        self._stripes = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._schema_lock = threading.Lock()
+        self._id_counter = itertools.count(1)
+        for field in indexes or []:
+            self.add_index(field)
+
+    @staticmethod
+    def _key(record_id: Any) -> str:
+        """主键统一转为字符串，使路径参数 1 和请求体中的 "1" 指向同一条记录"""
+        return str(record_id)
+
+    @staticmethod
+    def _index_value(value: Any) -> Any:
+        """只有可哈希的标量值参与索引"""
+        if isinstance(value, (str, int, float, bool)) or value is None:
+            return value
+        return None
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        return self._stripes[hash(key) % LOCK_STRIPES]
+
+    def add_index(self, field: str):
+        """
+        为字段建立哈希索引（已有记录会被补建索引）
+
+        补建期间持有全部分段锁，写入方都在分段锁内修改记录和索引，
+        因此补建时不会有写到一半的记录，新索引发布后的写入都会更新新索引
+
+        Args:
+            field: 字段名
+        """
+        with self._schema_lock:
+            if field in self._indexes:
+                return
+            with ExitStack() as stack:
+                for lock in self._stripes:
+                    stack.enter_context(lock)
+                index: Dict[Any, Set[str]] = {}
+                for key, record in self._records.items():
+                    if field in record:
+                        index.setdefault(self._index_value(record[field]), set()).add(key)
+                self._index_locks = {**self._index_locks, field: threading.Lock()}
+                self._indexes = {**self._indexes, field: index}
+
+    def _index_add(self, key: str, record: Dict[str, Any]):
+        indexes, index_locks = self._indexes, self._index_locks
+        for field, index in indexes.items():
+            if field in record:
+                with index_locks[field]:
+                    index.setdefault(self._index_value(record[field]), set()).add(key)
+
+    def _index_remove(self, key: str, record: Dict[str, Any]):
+        indexes, index_locks = self._indexes, self._index_locks
+        for field, index in indexes.items():
+            if field not in record:
+                continue
+            value = self._index_value(record[field])
+            with index_locks[field]:
+                keys = index.get(value)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del index[value]
+
+    def _next_id(self) -> int:
+        """生成不与现有记录冲突的自增主键"""
+        while True:
+            record_id = next(self._id_counter)
+            if self._key(record_id) not in self._records:
+                return record_id
+
+    def insert(self, record: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
+        """
+        新增记录，未提供主键时自动生成自增主键
+
+        Args:
+            record: 记录
+
+        Returns:
+            (是否新增成功, 记录)，主键已存在时返回 (False, 已有记录)
+        """
+        record = dict(record)
+        auto_id = record.get(self.id_field) is None
+        while True:
+            if auto_id:
+                record[self.id_field] = self._next_id()
+            key = self._key(record[self.id_field])
+            with self._lock_for(key):
+                existing = self._records.get(key)
+                if existing is None:
+                    self._records[key] = record
+                    self._index_add(key, record)
+                    return True, record
+                # 自动生成的主键在检查后被并发请求显式占用时，换一个主键重试
+                if not auto_id:
+                    return False, existing
+
+    def get(self, record_id: Any) -> Optional[Dict[str, Any]]:
+        """按主键查找记录"""
+        return self._records.get(self._key(record_id))
+
+    def update(self, record_id: Any, changes: Dict[str, Any], replace: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        更新记录
+
+        Args:
+            record_id: 主键
+            changes: 要更新的字段
+            replace: 为 True 时整体替换记录（PUT），否则合并字段（PATCH）
+
+        Returns:
+            更新后的记录，记录不存在时返回None
+        """
+        key = self._key(record_id)
+        with self._lock_for(key):
+            existing = self._records.get(key)
+            if existing is None:
+                return None
+            record = dict(changes) if replace else {**existing, **changes}
+            # 主键不允许通过更新修改
+            record[self.id_field] = existing[self.id_field]
+            self._index_remove(key, existing)
+            self._records[key] = record
+            self._index_add(key, record)
+        return record
+
+    def delete(self, record_id: Any) -> Optional[Dict[str, Any]]:
+        """
+        删除记录
+
+        Returns:
+            被删除的记录，记录不存在时返回None
+        """
+        key = self._key(record_id)
+        with self._lock_for(key):
+            record = self._records.pop(key, None)
+            if record is not None:
+                self._index_remove(key, record)
+        return record
+
+    def find(self, filters: Dict[str, Any], limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        按字段等值查询记录
+
+        有索引的字段通过索引直接定位，其余字段在候选记录中逐条比较；
+        查询参数都是字符串，比较时把记录中的值也转为字符串
+
+        Args:
+            filters: 字段 -> 值
+            limit: 最多返回的记录数
+            offset: 跳过的记录数
+
+        Returns:
+            记录列表
+        """
+        candidates: Optional[Set[str]] = None
+        remaining = {}
+        for field, value in filters.items():
+            index = self._indexes.get(field)
+            if index is None:
+                remaining[field] = value
+                continue
+            keys = self._lookup_index(index, field, value)
+            candidates = keys if candidates is None else candidates & keys
+        if candidates is None:
+            records = list(self._records.values())
+        else:
+            records = [record for record in (self._records.get(key) for key in candidates) if record is not None]
+        if remaining:
+            records = [record for record in records
+                       if all(field in record and str(record[field]) == str(value)
+                              for field, value in remaining.items())]
+        end = None if limit is None else offset + limit
+        return records[offset:end]
+
+    def _lookup_index(self, index: Dict[Any, Set[str]], field: str, value: Any) -> Set[str]:
+        with self._index_locks[field]:
+            keys = set(index.get(value, ()))
+            # 查询参数是字符串，记录中可能是数字或布尔值
+            if isinstance(value, str):
+                parsed = self._parse_scalar(value)
+                if parsed is not value:
+                    keys |= index.get(self._index_value(parsed), set())
+        return keys
+
+    @staticmethod
+    def _parse_scalar(value: str) -> Any:
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def dump(self) -> List[Dict[str, Any]]:
+        """导出全部记录"""
+        return list(self._records.values())
+
+
+class CollectionStore:
+    """
+    集合存储 - 按名称管理全部集合
+
+    存储独立于路由表，配置热加载后数据仍然保留。
+    注意：serve模式的每个工作进程各自持有一份存储，有状态接口建议使用单个工作进程
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        """
+        初始化集合存储
+
+        Args:
+            settings: global_settings.store 配置，支持 snapshot_path 和 snapshot_interval（秒）
+        """
+        settings = settings or {}
+        self.snapshot_path: Optional[str] = settings.get('snapshot_path')
+        self.snapshot_interval = float(settings.get('snapshot_interval', 0))
+        self._collections: Dict[str, Collection] = {}
+        self._lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_pid: Optional[int] = None
+        self._stop_event = threading.Event()
+        if self.snapshot_path:
+            self.load_snapshot()
+            atexit.register(self.save_snapshot)
+
+    def collection(self, name: str, id_field: str = 'id', indexes: Optional[List[str]] = None) -> Collection:
+        """
+        获取集合，不存在时创建；已存在的集合会补建新增的索引
+
+        Args:
+            name: 集合名称
+            id_field: 主键字段
+            indexes: 需要建立哈希索引的字段列表
+
+        Returns:
+            集合
+        """
+        collection = self._collections.get(name)
+        if collection is None:
+            with self._lock:
+                collection = self._collections.get(name)
+                if collection is None:
+                    collection = self._collections[name] = Collection(name, id_field, indexes)
+                    return collection
+        for field in indexes or []:
+            collection.add_index(field)
+        return collection
+
+    def ensure_snapshot_thread(self):
+        """在当前进程中启动定期快照线程（未配置快照时不启动）"""
+        if not self.snapshot_path or self.snapshot_interval <= 0:
+            return
+        pid = os.getpid()
+        if self._snapshot_pid == pid:
+            return
+        with self._lock:
+            if self._snapshot_pid == pid:
+                return
+            thread = threading.Thread(target=self._snapshot_loop, name='store-snapshot', daemon=True)
+            thread.start()
+            self._snapshot_pid = pid
+
+    def _snapshot_loop(self):
+        while not self._stop_event.wait(self.snapshot_interval):
+            self.save_snapshot()
+
+    def save_snapshot(self):
+        """
+        把全部集合写入快照文件（先写临时文件再替换，避免写入中途崩溃损坏快照）
+
+        快照格式为 JSON Lines：每个集合先写一行集合信息，再逐行写入记录
+        """
+        if not self.snapshot_path:
+            return
+        with self._snapshot_lock:
+            directory = os.path.dirname(self.snapshot_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    for collection in list(self._collections.values()):
+                        records = collection.dump()
+                        f.write(json.dumps({
+                            '__collection__': collection.name,
+                            'id_field': collection.id_field,
+                            'indexes': list(collection._indexes),
+                            'count': len(records),
+                        }, ensure_ascii=False) + '\n')
+                        for record in records:
+                            f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+                os.replace(temp_path, self.snapshot_path)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"⚠ 保存存储快照失败: {str(e)}")
+
+    def load_snapshot(self):
+        """通过内存映射读取快照文件，恢复全部集合"""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        if os.path.getsize(self.snapshot_path) == 0:
+            return
+        loaded = 0
+        try:
+            with open(self.snapshot_path, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                collection = None
+                remaining = 0
+                for line in iter(mapped.readline, b''):
+                    data = json.loads(line)
+                    if remaining == 0:
+                        collection = self.collection(data['__collection__'], data.get('id_field', 'id'),
+                                                     data.get('indexes'))
+                        remaining = data.get('count', 0)
+                        continue
+                    collection.insert(data)
+                    remaining -= 1
+                    loaded += 1
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠ 读取存储快照失败: {str(e)}")
+            return
+        print(f"✓ 已从快照恢复 {len(self._collections)} 个集合，共 {loaded} 条记录")
+
+
+class StoreEndpoint:
+    """
+    有状态接口 - 把HTTP请求映射为集合操作
+
+    - POST：新增记录（请求体为记录）
+    - PUT / PATCH：按路径参数中的主键替换 / 合并记录
+    - DELETE：按主键删除记录
+    - GET：带主键时返回单条记录，否则按查询参数过滤并返回记录列表（支持 limit、offset）
+    """
+
+    def __init__(self, store: CollectionStore, config: Dict[str, Any]):
+        """
+        初始化有状态接口
+
+        Args:
+            store: 集合存储
+            config: 接口的 store 配置
+
+        Raises:
+            ValueError: 配置不合法
+        """
+        if not config.get('collection'):
+            raise ValueError("store 配置缺少 collection 集合名称")
+        self.id_field = config.get('id_field', 'id')
+        # 路径参数中表示主键的参数名
+        self.id_param = config.get('id_param', self.id_field)
+        self.collection = store.collection(config['collection'], self.id_field, config.get('indexes', []))
+
+    def handle(self, method: str, path_params: Dict[str, Any], args: Dict[str, str],
+               body: Any) -> Tuple[int, Any]:
+        """
+        处理请求
+
+        Args:
+            method: HTTP方法
+            path_params: 路径参数
+            args: 查询参数
+            body: JSON请求体
+
+        Returns:
+            (状态码, 结果)，状态码为 None 时使用接口配置的状态码
+        """
+        record_id = path_params.get(self.id_param)
+        if method == 'POST':
+            if not isinstance(body, dict):
+                return 400, {'message': '请求体必须是JSON对象'}
+            if record_id is not None:
+                body = {**body, self.id_field: record_id}
+            created, record = self.collection.insert(body)
+            if not created:
+                return 409, {'message': f"记录已存在: {record[self.id_field]}"}
+            return 201, record
+        if method in ('PUT', 'PATCH'):
+            if record_id is None:
+                record_id = body.get(self.id_field) if isinstance(body, dict) else None
+            if record_id is None or not isinstance(body, dict):
+                return 400, {'message': '缺少主键或请求体不是JSON对象'}
+            record = self.collection.update(record_id, body, replace=(method == 'PUT'))
+            if record is None:
+                return 404, {'message': f"记录不存在: {record_id}"}
+            return None, record
+        if method == 'DELETE':
+            if record_id is None:
+                return 400, {'message': '缺少主键'}
+            record = self.collection.delete(record_id)
+            if record is None:
+                return 404, {'message': f"记录不存在: {record_id}"}
+            return None, record
+        # GET / HEAD
+        if record_id is not None:
+            record = self.collection.get(record_id)
+            if record is None:
+                return 404, {'message': f"记录不存在: {record_id}"}
+            return None, record
+        filters = {key: value for key, value in args.items() if key not in ('limit', 'offset')}
+        try:
+            limit = int(args['limit']) if 'limit' in args else None
+            offset = int(args.get('offset', 0))
+        except ValueError:
+            return 400, {'message': 'limit 和 offset 必须是整数'}
+        return None, self.collection.find(filters, limit, offset)
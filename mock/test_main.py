@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Mock服务的接口分发测试
+
+运行方式：python -m unittest test_main
+"""
+
+import importlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+TEST_CONFIG = {
+    "server": {"hot_reload": False},
+    "global_settings": {"enable_cors": False, "metrics": {"enabled": False}},
+    "endpoints": [
+        {"path": "/api/users/me", "methods": ["GET"], "response": {"template": {"name": "me"}}},
+        {"path": "/api/users/<int:user_id>", "methods": ["GET", "DELETE"],
+         "response": {"template": {"id": "{{path.user_id}}"}}},
+        {"path": "/api/login", "methods": ["POST"], "response": {"template": {"ok": True}}},
+        {"path": "/api/items/latest", "methods": ["GET"], "response": {"template": {"name": "latest"}}},
+        {"path": "/api/items/<name>", "methods": ["GET", "DELETE"],
+         "response": {"template": {"deleted": "{{path.name}}"}}},
+        {"path": "/api/orders/<int:order_id>", "methods": ["GET"], "response": {"template": {"id": "{{path.order_id}}"}}},
+        {"path": "/api/orders/<code>", "methods": ["DELETE"], "response": {"template": {"code": "{{path.code}}"}}},
+    ],
+}
+
+main = None
+router = None
+serializers = None
+_work_dir = None
+_original_dir = None
+
+
+def setUpModule():
+    """在临时目录中使用测试配置加载Mock服务"""
+    global main, router, serializers, _work_dir, _original_dir
+    _original_dir = os.getcwd()
+    _work_dir = tempfile.mkdtemp()
+    with open(os.path.join(_work_dir, 'config.json'), 'w', encoding='utf-8') as f:
+        json.dump(TEST_CONFIG, f)
+    os.chdir(_work_dir)
+    os.environ['MOCK_CONFIG'] = 'config.json'
+    os.environ['MOCK_CONFIG_CACHE_DIR'] = ''
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    main = importlib.import_module('main')
+    router = importlib.import_module('router')
+    serializers = importlib.import_module('serializers')
+
+
+def tearDownModule():
+    os.chdir(_original_dir)
+    shutil.rmtree(_work_dir, ignore_errors=True)
+
+
+class DispatchOptionsTest(unittest.TestCase):
+    """OPTIONS 和 405 响应的 Allow 头只列出该路径配置的方法"""
+
+    def setUp(self):
+        self.client = main.app.test_client()
+
+    def get_allow(self, response):
+        return sorted(method.strip() for method in response.headers['Allow'].split(','))
+
+    def test_options_on_get_only_endpoint(self):
+        response = self.client.options('/api/users/me')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_allow(response), ['GET', 'HEAD', 'OPTIONS'])
+
+    def test_options_on_parameterized_endpoint(self):
+        response = self.client.options('/api/users/42')
+        self.assertEqual(self.get_allow(response), ['DELETE', 'GET', 'HEAD', 'OPTIONS'])
+
+    def test_options_without_get(self):
+        response = self.client.options('/api/login')
+        self.assertEqual(self.get_allow(response), ['OPTIONS', 'POST'])
+
+    def test_method_not_allowed(self):
+        response = self.client.post('/api/users/me')
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(self.get_allow(response), ['GET', 'HEAD', 'OPTIONS'])
+
+
+class RouterTest(unittest.TestCase):
+    """路由匹配规则与Flask一致"""
+
+    def setUp(self):
+        self.router = router.Router()
+        self.router.add('/api/users/me', ['GET'], 'me')
+        self.router.add('/api/users/<id>', ['GET', 'DELETE'], 'user')
+        self.router.add('/b/<id>', ['GET'], 'b')
+
+    def test_literal_route_without_method_falls_through_to_param_route(self):
+        match = self.router.match('DELETE', '/api/users/me')
+        self.assertEqual(match.handler, 'user')
+        self.assertEqual(match.params, {'id': 'me'})
+        self.assertEqual(self.router.match('GET', '/api/users/me').handler, 'me')
+
+    def test_method_not_allowed_combines_literal_and_param_methods(self):
+        match = self.router.match('POST', '/api/users/me')
+        self.assertIsNone(match.handler)
+        self.assertEqual(sorted(match.allowed_methods), ['DELETE', 'GET'])
+
+    def test_converter_without_method_backtracks_to_next_converter(self):
+        self.router.add('/a/<int:id>', ['GET'], 'int')
+        self.router.add('/a/<name>', ['DELETE'], 'string')
+        match = self.router.match('DELETE', '/a/5')
+        self.assertEqual(match.handler, 'string')
+        self.assertEqual(match.params, {'name': '5'})
+        match = self.router.match('GET', '/a/5')
+        self.assertEqual(match.handler, 'int')
+        self.assertEqual(match.params, {'id': 5})
+        self.assertEqual(self.router.match('HEAD', '/a/5').handler, 'int')
+        self.assertEqual(sorted(self.router.match('POST', '/a/5').allowed_methods), ['DELETE', 'GET'])
+        # 非整数只匹配 <name>，405 只列出 <name> 的方法
+        self.assertEqual(self.router.match('GET', '/a/x').allowed_methods, ['DELETE'])
+
+    def test_trailing_slash_is_strict(self):
+        for path in ('/api/users/me/', '/api/users/1/', '/b/5/', '/b/5//', '/b//5'):
+            match = self.router.match('GET', path)
+            self.assertIsNone(match.handler, path)
+            self.assertEqual(match.allowed_methods, [], path)
+
+    def test_trailing_slash_route_matches_exactly(self):
+        self.router.add('/c/<id>/', ['GET'], 'c')
+        self.router.add('/d/', ['GET'], 'd')
+        self.assertEqual(self.router.match('GET', '/c/5/').params, {'id': '5'})
+        self.assertIsNone(self.router.match('GET', '/c/5').handler)
+        self.assertEqual(self.router.match('GET', '/d/').handler, 'd')
+        self.assertIsNone(self.router.match('GET', '/d').handler)
+
+
+class DispatchRouteTest(unittest.TestCase):
+    """通过分发入口验证路由匹配"""
+
+    def setUp(self):
+        self.client = main.app.test_client()
+
+    def test_delete_on_literal_path_uses_param_route(self):
+        self.assertEqual(self.client.get('/api/items/latest').get_json(), {'name': 'latest'})
+        response = self.client.delete('/api/items/latest')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {'deleted': 'latest'})
+
+    def test_converters_on_same_segment_with_different_methods(self):
+        self.assertEqual(self.client.get('/api/orders/5').get_json(), {'id': 5})
+        response = self.client.delete('/api/orders/5')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {'code': '5'})
+        self.assertEqual(self.client.get('/api/orders/abc').status_code, 405)
+
+    def test_trailing_slash_returns_404(self):
+        self.assertEqual(self.client.get('/api/items/latest/').status_code, 404)
+        self.assertEqual(self.client.get('/api/items/abc/').status_code, 404)
+        self.assertEqual(self.client.get('/api/users/7/').status_code, 404)
+
+
+class SerializerTest(unittest.TestCase):
+    """各序列化后端与 jsonify 一样输出紧凑格式"""
+
+    def test_backends_produce_same_bytes(self):
+        data = {'a': '1', 'b': [1, 2], 'c': {'d': None}}
+        outputs = set()
+        for settings in ('stdlib', 'orjson', 'pre_encoded'):
+            serializer = serializers.create_serializer(settings, main.app.json.dumps, True)
+            outputs.add(serializer(data))
+        self.assertEqual(outputs, {b'{"a":"1","b":[1,2],"c":{"d":null}}'})
+
+    def test_response_body_is_compact(self):
+        response = main.app.test_client().get('/api/users/7')
+        self.assertEqual(response.data, b'{"id":7}')
+
+
+if __name__ == '__main__':
+    unittest.main()